@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+FunctionChat-Bench benchmark commands.
+
+- judge_prompt : compact judge prompt 와 full judge prompt 의 판정 일치율 / 토큰 절감량 비교
+- judge_cascade : cheap judge 확신도 threshold 를 저장된 strong judge 판정으로 보정 (일치율 / escalation 비율 / 절감량)
+- json-codec : 설치된 JSON backend (orjson / msgspec / json) 별 데이터셋 load / request 생성 / 평가 루프 CPU 시간 비교
+- formatter : request 생성 / exact match (_process_exact_match) / streaming 평가 루프의 item 당 CPU 시간
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import random
+import inspect
+import tempfile
+import subprocess
+import click
+
+from src import formatter
+from src import json_codec
+from src.constants import COMMON, SINGLECALL, DIALOG, CALL
+from src.blob_store import iter_eval_records
+from src.prompt_compactor import estimate_tokens
+from src.judge_cascade import calibrate_threshold
+
+# .env 로드 (judge OPENAI_API_KEY 등)
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except Exception:
+    pass
+
+
+@click.group()
+def cli():
+    pass
+
+
+def get_prompt_tokens(evaluate_response):
+    usage = evaluate_response.get('usage') or {}
+    return usage.get('prompt_tokens')
+
+
+def is_judged(record):
+    return bool(record.get('evaluate_prompt')) and record['evaluate_response'].get('id') != 'exact-match'
+
+
+@cli.command()
+@click.option('--eval_type', required=True, type=click.Choice([DIALOG, SINGLECALL, COMMON]))
+@click.option('--eval_path', required=True, help='full prompt 로 채점된 *.eval.jsonl')
+@click.option('--sample_size', default=50, show_default=True, help='비교할 judge 채점 건수 (0이면 전체)')
+@click.option('--seed', default=0, show_default=True)
+@click.option('--dry_run', is_flag=True, help='judge 호출 없이 토큰 절감량만 계산')
+def judge_prompt(eval_type, eval_path, sample_size, seed, dry_run):
+    """compact judge prompt 의 full prompt 대비 판정 일치율과 토큰 절감량을 측정합니다."""
+    from src.evaluation_handler import EvaluationHandler
+
+    records = [record for record in iter_eval_records(eval_path) if is_judged(record)]
+    if sample_size and len(records) > sample_size:
+        records = random.Random(seed).sample(records, sample_size)
+    print(f"[[judge prompt benchmark]] {len(records)} judged items from {eval_path}")
+
+    handler = EvaluationHandler(eval_type)
+    handler.prompt_mode = 'compact'
+    full_tokens, compact_tokens, agree = 0, 0, 0
+    confusion = {}
+    for record in records:
+        inp = record['model_request']
+        out = record['model_response']
+        if eval_type == SINGLECALL:
+            inp['type_of_output'] = CALL
+        full_verdict = formatter.convert_eval_key(record['evaluate_response'])
+        full_tokens += get_prompt_tokens(record['evaluate_response']) or estimate_tokens(record['evaluate_prompt'])
+        if dry_run:
+            compact_prompt = handler.get_input_prompt(inp, out)
+            compact_tokens += estimate_tokens(compact_prompt)
+            continue
+        evaluate_response, compact_prompt = handler.fetch(inp, out)
+        compact_tokens += get_prompt_tokens(evaluate_response) or estimate_tokens(compact_prompt)
+        compact_verdict = formatter.convert_eval_key(evaluate_response)
+        agree += int(full_verdict == compact_verdict)
+        key = f"{full_verdict}->{compact_verdict}"
+        confusion[key] = confusion.get(key, 0) + 1
+
+    saved = full_tokens - compact_tokens
+    print(f"  prompt tokens : full {full_tokens} / compact {compact_tokens} "
+          f"(saved {saved}, {saved / full_tokens if full_tokens else 0.0:.1%})")
+    if not dry_run and records:
+        print(f"  agreement : {agree}/{len(records)} ({agree / len(records):.1%})")
+        for key, count in sorted(confusion.items()):
+            print(f"    {key} : {count}")
+
+
+@cli.command()
+@click.option('--eval_type', required=True, type=click.Choice([DIALOG, SINGLECALL, COMMON]))
+@click.option('--eval_path', required=True, help='strong judge 로 채점된 *.eval.jsonl')
+@click.option('--cascade_judge', default=None, help='cheap judge 모델 (기본: openai.cfg 의 cascade_judge)')
+@click.option('--target_agreement', default=0.98, show_default=True, help='strong judge 판정과의 목표 일치율')
+@click.option('--sample_size', default=100, show_default=True, help='보정에 사용할 judge 채점 건수 (0이면 전체)')
+@click.option('--seed', default=0, show_default=True)
+def judge_cascade(eval_type, eval_path, cascade_judge, target_agreement, sample_size, seed):
+    """cheap judge 확신도 threshold 를 저장된 strong judge 판정으로 보정하고 절감량/일치율을 출력합니다."""
+    from src.evaluation_handler import EvaluationHandler, REPO_PATH
+
+    records = [record for record in iter_eval_records(eval_path) if is_judged(record)]
+    if sample_size and len(records) > sample_size:
+        records = random.Random(seed).sample(records, sample_size)
+    handler = EvaluationHandler(eval_type)
+    if cascade_judge:
+        cfg = json.loads(open(f'{REPO_PATH}/config/openai.cfg', 'r').read())
+        handler.cascade_model = cascade_judge
+        handler.cascade_executor = handler.load_api_executor(dict(cfg, api_version=cascade_judge),
+                                                             api_key=handler.openai_apikey)
+    if handler.cascade_executor is None:
+        raise click.UsageError('set cascade_judge in config/openai.cfg or pass --cascade_judge')
+    print(f"[[judge cascade calibration]] {len(records)} judged items from {eval_path}, "
+          f"cheap judge {handler.cascade_model} ({handler.cascade_confidence})")
+
+    samples = {}
+    cheap_tokens, strong_tokens, cheap_latency = 0, 0, 0.0
+    for record in records:
+        inp = record['model_request']
+        if eval_type == SINGLECALL:
+            inp['type_of_output'] = CALL
+        strong_verdict = formatter.convert_eval_key(record['evaluate_response'])
+        input_prompt = handler.get_input_prompt(inp, record['model_response'])
+        cheap_response, latency, cheap_verdict, confidence = handler.fetch_cheap(input_prompt)
+        cheap_tokens += (cheap_response.get('usage') or {}).get('total_tokens') or 0
+        strong_tokens += (record['evaluate_response'].get('usage') or {}).get('total_tokens') or 0
+        cheap_latency += latency
+        samples.setdefault(inp['type_of_output'], []).append((confidence, cheap_verdict, strong_verdict))
+
+    all_samples = [sample for output_samples in samples.values() for sample in output_samples]
+    rows, chosen = calibrate_threshold(all_samples, target_agreement)
+    if chosen is None:
+        return
+    print("  threshold  escalation  agreement")
+    for row in rows:
+        print(f"  {row['threshold']:9.3f}  {row['escalation_rate']:10.1%}  {row['agreement']:9.1%}")
+    print(f"  => cascade_threshold {chosen['threshold']:.3f} : escalation {chosen['escalation_rate']:.1%}, "
+          f"agreement {chosen['agreement']:.1%} (target {target_agreement:.1%})")
+    for output_type, output_samples in sorted(samples.items()):
+        escalated = sum(1 for conf, _, _ in output_samples if conf is None or conf < chosen['threshold'])
+        agree = sum(1 for conf, cheap, strong in output_samples
+                    if conf is None or conf < chosen['threshold'] or cheap == strong)
+        print(f"    {output_type} : items {len(output_samples)}, escalation {escalated / len(output_samples):.1%}, "
+              f"agreement {agree / len(output_samples):.1%}")
+    if strong_tokens:
+        cascade_tokens = cheap_tokens + strong_tokens * chosen['escalation_rate']
+        print(f"  judge tokens : strong only {strong_tokens} / cascade ~{int(cascade_tokens)} "
+              f"(saved {1 - cascade_tokens / strong_tokens:.1%} of tokens, "
+              f"{1 - chosen['escalation_rate']:.1%} of strong judge calls)")
+    print(f"  cheap judge avg latency : {cheap_latency / len(records):.2f}s")
+
+
+
+@cli.command(name='json-codec')
+@click.option('--data_path', default='./data', show_default=True, help='*.jsonl 데이터셋 디렉토리')
+@click.option('--repeat', default=5, show_default=True, help='backend 별 반복 횟수 (최소 CPU 시간 사용)')
+def json_codec_benchmark(data_path, repeat):
+    """설치된 JSON backend 별로 데이터셋 load, request 생성, 평가 루프 (record / 리포트 기록) 의 CPU 시간을 stdlib json 과 비교합니다."""
+    data_files = sorted(glob.glob(os.path.join(data_path, '*.jsonl')))
+    if not data_files:
+        raise click.UsageError(f'no *.jsonl files in {data_path}')
+    print(f"[[json codec benchmark]] backends {', '.join(json_codec.BACKENDS)}, {len(data_files)} files, best of {repeat}")
+    default_backend = json_codec.backend
+    results = {}
+    try:
+        for backend in json_codec.BACKENDS:
+            json_codec.set_backend(backend)
+            best_load = None
+            for _ in range(repeat):
+                start = time.process_time()
+                datasets = [json_codec.load_jsonl(data_file) for data_file in data_files]
+                load_time = time.process_time() - start
+                best_load = load_time if best_load is None else min(best_load, load_time)
+            # 실제 pipeline 단계: request 파일 생성 / exact match + eval record, 리포트 기록 (judge 호출 제외)
+            stages = measure_formatters(data_path, repeat)
+            request_time = sum(stage['request'] * stage['items'] for stage in stages.values()) / 1e6
+            evaluate_time = sum((stage['exact'] + stage['stream']) * stage['items'] for stage in stages.values()) / 1e6
+            results[backend] = (best_load, request_time, evaluate_time)
+    finally:
+        json_codec.set_backend(default_backend)
+    items = sum(len(records) for records in datasets)
+    baseline = sum(results['json'])
+    print(f"  {items} records")
+    print("  backend   load(s)   request(s)   evaluate(s)   total(s)  saved vs json")
+    for backend, (load_time, request_time, evaluate_time) in results.items():
+        total = load_time + request_time + evaluate_time
+        print(f"  {backend:8s}  {load_time:7.3f}   {request_time:10.3f}   {evaluate_time:11.3f}   {total:8.3f}  "
+              f"{1 - total / baseline if baseline else 0.0:.1%}")
+    if len(results) == 1:
+        print("  (stdlib json only; pip install orjson or msgspec to enable a fast backend)")
+
+
+FORMATTER_DATASETS = {
+    DIALOG: 'FunctionChat-Dialog.jsonl',
+    SINGLECALL: 'FunctionChat-Singlecall.jsonl',
+    COMMON: 'FunctionChat-CallDecision.jsonl',
+}
+
+
+def get_exact_output(inp):
+    # call 은 ground truth 를 그대로 응답으로 사용 (exact match 통과, judge 호출 없음)
+    ground_truth = inp.get('ground_truth') or {}
+    if ground_truth.get('tool_calls'):
+        return {'role': 'assistant', 'content': None, 'tool_calls': ground_truth['tool_calls']}
+    return {'role': 'assistant', 'content': ground_truth.get('content') or '', 'tool_calls': None}
+
+
+# 다른 checkout 의 src 패키지로 measure_formatters 를 실행 (모듈을 한 프로세스에 두 번 import 할 수 없으므로 subprocess)
+CHECKOUT_SCRIPT = """
+import sys, json
+sys.path.insert(0, sys.argv[1])
+namespace = {}
+exec(sys.argv[2], namespace)
+print(json.dumps(namespace['measure_formatters'](sys.argv[3], int(sys.argv[4]))))
+"""
+# 측정 코드가 checkout 에서 쓰는 import (모든 revision 에 있는 모듈만)
+CHECKOUT_IMPORTS = """import os
+import json
+import time
+import tempfile
+from src.constants import COMMON, SINGLECALL, DIALOG, CALL
+"""
+
+
+class PlainEvalRecordWriter:
+    """
+    Writes eval records as the streaming loop did before the eval record writers existed, so that
+    measure_formatters also runs against older checkouts (--baseline_path).
+    """
+    def __init__(self, file_path):
+        self.fw = open(file_path, 'w', encoding='utf-8')
+
+    def write(self, record):
+        self.fw.write(f"{json.dumps(record, ensure_ascii=False)}\n")
+
+    def close(self):
+        self.fw.close()
+
+
+class PlainReportWriter(PlainEvalRecordWriter):
+    def write(self, response_formatter, record):
+        self.fw.write(f"{response_formatter.to_tsv().strip()}\n")
+
+
+def open_formatter_writers(handler, eval_file_path):
+    # measure_formatters 는 다른 checkout 의 src 로도 실행되므로, 그 checkout 에 없는 writer API 는 쓰지 않음
+    try:
+        from src.results_store import open_results_writer
+    except ImportError:
+        open_results_writer = None
+    if open_results_writer is None or not hasattr(handler, 'open_eval_record_writer'):
+        return PlainEvalRecordWriter(eval_file_path), PlainReportWriter(f'{eval_file_path}.tsv')
+    return (handler.open_eval_record_writer(eval_file_path, 'w'),
+            open_results_writer(handler.results_format, f'{eval_file_path}.tsv', eval_file_path))
+
+
+def measure_formatters(data_path, repeat):
+    """
+    Measures the per-item CPU time (us) of request creation, exact match and the streaming evaluation loop.
+
+    Returns:
+        dict: {eval_type: {'items', 'request', 'exact', 'stream'}} for the datasets found in data_path.
+    """
+    from src.payload_creator import PayloadCreatorFactory
+    from src.evaluation_handler import EvaluationHandler, RESPONSE_FORMATTER_OBJ
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for eval_type, file_name in FORMATTER_DATASETS.items():
+            input_file_path = os.path.join(data_path, file_name)
+            if not os.path.isfile(input_file_path):
+                continue
+            request_file_path = os.path.join(tmp_dir, f'{eval_type}.input.jsonl')
+            eval_file_path = os.path.join(tmp_dir, f'{eval_type}.eval.jsonl')
+            handler = EvaluationHandler(eval_type)
+            best = {'request': None, 'exact': None, 'stream': None}
+
+            def update_best(key, start):
+                elapsed = time.process_time() - start
+                best[key] = elapsed if best[key] is None else min(best[key], elapsed)
+
+            for _ in range(repeat):
+                start = time.process_time()
+                creator = PayloadCreatorFactory.get_payload_creator(
+                    eval_type, 0.1, os.path.join(data_path, 'system_prompt.txt'))
+                api_request_list = list(creator.create_payload(
+                    input_file_path=input_file_path, request_file_path=request_file_path, reset=True,
+                    tools_type='all' if eval_type == SINGLECALL else None))
+                update_best('request', start)
+                outputs = [get_exact_output(inp) for inp in api_request_list]
+
+                start = time.process_time()
+                handler._process_exact_match(api_request_list, outputs, 0)
+                update_best('exact', start)
+
+                # streaming 평가 루프 (judge 호출 제외): exact match -> record -> eval record / 리포트 기록
+                start = time.process_time()
+                eval_raw_fw, eval_report_fw = open_formatter_writers(handler, eval_file_path)
+                for inp, out in zip(api_request_list, outputs):
+                    if eval_type == SINGLECALL:
+                        inp['type_of_output'] = CALL
+                    is_pass, evaluate_response, input_prompt = handler.exact_match(inp, out)
+                    response_formatter = RESPONSE_FORMATTER_OBJ[eval_type](
+                        request_model=inp, response_model=out,
+                        evaluate_prompt=input_prompt, evaluate_response=evaluate_response)
+                    record = response_formatter.to_dict()
+                    eval_raw_fw.write(record)
+                    eval_report_fw.write(response_formatter, record)
+                eval_raw_fw.close()
+                eval_report_fw.close()
+                update_best('stream', start)
+            items = len(api_request_list)
+            results[eval_type] = {'items': items, **{key: elapsed / items * 1e6 for key, elapsed in best.items()}}
+    return results
+
+
+def get_checkout_source():
+    """
+    Returns the source of measure_formatters and its helpers. benchmark.py itself imports modules that older
+    checkouts do not have, so only the measuring code is run against the other checkout.
+    """
+    helpers = [get_exact_output, PlainEvalRecordWriter, PlainReportWriter, open_formatter_writers, measure_formatters]
+    return (CHECKOUT_IMPORTS + f"FORMATTER_DATASETS = {FORMATTER_DATASETS!r}\n\n\n"
+            + '\n\n'.join(inspect.getsource(helper) for helper in helpers))
+
+
+def measure_checkout_formatters(checkout_path, data_path, repeat):
+    """
+    Runs measure_formatters against the src package of another checkout (checkout_path, a FunctionChat-Bench
+    directory) in a subprocess, and returns its results.
+    """
+    proc = subprocess.run([sys.executable, '-c', CHECKOUT_SCRIPT, os.path.abspath(checkout_path),
+                           get_checkout_source(), os.path.abspath(data_path), str(repeat)],
+                          cwd=checkout_path, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise click.ClickException(f"formatter benchmark of {checkout_path} failed:\n{proc.stderr}")
+    # handler 등이 stdout 에 출력할 수 있으므로 마지막 줄만 사용
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+@cli.command(name='formatter')
+@click.option('--data_path', default='./data', show_default=True, help='FunctionChat-*.jsonl 데이터셋 디렉토리')
+@click.option('--repeat', default=3, show_default=True, help='반복 횟수 (최소 CPU 시간 사용)')
+@click.option('--baseline_path', default=None,
+              help='before 로 비교할 checkout 의 FunctionChat-Bench 디렉토리 (예: git worktree 로 만든 이전 revision)')
+@click.option('--target_path', default=None,
+              help='after 로 측정할 checkout 의 FunctionChat-Bench 디렉토리 (기본: 이 checkout)')
+def formatter_benchmark(data_path, repeat, baseline_path, target_path):
+    """request 생성, exact match, streaming 평가 루프 (record / 리포트 기록 포함) 의 item 당 CPU 시간을 측정합니다."""
+    baseline = measure_checkout_formatters(baseline_path, data_path, repeat) if baseline_path else {}
+    if target_path:
+        results = measure_checkout_formatters(target_path, data_path, repeat)
+    else:
+        results = measure_formatters(data_path, repeat)
+
+    print(f"[[formatter benchmark]] best of {repeat}, json backend {json_codec.backend}")
+    if baseline:
+        print(f"  before: {baseline_path} -> after: {target_path or 'this checkout'}")
+    print("  eval_type     items   request(us)        exact(us)          stream(us)")
+    for eval_type, result in results.items():
+        cells = []
+        for key in ['request', 'exact', 'stream']:
+            before = baseline.get(eval_type, {}).get(key)
+            cells.append(f"{before:7.1f} -> {result[key]:7.1f}" if before is not None else f"{result[key]:18.1f}")
+        print(f"  {eval_type:12s}  {result['items']:5d}   " + '  '.join(cells))
+
+
+if __name__ == '__main__':
+    cli()
@@ -9,7 +9,10 @@ import json
 from pathlib import Path
 
 from src import utils
+from src import run_manifest
+from src import serial_index
 from src import local_inference
+from src.framed_io import COMPRESSIONS, add_compression_suffix
 from src.default_click_type import (
     DefaultBaseUrlPromptOptions,
     DefaultModelPathPromptOptions,
@@ -29,7 +32,9 @@ from src.default_click_type import (
 from src.payload_creator import PayloadCreatorFactory
 from src.response_handler import ResponseHandler
 from src.evaluation_handler import EvaluationHandler
+from src.eval_index import to_index_record
 from src.constants import DEFAULT_TEMPERATURE, LOCALHOST_BASE_URL, EXIT_SUCCESS, EXIT_FAILURE
+from src.constants import DIALOG, SINGLECALL, COMMON
 
 
 REPO_PATH = os.path.dirname(os.path.abspath(__file__))
@@ -52,7 +57,8 @@ def cli(ctx, q):
 
 
 def default_eval_options(f):
-    f = click.option('--model', prompt='model name', help='gpt-3.5-turbo, gpt-4 ..etc')(f)
+    f = click.option('--model', prompt='model name',
+                     help='gpt-3.5-turbo, gpt-4 ..etc (여러 모델은 콤마로 구분, 모델별로 순서대로 평가)')(f)
     f = click.option('--input_path', prompt='input file path', help='golden set file name (*.jsonl)')(f)
     # test option
     f = click.option('--reset', prompt='recreate request file', help='reset request file', cls=DefaultResetPromptOptions)(f)
@@ -62,6 +68,10 @@ def default_eval_options(f):
     f = click.option('--is_batch', prompt='batch processing', help='batch processing(True, False)', cls=DefaultBatchPromptOptions)(f)
     f = click.option('--num-threads', 'num_threads', default=1, show_default=True,
                      help='동시 API 호출 스레드 수 (rate limit 회피용)')(f)
+    f = click.option('--num_samples', default=1, show_default=True,
+                     help='요청당 모델 샘플 수 k (pass@k / self-consistency, 변경 시 --reset True)')(f)
+    f = click.option('--compression', default='none', show_default=True, type=click.Choice(COMPRESSIONS),
+                     help='request / predict / eval 파일 압축 (*.gz / *.zst, 바꾸면 새 파일로 다시 실행)')(f)
     # openai type
     f = click.option('--api_key', prompt='model api key', help='api key', cls=DefaultApiKeyPromptOptions)(f)
     f = click.option('--temperature', prompt='temperature', help='generate temperature', default=DEFAULT_TEMPERATURE)(f)
@@ -89,7 +99,7 @@ def singlecall_eval_options(f):
     return f
 
 
-def get_file_paths(test_prefix, model_name, tools_type=None):
+def get_file_paths(test_prefix, model_name, tools_type=None, compression='none'):
     # 새로운 디렉토리 구조: result/, score/ 사용 (프로젝트 루트에 생성)
     # REPO_PATH는 FunctionChat-Bench 디렉토리이므로 상위 디렉토리로 이동
     project_root = os.path.dirname(os.path.abspath(REPO_PATH))
@@ -119,19 +129,21 @@ def get_file_paths(test_prefix, model_name, tools_type=None):
     base_path = os.path.join(model_result_dir, test_prefix)
     score_base_path = os.path.join(model_score_dir, test_prefix)
     if tools_type:
-        return {
+        file_paths = {
             "request": f"{base_path}.input.jsonl",
             "predict": f"{base_path}.{model_name_clean}.{tools_type}.output.jsonl",
             "eval": f"{score_base_path}.{model_name_clean}.{tools_type}.eval.jsonl",
             "eval_log": f"{score_base_path}.{model_name_clean}.{tools_type}.eval_report.tsv",
         }
     else:
-        return {
+        file_paths = {
             "request": f"{base_path}.input.jsonl",
             "predict": f"{base_path}.{model_name_clean}.output.jsonl",
             "eval": f"{score_base_path}.{model_name_clean}.eval.jsonl",
             "eval_log": f"{score_base_path}.{model_name_clean}.eval_report.tsv",
         }
+    # 압축 시 *.gz / *.zst (catalog, blob 등 부속 파일도 같은 압축, eval index 는 plain)
+    return {key: add_compression_suffix(file_path, compression) for key, file_path in file_paths.items()}
 
 
 def get_eval_subtype(eval_type, input_path):
@@ -165,6 +177,8 @@ def run_evaluate(
         tools_type=None, # singlecall 일때만 필요
         is_batch=True, # batch processing 옵션
         num_threads=1,
+        num_samples=1, # pass@k 샘플 수
+        compression='none', # 결과 파일 압축
     ):
     eval_subtype = get_eval_subtype(eval_type, input_path)
     model_name = None
@@ -175,12 +189,24 @@ def run_evaluate(
     else: # gpt, mistral, etc.
         model_name = model
 
-    file_paths = get_file_paths(test_prefix, model_name)
+    file_paths = get_file_paths(test_prefix, model_name, compression=compression)
     print(f"[[{model_name} {test_prefix} evaluate start]]")
     process_meta = None
     try:
-        # 파일이 없거나, predict 라인수가 requests 보다 작을때만 모델을 띄우게 
-        if not utils.compare_file_line_counts(file_paths['request'], file_paths['predict']):
+        api_request_list = PayloadCreatorFactory.get_payload_creator(
+            eval_type, temperature,
+           system_prompt_path, # option arguments
+           n=int(num_samples)
+        ).create_payload(
+            input_file_path=input_path,
+            request_file_path=file_paths['request'],
+            reset=reset,
+            tools_type=tools_type # option arguments
+        )
+        request_hashes = run_manifest.get_items(file_paths['request'])
+        # predict 가 현재 요청 / 모델로 만들어진 완성본이 아닐 때만 모델을 띄우게 (run manifest 로 판단)
+        if not run_manifest.is_fresh(file_paths['predict'], ResponseHandler.get_manifest_config(model, model_name),
+                                     request_hashes):
             if model == 'inhouse-local':
                 if Path(model_path).exists():
                     process_meta = local_inference.initialize_vllm(
@@ -195,21 +221,14 @@ def run_evaluate(
                 else:
                     raise Exception("Invalid model_path")
 
-        api_request_list = PayloadCreatorFactory.get_payload_creator(
-            eval_type, temperature,
-           system_prompt_path # option arguments
-        ).create_payload(
-            input_file_path=input_path,
-            request_file_path=file_paths['request'],
-            reset=reset,
-            tools_type=tools_type # option arguments
-        )
         api_response_list = ResponseHandler(
             model, api_key, base_url, model_name,
             gcloud_project_id, gcloud_location
         ).fetch_and_save(
-            api_request_list, file_paths['predict'], reset, sample, debug, max_threads=int(num_threads)
+            api_request_list, file_paths['predict'], reset, sample, debug, max_threads=int(num_threads),
+            input_hashes=request_hashes
         )
+        predict_hashes = run_manifest.get_items(file_paths['predict'])
         if process_meta is not None:
             local_inference.kill_vllm(process_meta)
         
@@ -225,8 +244,12 @@ def run_evaluate(
             llm_judge_name=llm_judge_name,
             model_path=model_path if model == 'inhouse-local' else model_name,
             is_batch=is_batch,
-            eval_subtype=eval_subtype
+            eval_subtype=eval_subtype,
+            input_hashes=run_manifest.get_pair_hashes(request_hashes, predict_hashes)
+                         if request_hashes is not None and predict_hashes is not None else None
         )
+        # serial 번호로 한 item 만 읽을 수 있도록 request / predict / eval 의 serial index 기록
+        serial_index.update_serial_indexes(file_paths)
     except KeyboardInterrupt:
         print("Ctrl+C detected. Terminating the process.")
         if process_meta is not None:
@@ -237,6 +260,22 @@ def run_evaluate(
         traceback.print_exc()
         if process_meta is not None:
             local_inference.kill_vllm(process_meta)
+        return EXIT_FAILURE
+    return EXIT_SUCCESS
+
+
+def run_evaluate_models(eval_type, test_prefix, models, *args, **kwargs):
+    """
+    Runs run_evaluate for every model of a comma-separated model list, e.g. to bring all models up to date after
+    a dataset change (only new or changed items are inferred and judged for each model, see src/run_manifest.py).
+    Exits with EXIT_FAILURE once all models ran if any of them failed.
+    """
+    failed_models = []
+    for model in [name.strip() for name in models.split(',') if name.strip()]:
+        if run_evaluate(eval_type, test_prefix, model, *args, **kwargs) == EXIT_FAILURE:
+            failed_models.append(model)
+    if failed_models:
+        print(f"[[evaluate failed]] {', '.join(failed_models)}")
         sys.exit(EXIT_FAILURE)
         
 
@@ -254,9 +293,9 @@ def dialog(model,
            model_path, tool_parser, serving_wait_timeout,
            reset, sample, debug, only_exact,
            gcloud_project_id, gcloud_location,
-           is_batch, num_threads):
+           is_batch, num_threads, num_samples, compression):
     eval_type = inspect.stack()[0][3]
-    run_evaluate(
+    run_evaluate_models(
       eval_type, f'FunctionChat-{eval_type.capitalize()}',
       model,
       input_path,
@@ -268,6 +307,8 @@ def dialog(model,
       system_prompt_path=system_prompt_path,
       is_batch=is_batch,
       num_threads=num_threads,
+      num_samples=num_samples,
+      compression=compression,
     )
 
 
@@ -283,9 +324,9 @@ def singlecall(model, input_path, system_prompt_path,
                reset, sample, debug, only_exact,
                gcloud_project_id, gcloud_location,
                tools_type,
-               is_batch, num_threads):
+               is_batch, num_threads, num_samples, compression):
     eval_type = inspect.stack()[0][3]
-    run_evaluate(
+    run_evaluate_models(
       eval_type, f'FunctionChat-{eval_type.capitalize()}',
       model,
       input_path,
@@ -298,6 +339,8 @@ def singlecall(model, input_path, system_prompt_path,
       tools_type=tools_type,
       is_batch=is_batch,
       num_threads=num_threads,
+      num_samples=num_samples,
+      compression=compression,
     )
 
 @cli.command()
@@ -313,10 +356,10 @@ def common(model, input_path,
            reset, sample, debug, only_exact,
            # gemini option
            gcloud_project_id, gcloud_location,
-           is_batch, num_threads):
+           is_batch, num_threads, num_samples, compression):
 
     eval_type = inspect.stack()[0][3]
-    run_evaluate(
+    run_evaluate_models(
       eval_type, os.path.splitext(os.path.basename(input_path))[0],
       model,
       input_path,
@@ -327,8 +370,38 @@ def common(model, input_path,
       gcloud_project_id, gcloud_location,
       is_batch=is_batch,
       num_threads=num_threads,
+      num_samples=num_samples,
+      compression=compression,
     )
 
 
+@cli.command()
+@click.option('--eval_type', required=True, type=click.Choice([DIALOG, SINGLECALL, COMMON]))
+@click.option('--model', required=True, help='모델 이름 (여러 모델은 콤마로 구분)')
+@click.option('--serial_num', required=True, help='조회할 serial 번호')
+@click.option('--subtype', default=None, help='tools_type (singlecall) / type_of_output (기본: 전체)')
+@click.option('--input_path', default=None, help='common 평가의 golden set file (*.jsonl)')
+@click.option('--compression', default='none', show_default=True, type=click.Choice(COMPRESSIONS))
+def lookup(eval_type, model, serial_num, subtype, input_path, compression):
+    """모델별 예측 / 판정을 serial index 로 해당 item 만 읽어서 출력합니다."""
+    if eval_type == COMMON:
+        if not input_path:
+            raise click.UsageError('--input_path is required for common')
+        test_prefix = os.path.splitext(os.path.basename(input_path))[0]
+    else:
+        test_prefix = f'FunctionChat-{eval_type.capitalize()}'
+    for model_name in [name.strip() for name in model.split(',') if name.strip()]:
+        file_paths = get_file_paths(test_prefix, model_name, compression=compression)
+        predictions = serial_index.lookup(serial_num, {model_name: file_paths['predict']}, subtype,
+                                          file_paths['request']).get(model_name, [])
+        records = serial_index.lookup(serial_num, {model_name: file_paths['eval']}, subtype).get(model_name, [])
+        print(json.dumps({
+            'model': model_name,
+            'serial_num': serial_num,
+            'predictions': predictions,
+            'evaluations': [to_index_record(record) for record in records],
+        }, ensure_ascii=False, indent=2))
+
+
 if __name__ == '__main__':
     cli()
@@ -18,6 +18,11 @@ class AbstractModelAPIExecutor:
         model (str): The model identifier.
         api_key (str): The API key for accessing the model.
     """
+    # 재시도하지 않고 즉시 raise 하는 status code (judge pool member 는 429 도 포함해 다른 member 로 failover)
+    no_retry_status_codes = (401, 402, 403)
+    # 오류 시 시도 횟수 (judge pool member 는 적게 시도하고 다른 member 로 failover)
+    max_retries = 8
+
     def __init__(self, model, api_key):
         logger.info(f"model: {model}")
         logger.info(f"api_key: {api_key}")
@@ -69,7 +74,7 @@ class AbstractModelAPIExecutor:
 
     def _call_with_retry(self, func, *args, **kwargs):
         # 기본 재시도 횟수를 늘려 429(분당 제한 등)에 더 강인하게 대응
-        max_retries = kwargs.pop('max_retries', 8)
+        max_retries = kwargs.pop('max_retries', self.max_retries)
         for attempt in range(max_retries):
             try:
                 response = func(*args, **kwargs)
@@ -80,7 +85,7 @@ class AbstractModelAPIExecutor:
                 error_type = type(e).__name__
                 # 크레딧 부족(402) / 인증(401) 등은 재시도해도 해결 안 됨 → 즉시 실패
                 status_code = getattr(e, "status_code", None)
-                if status_code in (401, 402, 403):
+                if status_code in self.no_retry_status_codes:
                     logger.error(f"API call failed (non-retriable {status_code}) ({error_type}): {error_msg[:300]}")
                     raise e
                 if attempt < max_retries - 1:
@@ -150,6 +155,11 @@ class OpenaiModelAzureAPI(AbstractModelAPIExecutor):
         }
         if api_request.get("max_tokens") is not None:
             kwargs["max_tokens"] = int(api_request["max_tokens"])
+        if api_request.get("response_format"):
+            kwargs["response_format"] = api_request["response_format"]
+        if api_request.get("logprobs"):
+            kwargs["logprobs"] = True
+            kwargs["top_logprobs"] = int(api_request.get("top_logprobs", 5))
         response = self._call_with_retry(self.openai_chat_completion, **kwargs)
         response_output = self._parse_response(response)
         return response_output
@@ -190,6 +200,11 @@ class OpenaiModelAPI(AbstractModelAPIExecutor):
         }
         if api_request.get("max_tokens") is not None:
             kwargs["max_tokens"] = int(api_request["max_tokens"])
+        if api_request.get("response_format"):
+            kwargs["response_format"] = api_request["response_format"]
+        if api_request.get("logprobs"):
+            kwargs["logprobs"] = True
+            kwargs["top_logprobs"] = int(api_request.get("top_logprobs", 5))
         response = self._call_with_retry(self.openai_chat_completion, **kwargs)
         response_output = self._parse_response(response)
         return response_output
@@ -234,13 +249,16 @@ class OpenRouterModelAPI(AbstractModelAPIExecutor):
         is_mistral = 'mistral' in self.model.lower()
         messages = self._sanitize_messages(api_request['messages'], for_mistral=is_mistral)
         
-        response = self._call_with_retry(
-            self.openai_chat_completion,
-            model=self.model,
-            temperature=api_request['temperature'],
-            messages=messages,
-            tools=tools
-        )
+        kwargs = {
+            "model": self.model,
+            "temperature": api_request['temperature'],
+            "messages": messages,
+            "tools": tools,
+        }
+        # n > 1 (multi-sample) 은 지원하는 provider 에만 전달, 나머지 샘플은 ResponseHandler 가 개별 호출로 보충
+        if int(api_request.get('n', 1) or 1) > 1:
+            kwargs["n"] = int(api_request['n'])
+        response = self._call_with_retry(self.openai_chat_completion, **kwargs)
         response_output = self._parse_response(response)
         return response_output
 
@@ -0,0 +1,247 @@
+import os
+import string
+import hashlib
+from src import json_codec
+from src.framed_io import FrameReader, LineWriter, get_sidecar_path, iter_line_positions
+from src.jsonl_reader import JsonlReader, iter_jsonl
+"""
+This package stores the large, repeated parts of eval records (tools, messages, report cells, judge prompts)
+once in a content-addressed blob file (*.eval.blobs.jsonl), and lets eval records reference them by hash.
+
+- eval_storage 'full'  : eval records embed everything (default)
+- eval_storage 'dedup' : values of at least MIN_BLOB_SIZE characters are replaced by {'$blob': hash}, and a judge
+                         prompt rendered from a rubric template is stored as {'$template': hash, 'fields': [...]}
+Readers re-hydrate records on demand (see iter_eval_records, EvalRecordReader); records of a 'full' run are returned
+as they are.
+"""
+
+EVAL_STORAGES = ['full', 'dedup']
+MIN_BLOB_SIZE = 256
+BLOB_KEY = '$blob'
+TEMPLATE_KEY = '$template'
+# report_arguments 중 model_request 의 내용을 반복하는 (json string) cell
+BLOB_REPORT_KEYS = ['messages', 'query', 'tools', 'ground_truth', 'acceptable_arguments']
+
+
+def get_blob_file_path(eval_file_path):
+    return get_sidecar_path(eval_file_path, '.blobs.jsonl')
+
+
+def get_blob_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def get_template_parts(template):
+    """
+    Splits a str.format template into [literal, has_field] parts (escaped braces are part of the literal).
+    """
+    parts, literal = [], ''
+    for literal_text, field_name, _, _ in string.Formatter().parse(template):
+        literal += literal_text
+        if field_name is not None:
+            parts.append([literal, True])
+            literal = ''
+    parts.append([literal, False])
+    return parts
+
+
+def split_by_template(text, parts):
+    """
+    Returns the field values of text rendered from a template (see get_template_parts), or None if it does not match.
+    """
+    fields, pos = [], 0
+    for idx, (literal, has_field) in enumerate(parts):
+        if not text.startswith(literal, pos):
+            return None
+        pos += len(literal)
+        if not has_field:
+            continue
+        next_literal = parts[idx + 1][0]
+        if not next_literal:
+            # field 가 연달아 있으면 경계를 알 수 없음 (마지막 field 는 끝까지)
+            if idx + 2 < len(parts):
+                return None
+            end = len(text)
+        else:
+            end = text.find(next_literal, pos)
+            if end < 0:
+                return None
+        fields.append(text[pos:end])
+        pos = end
+    return fields if pos == len(text) else None
+
+
+def join_template(parts, fields):
+    output, field_idx = [], 0
+    for literal, has_field in parts:
+        output.append(literal)
+        if has_field:
+            output.append(fields[field_idx])
+            field_idx += 1
+    return ''.join(output)
+
+
+class BlobWriter:
+    """
+    Appends blobs ('<hash>\\t<json>' lines) to the blob file; each distinct value is written once.
+    """
+    def __init__(self, blob_file_path, write_option='w', templates=None):
+        self.known = set()
+        # 압축 파일은 이어서 쓸 때 잘린 마지막 frame 을 먼저 잘라내므로, 남은 blob 만 known 으로 읽음
+        self.fw = LineWriter(blob_file_path, write_option)
+        if write_option == 'a':
+            self.known = {line.split(b'\t', 1)[0].decode('ascii')
+                          for _, _, _, line in iter_line_positions(blob_file_path) if line.strip()}
+        self.templates = []
+        for template in templates or []:
+            parts = get_template_parts(template)
+            self.templates.append((self.put(parts), parts))
+
+    def put(self, value, text=None):
+        """
+        Stores a value (if new) and returns its hash.
+        """
+        text = json_codec.dumps_text(value) if text is None else text
+        blob_hash = get_blob_hash(text)
+        if blob_hash not in self.known:
+            self.fw.write(f"{blob_hash}\t{text}\n")
+            self.known.add(blob_hash)
+        return blob_hash
+
+    def ref(self, value):
+        """
+        Returns {'$blob': hash} for a value of at least MIN_BLOB_SIZE characters (as JSON), or the value itself.
+        """
+        text = json_codec.dumps_text(value)
+        if len(text) < MIN_BLOB_SIZE:
+            return value
+        return {BLOB_KEY: self.put(value, text)}
+
+    def ref_prompt(self, prompt):
+        """
+        Stores a judge prompt as its rubric template hash + field values (large fields as blobs).
+        Prompts that match no template (packed, exact match) are stored with ref().
+        """
+        if isinstance(prompt, str) and len(prompt) >= MIN_BLOB_SIZE:
+            for template_hash, parts in self.templates:
+                fields = split_by_template(prompt, parts)
+                if fields is not None:
+                    return {TEMPLATE_KEY: template_hash, 'fields': [self.ref(field) for field in fields]}
+        return self.ref(prompt)
+
+    def normalize(self, record):
+        """
+        Returns a copy of an eval record whose large values reference blobs.
+        """
+        record = dict(record)
+        model_request = dict(record['model_request'])
+        if model_request.get('tools') is not None:
+            model_request['tools'] = self.ref(model_request['tools'])
+        if isinstance(model_request.get('messages'), list):
+            model_request['messages'] = [self.ref(message) for message in model_request['messages']]
+        record['model_request'] = model_request
+        if record.get('report_arguments'):
+            report_arguments = dict(record['report_arguments'])
+            for key in BLOB_REPORT_KEYS:
+                if isinstance(report_arguments.get(key), str):
+                    report_arguments[key] = self.ref(report_arguments[key])
+            record['report_arguments'] = report_arguments
+        record['evaluate_prompt'] = self.ref_prompt(record.get('evaluate_prompt'))
+        return record
+
+    def flush(self):
+        # blob 은 이를 참조하는 eval record 보다 먼저 파일에 있어야 하므로 압축 frame 이 덜 찼어도 기록
+        self.fw.commit()
+
+    def close(self):
+        self.fw.close()
+
+
+class BlobReader:
+    """
+    Reads blobs on demand: only the position of each blob is indexed, and a blob is read when first requested.
+    """
+    def __init__(self, blob_file_path):
+        self.offsets = {}
+        for start, _, offset, line in iter_line_positions(blob_file_path):
+            if line.strip():
+                self.offsets[line.split(b'\t', 1)[0].decode('ascii')] = (start, offset)
+        self.fp = FrameReader(blob_file_path)
+        self.cache = {}
+
+    def get(self, blob_hash):
+        # 같은 blob 을 참조하는 record 끼리 객체를 공유하지 않도록 cache 는 raw bytes 로 두고 매번 파싱
+        if blob_hash not in self.cache:
+            self.cache[blob_hash] = self.fp.read_line(*self.offsets[blob_hash]).split(b'\t', 1)[1]
+        return json_codec.loads(self.cache[blob_hash])
+
+    def hydrate(self, value):
+        if isinstance(value, dict) and len(value) == 1 and BLOB_KEY in value:
+            return self.get(value[BLOB_KEY])
+        return value
+
+    def hydrate_prompt(self, prompt):
+        if isinstance(prompt, dict) and TEMPLATE_KEY in prompt:
+            return join_template(self.get(prompt[TEMPLATE_KEY]), [self.hydrate(field) for field in prompt['fields']])
+        return self.hydrate(prompt)
+
+    def hydrate_record(self, record):
+        """
+        Returns an eval record with its blob references replaced by their values.
+        """
+        model_request = record['model_request']
+        if 'tools' in model_request:
+            model_request['tools'] = self.hydrate(model_request['tools'])
+        if isinstance(model_request.get('messages'), list):
+            model_request['messages'] = [self.hydrate(message) for message in model_request['messages']]
+        report_arguments = record.get('report_arguments') or {}
+        for key in BLOB_REPORT_KEYS:
+            if key in report_arguments:
+                report_arguments[key] = self.hydrate(report_arguments[key])
+        record['evaluate_prompt'] = self.hydrate_prompt(record.get('evaluate_prompt'))
+        return record
+
+    def close(self):
+        self.fp.close()
+
+
+def iter_eval_records(eval_file_path):
+    """
+    Yields the eval records of an eval records file, re-hydrated from its blob file if the run used 'dedup' storage.
+    """
+    blob_file_path = get_blob_file_path(eval_file_path)
+    if not os.path.isfile(blob_file_path):
+        yield from iter_jsonl(eval_file_path)
+        return
+    blob_reader = BlobReader(blob_file_path)
+    try:
+        for record in iter_jsonl(eval_file_path):
+            yield blob_reader.hydrate_record(record)
+    finally:
+        blob_reader.close()
+
+
+class EvalRecordReader(JsonlReader):
+    """
+    Lazy list of the eval records of an eval records file, re-hydrated from its blob file if the run used 'dedup'
+    storage (random access counterpart of iter_eval_records).
+    """
+    def __init__(self, eval_file_path):
+        super().__init__(eval_file_path)
+        blob_file_path = get_blob_file_path(eval_file_path)
+        self.blob_reader = BlobReader(blob_file_path) if os.path.isfile(blob_file_path) else None
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        record = super().__getitem__(idx)
+        return record if self.blob_reader is None else self.blob_reader.hydrate_record(record)
+
+    def __iter__(self):
+        for record in super().__iter__():
+            yield record if self.blob_reader is None else self.blob_reader.hydrate_record(record)
+
+    def close(self):
+        super().close()
+        if self.blob_reader is not None:
+            self.blob_reader.close()
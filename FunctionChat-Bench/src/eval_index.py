@@ -0,0 +1,121 @@
+import os
+from src import json_codec
+from src.blob_store import BlobWriter, get_blob_file_path
+from src.framed_io import LineWriter, get_sidecar_path, iter_line_positions
+from src.formatter import convert_eval_key, get_error_type
+"""
+This package writes and reads the compact index of an eval records file (*.eval.jsonl),
+so that resuming or re-scoring a run does not reload the full judge prompts and responses.
+"""
+
+INDEX_REQUEST_KEYS = ['serial_num', 'type_of_output', 'tools_type', 'category']
+
+
+def get_index_file_path(eval_file_path):
+    # index 는 작고 매번 처음부터 읽으므로 eval 파일이 압축되어도 plain 으로 기록
+    return get_sidecar_path(eval_file_path, '.index.jsonl', compressed=False)
+
+
+def to_index_record(record):
+    """
+    Returns the compact index record (serial, subtype, verdict, error code, sample verdicts) of an eval record.
+    Records written before the typed verdict field existed are parsed with convert_eval_key.
+    """
+    model_request = record['model_request']
+    evaluate_response = record['evaluate_response']
+    index_record = {key: model_request[key] for key in INDEX_REQUEST_KEYS if key in model_request}
+    index_record['verdict'] = record.get('verdict') or convert_eval_key(evaluate_response)
+    index_record['error_type'] = get_error_type(evaluate_response)
+    if evaluate_response.get('samples'):
+        index_record['samples'] = evaluate_response['samples']
+    return index_record
+
+
+def load_eval_index(eval_file_path):
+    """
+    Returns the index records of an eval records file.
+    The index is valid if its last record ends at the current size of the eval file; otherwise
+    (missing index, older run, or a crash between the two writes) it is rebuilt from the eval records.
+    For a compressed eval file, 'end' is the end of the frame holding the record.
+
+    Parameters:
+        eval_file_path (str): path of the eval records file.
+    Returns:
+        list: index records, [] if the eval file does not exist.
+    """
+    if not os.path.isfile(eval_file_path):
+        return []
+    index_file_path = get_index_file_path(eval_file_path)
+    eval_size = os.path.getsize(eval_file_path)
+    if os.path.isfile(index_file_path):
+        with open(index_file_path) as f:
+            index_records = [json_codec.loads(line) for line in f if line.strip()]
+        if (index_records[-1]['end'] if index_records else 0) == eval_size:
+            return index_records
+        print(f"[[rebuild eval index]] {index_file_path}")
+    index_records = []
+    with open(index_file_path, 'w') as index_fw:
+        for _, end, _, line in iter_line_positions(eval_file_path):
+            if not line.strip():
+                continue
+            index_record = to_index_record(json_codec.loads(line))
+            index_record['end'] = end
+            index_fw.write(f"{json_codec.dumps(index_record)}\n")
+            index_records.append(index_record)
+    return index_records
+
+
+class EvalRecordWriter:
+    """
+    Writes eval records to the eval records file and their index records to the index file.
+    Each index record keeps the byte offset where its eval record ends, which load_eval_index uses as a consistency check.
+    With storage 'dedup', large values are written once to the blob file and referenced by hash (see blob_store).
+    For a compressed eval file, the index records are written once the frame holding their eval records is written.
+    """
+    def __init__(self, eval_file_path, write_option='w', storage='full', templates=None):
+        self.blob_fw = None
+        blob_file_path = get_blob_file_path(eval_file_path)
+        if storage == 'dedup':
+            self.blob_fw = BlobWriter(blob_file_path, write_option, templates)
+        elif write_option == 'w' and os.path.isfile(blob_file_path):
+            # 이전 dedup 실행의 blob 파일은 새 full 기록과 맞지 않으므로 삭제
+            os.remove(blob_file_path)
+        self.eval_fw = LineWriter(eval_file_path, write_option)
+        self.index_fw = open(get_index_file_path(eval_file_path), write_option, encoding='utf-8')
+        self.pending_index_records = []
+
+    def write(self, record):
+        """
+        Appends an eval record and its index record, and returns the index record.
+        """
+        stored_record = self.blob_fw.normalize(record) if self.blob_fw is not None else record
+        self.eval_fw.write(f"{json_codec.dumps(stored_record)}\n")
+        index_record = to_index_record(record)
+        self.pending_index_records.append(index_record)
+        if not self.eval_fw.is_pending():
+            self._write_index_records()
+        return index_record
+
+    def _write_index_records(self):
+        for index_record in self.pending_index_records:
+            index_record['end'] = self.eval_fw.size
+            self.index_fw.write(f"{json_codec.dumps(index_record)}\n")
+        self.pending_index_records = []
+
+    def flush(self, commit=False):
+        # 압축 파일은 frame 이 찰 때까지 모아서 기록 (commit=True 이면 바로 기록)
+        if self.eval_fw.is_pending() and not (commit or self.eval_fw.is_full()):
+            return
+        # blob -> eval record -> index 순서로 flush 해야 참조가 참조 대상보다 앞서지 않음
+        if self.blob_fw is not None:
+            self.blob_fw.flush()
+        self.eval_fw.commit()
+        self._write_index_records()
+        self.index_fw.flush()
+
+    def close(self):
+        self.flush(commit=True)
+        self.eval_fw.close()
+        self.index_fw.close()
+        if self.blob_fw is not None:
+            self.blob_fw.close()
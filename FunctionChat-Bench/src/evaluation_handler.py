@@ -2,17 +2,55 @@ import os
 import json
 import time
 import logging
+import threading
+import concurrent.futures
 from tqdm import tqdm
 from typing import Optional, Union
 
 from src import utils
+from src import json_codec
 from src import openai_utils
+from src import run_manifest
+from src.prompt_compactor import JudgePromptCompactor, estimate_tokens
+from src.judge_packing import PACK_WINDOW_FACTOR, PACKED_VERDICTS_RESPONSE_FORMAT, extract_criterion, parse_packed_verdicts, \
+    to_json_verdict_pack_prompt
+from src.judge_verdict import (
+    JSON_VERDICT_MAX_TOKENS,
+    VERDICT_RESPONSE_FORMAT,
+    parse_json_verdict,
+    to_json_verdict_rubric,
+)
+from src.judge_cascade import (
+    CONFIDENCE_SOURCES,
+    JudgeCascadeStats,
+    logprob_confidence,
+    self_confidence,
+    with_confidence_field,
+    with_self_confidence,
+)
+from src.judge_pool import (
+    DEFAULT_COOLDOWN,
+    FATAL_STATUS_CODES,
+    MEMBER_MAX_RETRIES,
+    RATE_LIMIT_STATUS_CODES,
+    JudgePoolExecutor,
+    JudgePoolMember,
+)
+from src.provisional import display_estimate, estimate_score, stratified_sample, to_score_dict
+from src.score_stats import DEFAULT_CONFIDENCE, DEFAULT_RESAMPLES, add_score_ci
+from src.score_store import SCORE_DB_NAME, ScoreStore
+from src.blob_store import EVAL_STORAGES, EvalRecordReader, get_blob_file_path
+from src.eval_index import EvalRecordWriter, load_eval_index
+from src.results_store import DEFAULT_ROW_GROUP_SIZE, check_results_format, open_results_writer
+from src.sampling import display_sampling_stats, get_samples, sample_key, summarize_samples
+from src.judge_voting import VoteStats, add_votes, is_decided, merge_vote_responses, new_votes, next_increment
 # api_executor는 필요할 때만 import (SIGSEGV 방지)
 # from src.api_executor import (
 #     OpenaiModelAzureAPI,
 #     OpenaiModelAPI
 # )
 from src.formatter import (
+    convert_eval_key,
     CommonResponseFormatter,
     DialogResponseFormatter,
     SingleCallResponseFormatter,
@@ -22,7 +60,7 @@ from src.evaluation_registor import (
     DialogEvaluationRegistor,
     SingleCallEvaluationRegistor
 )
-from src.constants import COMMON, SINGLECALL, DIALOG, CALL, COMPLETION, RELEVANCE, SLOT
+from src.constants import COMMON, SINGLECALL, DIALOG, CALL, COMPLETION, RELEVANCE, SLOT, PASS_STR, FAIL_STR
 from src.color import GREEN, RESET
 
 RESPONSE_FORMATTER_OBJ = {
@@ -37,6 +75,11 @@ EVAlUATION_REGISTOR_OBJ = {
     DIALOG: DialogEvaluationRegistor,
 }
 
+RUBRIC_LAYOUT_SUFFIX = {
+    'default': '',
+    'cache': '_cache',
+}
+
 CUR_PATH = os.path.dirname(os.path.abspath(__file__))
 REPO_PATH = '/'.join(CUR_PATH.split('/')[:-1])
 
@@ -61,16 +104,75 @@ class EvaluationHandler:
             eval_reg (object): An instance of the evaluation register object for storing and managing evaluation results.
         """
         self.evaluation_type = evaluation_type
-        # load prompt
-        self.rubric_prompts = self.get_rubric_prompts()
         cfg = json.loads(open(f'{REPO_PATH}/config/openai.cfg', 'r').read())
+        # load prompt (rubric_layout: default | cache)
+        self.rubric_layout = cfg.get('rubric_layout', 'default')
+        self.rubric_prompts = self.get_rubric_prompts(self.rubric_layout)
+        # verdict_format: text(기본, 자유 서술 후 pass/fail) | json (response_format 으로 {verdict, error_type, reason} 강제)
+        self.verdict_format = cfg.get('verdict_format', 'text')
+        if self.verdict_format == 'json':
+            self.rubric_prompts = {k: to_json_verdict_rubric(v) for k, v in self.rubric_prompts.items()}
         self.temperature = float(cfg.get('temperature'))
         self.n = int(cfg.get('n', 1) or 1)
+        # vote_max > 1 이면 judge 샘플을 조금씩 요청해 과반이 정해지는 즉시 멈추는 다수결 채점 (기본: n)
+        self.vote_max = int(cfg.get('vote_max', self.n) or 1)
+        self.vote_stats = VoteStats()
         self.openai_model = cfg['api_version']
         # api_key는 placeholder(${ENV})일 수 있으므로 먼저 resolve 후 executor에 주입
         self.openai_apikey = self._resolve_api_key(cfg.get('api_key'))
-        self.executor = self.load_api_executor(cfg, api_key=self.openai_apikey)
+        # judge_pool: 여러 key/endpoint 에 rpm/tpm budget 기준으로 분산, 429/401/402/403 시 다른 member 로 failover
+        if cfg.get('judge_pool'):
+            self.executor = self.load_judge_pool(cfg)
+        else:
+            self.executor = self.load_api_executor(cfg, api_key=self.openai_apikey)
+        self.judge_concurrency = int(cfg.get('judge_concurrency', len(cfg.get('judge_pool') or []) or 1))
+        self.stats_lock = threading.RLock()
+        # 모든 judge (pool member) 호출이 실패해 채점하지 못한 item 수 (eval file / 점수에서 빠지고 재실행 시 다시 채점)
+        self.unjudged = 0
         self.max_tokens = cfg['max_tokens']
+        if self.verdict_format == 'json':
+            self.max_tokens = int(cfg.get('verdict_max_tokens', JSON_VERDICT_MAX_TOKENS))
+        # judge prompt 모드: full(기본) | compact (참조 tool만, history 요약, think 블록 제거)
+        self.prompt_mode = cfg.get('prompt_mode', 'full')
+        self.prompt_compactor = JudgePromptCompactor(history_size=int(cfg.get('compact_history_size', 6)))
+        # pack_size > 1 이면 같은 type_of_output/tools 의 item 여러 개를 한 번의 judge 요청으로 채점 (stream 모드)
+        self.pack_size = int(cfg.get('pack_size', 1) or 1)
+        self.pack_prompt = self.get_pack_prompt() if self.pack_size > 1 else None
+        # cascade_judge: 저렴한 1차 judge 모델. 확신도가 cascade_threshold 미만인 판정만 api_version(strong) judge 로 escalate
+        self.cascade_model = cfg.get('cascade_judge')
+        self.cascade_threshold = float(cfg.get('cascade_threshold', 0.9))
+        self.cascade_confidence = cfg.get('cascade_confidence', 'logprobs')
+        if self.cascade_confidence not in CONFIDENCE_SOURCES:
+            raise ValueError(f"Unsupported cascade confidence source: {self.cascade_confidence}")
+        self.cascade_executor = None
+        if self.cascade_model:
+            self.cascade_executor = self.load_api_executor(dict(cfg, api_version=self.cascade_model),
+                                                           api_key=self.openai_apikey)
+        self.cascade_stats = JudgeCascadeStats()
+        if self.pack_size > 1 and (self.cascade_model or self.vote_max > 1):
+            # 묶음 응답 하나에는 cascade 확신도 / 다수결을 적용할 수 없으므로 pack 채점을 끔
+            logging.warning(f"pack_size {self.pack_size} is ignored: packed judging does not support "
+                            f"cascade_judge or vote_max > 1")
+            self.pack_size = 1
+            self.pack_prompt = None
+        if self.pack_prompt and self.verdict_format == 'json':
+            self.pack_prompt = to_json_verdict_pack_prompt(self.pack_prompt)
+        # provisional_sample_size > 0 이면 batch 대기 중 층화 표본을 동기 채점해 신뢰구간과 함께 잠정 점수 저장
+        self.provisional_sample_size = int(cfg.get('provisional_sample_size', 0) or 0)
+        self.provisional_confidence = float(cfg.get('provisional_confidence', 0.95))
+        # 최종 점수의 각 pass rate 에 bootstrap 신뢰구간 추가 (0 이면 생략)
+        self.score_ci_resamples = int(cfg.get('score_ci_resamples', DEFAULT_RESAMPLES) or 0)
+        self.score_ci_confidence = float(cfg.get('score_ci_confidence', DEFAULT_CONFIDENCE))
+        # item 별 리포트 형식: tsv(기본, *.eval_report.tsv) | parquet (*.eval_results.parquet, pyarrow 필요)
+        self.results_format = cfg.get('results_format', 'tsv')
+        check_results_format(self.results_format)
+        self.results_row_group_size = int(cfg.get('results_row_group_size', DEFAULT_ROW_GROUP_SIZE))
+        # eval record 저장 방식: full(기본) | dedup (tools/messages/rubric 을 blob 파일에 한 번만 저장하고 hash 로 참조)
+        self.eval_storage = cfg.get('eval_storage', 'full')
+        if self.eval_storage not in EVAL_STORAGES:
+            raise ValueError(f"Unsupported eval_storage: {self.eval_storage}")
+        self.judge_usage = {'requests': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0, 'latency': 0.0}
+        self.run_started_at = None
         self.eval_reg = EVAlUATION_REGISTOR_OBJ[self.evaluation_type]()
         # 새로운 디렉토리 구조: score/ 사용
         # 프로젝트 루트의 score/ 디렉토리 사용
@@ -79,11 +181,23 @@ class EvaluationHandler:
         self.meta_log_file = os.path.join(score_dir, f".batch_meta_{self.evaluation_type}.jsonl")
         self.batch_file = os.path.join(score_dir, f".batch_{self.evaluation_type}.jsonl")
         self.batch_output_file = os.path.join(score_dir, f".batch_{self.evaluation_type}_result.jsonl")
+        self.batch_sample_file = os.path.join(score_dir, f".batch_sample_{self.evaluation_type}.jsonl")
+
+    def get_rubric_prompts(self, layout: str = 'default') -> dict:
+        """
+        Loads the rubric prompt of each type_of_output.
 
-    def get_rubric_prompts(self) -> dict:
+        Parameters:
+            layout (str): 'default' loads data/rubric_{type}.txt (per-item data first, criteria last).
+                          'cache' loads data/rubric_{type}_cache.txt, which puts the static criteria first,
+                          then the tools shared by a dialog and the per-turn data last,
+                          so that provider prompt caching can reuse the common prefix.
+        """
+        if layout not in RUBRIC_LAYOUT_SUFFIX:
+            raise ValueError(f"Unsupported rubric layout: {layout}")
         rubric_prompts = {}
         for output_type in [CALL, COMPLETION, RELEVANCE, SLOT]:
-            rubric_file_path = os.path.join(REPO_PATH, 'data', f'rubric_{output_type}.txt')
+            rubric_file_path = os.path.join(REPO_PATH, 'data', f'rubric_{output_type}{RUBRIC_LAYOUT_SUFFIX[layout]}.txt')
             if os.path.isfile(rubric_file_path):
                 try:
                     with open(rubric_file_path, "r", encoding="utf-8") as file:
@@ -92,6 +206,10 @@ class EvaluationHandler:
                     logging.warning(f"Error reading {rubric_file_path}: {e}")
         return rubric_prompts
 
+    def get_pack_prompt(self) -> str:
+        with open(os.path.join(REPO_PATH, 'data', 'rubric_pack.txt'), "r", encoding="utf-8") as file:
+            return file.read().strip()
+
     def load_api_executor(self, cfg: dict, api_key: Optional[str] = None):
         # 지연 import (SIGSEGV 방지)
         from src.api_executor import OpenaiModelAzureAPI, OpenaiModelAPI
@@ -116,6 +234,23 @@ class EvaluationHandler:
         else:
             raise ValueError(f"Unsupported evaluation API type: {api_type}")
 
+    def load_judge_pool(self, cfg: dict) -> JudgePoolExecutor:
+        """
+        Builds a judge pool from cfg['judge_pool']. Each member overrides the top-level keys
+        (api_type, api_key, api_base, api_version) and may set name, weight, rpm and tpm.
+        """
+        members = []
+        for idx, member_cfg in enumerate(cfg['judge_pool']):
+            member_cfg = dict(cfg, **member_cfg)
+            executor = self.load_api_executor(member_cfg)
+            # 429 도 member 내부에서 재시도하지 않고 바로 다른 member 로 넘김, 5xx / timeout 은 몇 번만 재시도
+            executor.no_retry_status_codes = FATAL_STATUS_CODES + RATE_LIMIT_STATUS_CODES
+            executor.max_retries = MEMBER_MAX_RETRIES
+            name = member_cfg.get('name') or f"{member_cfg.get('api_type')}:{member_cfg.get('api_base') or ''}#{idx}"
+            members.append(JudgePoolMember(name, executor, weight=member_cfg.get('weight', 1.0),
+                                           rpm=member_cfg.get('rpm'), tpm=member_cfg.get('tpm')))
+        return JudgePoolExecutor(members, cooldown=float(cfg.get('judge_pool_cooldown', DEFAULT_COOLDOWN)))
+
     def _resolve_api_key(self, api_key: Optional[str]) -> str:
         """
         config 값에 실키를 넣지 않도록, `${OPENAI_API_KEY}` 같은 placeholder를 지원합니다.
@@ -132,24 +267,54 @@ class EvaluationHandler:
             return tools
         return [{k: v for k, v in tool.items() if k != 'id'} for tool in tools]
 
-    def get_input_prompt(self, inp: dict, out: dict) -> str:
+    def get_prompt_sections(self, inp: dict, out: dict) -> dict:
+        """
+        Serializes the per-item sections (tools, query, ground_truth, acceptable_arguments, response) of a judge prompt.
+        """
         ground_truth = inp['ground_truth']
         ground_truth['tool_calls'] = self.clean_tool_calls(ground_truth.get('tool_calls', None))
         if out is None:
             out = {'tool_calls': []}
         else:
             out['tool_calls'] = self.clean_tool_calls(out.get('tool_calls', None))
+        if 'samples' in out:
+            # multi-sample 출력은 judge 에 채점 대상 샘플만 보여줌
+            out = {k: v for k, v in out.items() if k != 'samples'}
+        sections = {
+            'ground_truth': json_codec.dumps_text(ground_truth),
+            'acceptable_arguments': json_codec.dumps_text(inp.get('acceptable_arguments')),
+        }
+        if self.prompt_mode == 'compact':
+            compactor = self.prompt_compactor
+            compactor.set_dialog(inp['messages'])
+            referenced_names = compactor.referenced_tool_names(inp, ground_truth, out)
+            sections['tools'] = compactor.compact_tools(inp['tools'], referenced_names)
+            sections['query'] = compactor.compact_messages(inp['messages'])
+            sections['response'] = json_codec.dumps_text(compactor.compact_response(out))
+            # 전체 prompt 를 만들지 않고 memo 된 tool / message 별 token 수로 절감량을 추정
+            sections['saved_tokens'] = (compactor.get_saved_tokens(inp['tools'], referenced_names, inp['messages'])
+                                        + estimate_tokens(json_codec.dumps_text(out))
+                                        - estimate_tokens(sections['response']))
+        else:
+            sections['tools'] = json_codec.dumps_text(inp['tools'])
+            sections['query'] = json_codec.dumps_text(inp['messages'])
+            sections['response'] = json_codec.dumps_text(out)
+        return sections
+
+    def get_input_prompt(self, inp: dict, out: dict) -> str:
         output_type = inp['type_of_output']
         rubric_prompt = self.rubric_prompts.get(output_type)
         if not rubric_prompt:
             raise ValueError(f"Unsupported rubric prompt type: {output_type}")
-        tools = json.dumps(inp['tools'], ensure_ascii=False)
-        query = json.dumps(inp['messages'], ensure_ascii=False)
-        ground_truth_json = json.dumps(ground_truth, ensure_ascii=False)
-        response = json.dumps(out, ensure_ascii=False)
+        sections = self.get_prompt_sections(inp, out)
+        prompt = self._format_rubric(rubric_prompt, output_type, sections['tools'], sections['query'],
+                                     sections['ground_truth'], sections['acceptable_arguments'], sections['response'])
+        if self.prompt_mode == 'compact':
+            self.prompt_compactor.add_stats(prompt, sections['saved_tokens'])
+        return prompt
 
+    def _format_rubric(self, rubric_prompt, output_type, tools, query, ground_truth_json, acceptable_arguments, response):
         if output_type == CALL:
-            acceptable_arguments = json.dumps(inp['acceptable_arguments'], ensure_ascii=False)
             return rubric_prompt.format(
                 tools=tools, query=query,
                 ground_truth=ground_truth_json,
@@ -169,9 +334,9 @@ class EvaluationHandler:
         acceptable_arguments = inp.get('acceptable_arguments', None)
         if acceptable_arguments:
             try:
-                acceptable_arguments = json.loads(acceptable_arguments)
+                acceptable_arguments = json_codec.loads(acceptable_arguments)
             except Exception:
-                acceptable_arguments = json.loads(f'"{acceptable_arguments}"')
+                acceptable_arguments = json_codec.loads(f'"{acceptable_arguments}"')
         if acceptable_arguments is None:
             return {}
         if acceptable_arguments == "Only ground truth is allowed.":
@@ -181,7 +346,7 @@ class EvaluationHandler:
         if acceptable_arguments == "Since the user did not mention a specific year, it will fail if the date was created including the year in the submission.":
             return {}
         if isinstance(acceptable_arguments, str):
-            acceptable_arguments = json.loads(acceptable_arguments)
+            acceptable_arguments = json_codec.loads(acceptable_arguments)
         return acceptable_arguments
 
     def compare_arguments(self, g_func_args: str, p_func_args: str, acceptable_arguments: dict) -> bool:
@@ -193,8 +358,8 @@ class EvaluationHandler:
         try:
             if g_func_args is None or p_func_args is None:
                 return False
-            j_g_func_args = json.loads(g_func_args)
-            j_p_func_args = json.loads(p_func_args)
+            j_g_func_args = json_codec.loads(g_func_args)
+            j_p_func_args = json_codec.loads(p_func_args)
         except (json.JSONDecodeError, TypeError) as e:
             logging.error(f"Failed to parse JSON: {e}")
             return False
@@ -241,7 +406,8 @@ class EvaluationHandler:
         diff_case_msg = ""
 
         
-        if 'tool_calls' in ground_truth:
+        # get_prompt_sections 가 tool_calls 키를 None 으로 채울 수 있음 (multi-sample 재채점 시)
+        if ground_truth.get('tool_calls'):
             ground_truth_func = ground_truth.get('tool_calls', [{}])[0].get('function', {})
         else:
             ground_truth_func = ground_truth
@@ -283,7 +449,7 @@ class EvaluationHandler:
             return batch.id, batch.status
         return None, None
 
-    def _execute_batch_request(self, batch_file, debug=False):
+    def _execute_batch_request(self, batch_file, debug=False, on_submitted=None):
         import sys
         import itertools
         from openai import OpenAI
@@ -311,6 +477,9 @@ class EvaluationHandler:
         # Waiting
         batch = client.batches.retrieve(batch_id)
         print(f"\n\nbatch {GREEN}{batch_id}{RESET} status .. {batch.status}")
+        if batch.status != 'completed' and on_submitted is not None:
+            on_submitted()
+            batch = client.batches.retrieve(batch_id)
         if batch.status != 'completed':
             print(f"** If you want to check it yourself, click here. https://platform.openai.com/batches/{batch_id}")
             spinner = itertools.cycle(['～o(▽｀ o)         ', '～o(▽｀ o) =3      ', '～o(▽｀ o) =3 =3   ', '～o(▽｀ o) =3 =3 =3'])
@@ -329,42 +498,344 @@ class EvaluationHandler:
         batch_result = []
         with open(self.batch_output_file, "r") as file:
             for line in file.readlines():
-                batch_result.append(json.loads(line.strip()))
+                batch_result.append(json_codec.loads(line))
         if len(batch_result) == 0:
             raise Exception(f"batch result is empty. check your batch output : https://platform.openai.com/batches/{batch_id}")
         return batch_result
 
-    def fetch(self, inp, out, debug=False):
-        input_prompt = self.get_input_prompt(inp, out)
-        messages = [{'role': 'user', 'content': input_prompt}]
-        evaluate_response = self.executor.predict({
+    def _predict_judge(self, executor, input_prompt: str, response_format: Optional[dict] = None,
+                       n: Optional[int] = None, logprobs: bool = False) -> tuple[dict, float]:
+        start_time = time.time()
+        evaluate_response = executor.predict({
             'temperature': self.temperature,
-            'messages': messages,
-            'n': self.n,
+            'messages': [{'role': 'user', 'content': input_prompt}],
+            'n': self.n if n is None else n,
             'max_tokens': self.max_tokens,
+            'response_format': response_format,
+            'logprobs': logprobs,
         })
+        latency = time.time() - start_time
+        self.add_judge_usage(evaluate_response, latency)
+        self.attach_verdict(evaluate_response)
+        evaluate_response['latency'] = latency
+        return evaluate_response, latency
+
+    def _predict_strong(self, input_prompt: str) -> tuple[dict, float]:
+        """
+        Grades a judge prompt with the (strong) judge. With vote_max > 1, samples are requested in small increments
+        (n) until one verdict holds a majority of vote_max, and the vote split is recorded in evaluate_response['votes'].
+        """
+        if self.vote_max <= 1:
+            return self._predict_judge(self.executor, input_prompt, self.get_response_format())
+        votes, responses, latency = new_votes(self.vote_max), [], 0.0
+        while not is_decided(votes):
+            evaluate_response, elapsed = self._predict_judge(self.executor, input_prompt, self.get_response_format(),
+                                                             n=next_increment(votes))
+            add_votes(votes, evaluate_response, self.verdict_format)
+            responses.append(evaluate_response)
+            latency += elapsed
+        with self.stats_lock:
+            self.vote_stats.add(votes)
+        evaluate_response = merge_vote_responses(responses, votes, self.verdict_format)
+        evaluate_response['latency'] = latency
+        return evaluate_response, latency
+
+    def tally_votes(self, evaluate_response: dict) -> dict:
+        """
+        Majority vote over all choices of a single judge response (batch mode requests vote_max choices at once).
+        """
+        if self.vote_max <= 1:
+            return evaluate_response
+        votes = add_votes(new_votes(self.vote_max), evaluate_response, self.verdict_format)
+        with self.stats_lock:
+            self.vote_stats.add(votes)
+        return merge_vote_responses([evaluate_response], votes, self.verdict_format)
+
+    def fetch(self, inp, out, debug=False):
+        with self.stats_lock:
+            input_prompt = self.get_input_prompt(inp, out)
+        if self.cascade_executor is not None:
+            evaluate_response = self.fetch_cascade(inp['type_of_output'], input_prompt)
+        else:
+            evaluate_response, _ = self._predict_strong(input_prompt)
         if debug is True:
             print(f"\nserial_num : {inp['serial_num']}")
             print(f'evaluate_request : {input_prompt}')
             print(f"evaluate_response : {evaluate_response['choices'][0]['message']['content']}\n")
         return evaluate_response, input_prompt
 
+    def fetch_cheap(self, input_prompt: str) -> tuple[dict, float, str, Optional[float]]:
+        """
+        Grades a judge prompt with the cheap (cascade) judge.
+
+        Returns:
+            tuple: (evaluate_response, latency, verdict, confidence). confidence is None when it cannot be determined.
+        """
+        if self.cascade_confidence == 'self':
+            evaluate_response, latency = self._predict_judge(
+                self.cascade_executor, with_self_confidence(input_prompt, self.verdict_format),
+                with_confidence_field(self.get_response_format()), n=1)
+        else:
+            evaluate_response, latency = self._predict_judge(
+                self.cascade_executor, input_prompt, self.get_response_format(), n=1, logprobs=True)
+        choices = evaluate_response.get('choices')
+        verdict = convert_eval_key(evaluate_response) if choices and choices[0]['message'].get('content') else None
+        if verdict not in [PASS_STR, FAIL_STR]:
+            return evaluate_response, latency, verdict, None
+        if self.cascade_confidence == 'self':
+            confidence = self_confidence(evaluate_response['choices'][0]['message'].get('content'))
+        else:
+            confidence = logprob_confidence(evaluate_response, verdict, first=self.verdict_format == 'json')
+        return evaluate_response, latency, verdict, confidence
+
+    def fetch_cascade(self, output_type: str, input_prompt: str) -> dict:
+        """
+        Two-tier judging: the cheap judge grades first, and only verdicts whose confidence is below
+        cascade_threshold (or that cannot be parsed) are escalated to the strong judge.
+        The cascade decision is recorded in evaluate_response['cascade'].
+        """
+        cheap_response, cheap_latency, cheap_verdict, confidence = self.fetch_cheap(input_prompt)
+        cascade = {'judge': self.cascade_model, 'verdict': cheap_verdict, 'confidence': confidence}
+        if confidence is not None and confidence >= self.cascade_threshold:
+            with self.stats_lock:
+                self.cascade_stats.add(output_type, cheap_response.get('usage'), cheap_latency)
+            cheap_response['cascade'] = dict(cascade, tier='cheap')
+            return cheap_response
+        strong_response, strong_latency = self._predict_strong(input_prompt)
+        agree = convert_eval_key(strong_response) == cheap_verdict if cheap_verdict in [PASS_STR, FAIL_STR] else None
+        with self.stats_lock:
+            self.cascade_stats.add(output_type, cheap_response.get('usage'), cheap_latency,
+                                   strong_response.get('usage') or {}, strong_latency, agree)
+        strong_response['cascade'] = dict(cascade, tier='strong')
+        return strong_response
+
+    def _judge_items(self, items: list, debug: bool = False):
+        """
+        Judges the given stream items in place (sets 'evaluate_response' and 'input_prompt').
+        With pack_size > 1, items sharing type_of_output and tools are graded together in one judge request,
+        and any item whose verdict is missing or malformed falls back to single-item judging.
+        Items whose judge call failed on every judge (pool member) are marked 'unjudged' instead of failed.
+        """
+        remaining = items
+        if self.pack_size > 1 and len(items) > 1:
+            groups = {}
+            for item in items:
+                sections = self.get_prompt_sections(item['inp'], item['out'])
+                groups.setdefault((item['inp']['type_of_output'], sections['tools']), []).append((item, sections))
+            remaining = []
+            for (output_type, tools), group in groups.items():
+                for chunk_start in range(0, len(group), self.pack_size):
+                    chunk = group[chunk_start:chunk_start + self.pack_size]
+                    if len(chunk) == 1:
+                        remaining.append(chunk[0][0])
+                        continue
+                    try:
+                        results = self.fetch_packed(output_type, tools, [sections for _, sections in chunk], debug=debug)
+                    except Exception as e:
+                        logging.error(f"Packed judge call failed (fallback to single): {type(e).__name__}: {str(e)[:200]}")
+                        results = [None] * len(chunk)
+                    for (item, _), result in zip(chunk, results):
+                        if result is None:
+                            remaining.append(item)
+                        else:
+                            item['evaluate_response'], item['input_prompt'] = result
+        if self.judge_concurrency > 1 and len(remaining) > 1:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.judge_concurrency) as executor:
+                list(executor.map(lambda item: self._fetch_item(item, debug), remaining))
+        else:
+            for item in remaining:
+                self._fetch_item(item, debug)
+
+    def _fetch_item(self, item: dict, debug: bool = False):
+        try:
+            item['evaluate_response'], item['input_prompt'] = self.fetch(item['inp'], item['out'], debug=debug)
+        except Exception as e:
+            # judge API가 402/429 등으로 막혀도 나머지 평가는 계속하되, 모델의 fail 로 기록하지 않고 미채점으로 남김
+            logging.error(f"Judge call failed at idx={item['idx']} (unjudged): {type(e).__name__}: {str(e)[:200]}")
+            with self.stats_lock:
+                self.unjudged += 1
+            item['unjudged'] = True
+
+    def _evaluate_samples(self, items: list, only_exact: bool = False, debug: bool = False):
+        """
+        Grades the extra samples of multi-sample outputs (out['samples'], see --num_samples).
+        Each unique sample of an item is exact-matched / judged once (the first sample reuses the item's own verdict),
+        and the per-sample verdicts are stored in evaluate_response['samples'].
+        """
+        pending_items = []
+        for item in items:
+            if not item.get('unjudged'):
+                pending_items.extend(self._prepare_samples(item, only_exact=only_exact))
+        self._judge_items([sample_item for sample_item in pending_items if sample_item['need_judge']], debug=debug)
+        for item in items:
+            if 'sample_keys' in item and not self._attach_samples(item, item['evaluate_response']):
+                # 샘플 하나라도 채점하지 못했으면 item 전체를 미채점으로 남김
+                item['unjudged'] = True
+
+    def _prepare_samples(self, item: dict, only_exact: bool = False) -> list:
+        """
+        Exact-matches the unique extra samples of a multi-sample output (the first sample is the item itself),
+        and returns them as sample items (with 'need_judge') to be judged before _attach_samples.
+        """
+        samples = get_samples(item['out'])
+        if len(samples) <= 1:
+            return []
+        keys = [sample_key(sample) for sample in samples]
+        unique = {keys[0]: None}
+        for key, sample in zip(keys, samples):
+            if key in unique:
+                continue
+            is_pass_bool, evaluate_response, input_prompt = self.exact_match(item['inp'], sample)
+            unique[key] = {
+                'idx': item['idx'], 'inp': item['inp'], 'out': sample,
+                'need_judge': not (only_exact or is_pass_bool),
+                'evaluate_response': evaluate_response,
+                'input_prompt': input_prompt,
+            }
+        item['sample_keys'], item['sample_unique'] = keys, unique
+        return [sample_item for sample_item in unique.values() if sample_item is not None]
+
+    def _attach_samples(self, item: dict, evaluate_response: dict) -> bool:
+        """
+        Stores the per-sample verdicts of a prepared item (see _prepare_samples) in evaluate_response['samples'].
+
+        Returns:
+            bool: False if a sample is unjudged (nothing is stored).
+        """
+        keys, unique = item.pop('sample_keys'), item.pop('sample_unique')
+        if any(sample_item is not None and sample_item.get('unjudged') for sample_item in unique.values()):
+            return False
+        verdicts = {key: convert_eval_key(evaluate_response if sample_item is None
+                                          else sample_item['evaluate_response'])
+                    for key, sample_item in unique.items()}
+        groups = list(unique.keys())
+        evaluate_response['samples'] = {
+            'k': len(keys),
+            'unique': len(unique),
+            'groups': [groups.index(key) for key in keys],
+            'verdicts': [verdicts[key] for key in keys],
+        }
+        return True
+
+    def get_sampling_stats(self) -> dict:
+        """
+        Returns pass@1, pass@k and self-consistency of multi-sample outputs per report group.
+        """
+        return summarize_samples(self.eval_reg.get_sample_records())
+
+    def get_packed_prompt(self, output_type: str, tools: str, sections_list: list) -> str:
+        criterion = extract_criterion(self.rubric_prompts[output_type])
+        item_prompts = []
+        for item_num, sections in enumerate(sections_list, 1):
+            item_prompt = f"[Item {item_num}]\n[Query]:\n{sections['query']}\n\n[Ground Truth]:\n{sections['ground_truth']}\n\n"
+            if output_type == CALL:
+                item_prompt += f"[Acceptable Arguments]:\n{sections['acceptable_arguments']}\n\n"
+            item_prompt += f"[Submission]:\n{sections['response']}"
+            item_prompts.append(item_prompt)
+        return self.pack_prompt.format(size=len(sections_list), criterion=criterion, tools=tools,
+                                       items='\n***\n'.join(item_prompts))
+
+    def fetch_packed(self, output_type: str, tools: str, sections_list: list, debug: bool = False) -> list:
+        """
+        Grades several items of the same type_of_output (and tools) with one judge request.
+
+        Returns:
+            list: (evaluate_response, input_prompt) per item, or None for items whose verdict is missing or malformed.
+        """
+        input_prompt = self.get_packed_prompt(output_type, tools, sections_list)
+        if self.prompt_mode == 'compact':
+            with self.stats_lock:
+                self.prompt_compactor.add_stats(input_prompt, sum(sections['saved_tokens'] for sections in sections_list),
+                                                items=len(sections_list))
+        start_time = time.time()
+        packed_response = self.executor.predict({
+            'temperature': self.temperature,
+            'messages': [{'role': 'user', 'content': input_prompt}],
+            'n': 1,
+            'max_tokens': self.max_tokens * len(sections_list),
+            'response_format': PACKED_VERDICTS_RESPONSE_FORMAT if self.verdict_format == 'json' else None,
+        })
+        latency = time.time() - start_time
+        self.add_judge_usage(packed_response, latency)
+        content = packed_response['choices'][0]['message']['content'] if packed_response.get('choices') else None
+        verdicts = parse_packed_verdicts(content, len(sections_list))
+        if debug is True:
+            print(f"packed evaluate_request : {input_prompt}")
+            print(f"packed evaluate_response : {content}\n")
+        results = []
+        for item_num, verdict in enumerate(verdicts, 1):
+            if verdict is None:
+                results.append(None)
+                continue
+            evaluate_response = {k: v for k, v in packed_response.items() if k not in ['choices', 'usage', 'content']}
+            # json verdict 모드에서는 단건 채점과 같은 {verdict, error_type, reason} 형태로 기록
+            if self.verdict_format == 'json':
+                item_content = json.dumps(verdict, ensure_ascii=False)
+            else:
+                item_content = f"{verdict['reason']}\n\n{verdict['verdict']}\n{verdict['verdict']}"
+            evaluate_response['choices'] = [{
+                'finish_reason': 'stop',
+                'index': 0,
+                'message': {'content': item_content, 'role': 'assistant'},
+            }]
+            evaluate_response['packed'] = {'size': len(sections_list), 'item': item_num}
+            evaluate_response['latency'] = latency
+            evaluate_response['verdict'] = verdict
+            results.append((evaluate_response, input_prompt))
+        return results
+
+    def get_response_format(self) -> Optional[dict]:
+        return VERDICT_RESPONSE_FORMAT if self.verdict_format == 'json' else None
+
+    def attach_verdict(self, evaluate_response: dict) -> dict:
+        """
+        In json verdict mode, parses the judge output once and stores it as a typed 'verdict' field
+        ({'verdict', 'error_type', 'reason'}) so that pass/fail no longer has to be guessed from free text.
+        """
+        if self.verdict_format != 'json' or not evaluate_response.get('choices'):
+            return evaluate_response
+        verdict = parse_json_verdict(evaluate_response['choices'][0]['message'].get('content'))
+        if verdict is not None:
+            evaluate_response['verdict'] = verdict
+        return evaluate_response
+
+    def add_judge_usage(self, evaluate_response: dict, latency: float = 0.0):
+        """
+        Accumulates the token usage (including provider prompt-cache hits) and latency of a judge response.
+        """
+        usage = evaluate_response.get('usage') or {}
+        prompt_tokens_details = usage.get('prompt_tokens_details') or {}
+        with self.stats_lock:
+            self.judge_usage['requests'] += 1
+            self.judge_usage['prompt_tokens'] += usage.get('prompt_tokens') or 0
+            self.judge_usage['cached_tokens'] += prompt_tokens_details.get('cached_tokens') or 0
+            self.judge_usage['completion_tokens'] += usage.get('completion_tokens') or 0
+            self.judge_usage['latency'] += latency
+
     def load_cached_evaluation_result(self, eval_file_path, max_size):
+        """
+        Returns the compact index records of the cached evaluation results (see eval_index),
+        so the full judge prompts and responses are not reloaded.
+        """
         if utils.is_exist_file(eval_file_path):
-            eval_output = utils.load_to_jsonl(eval_file_path)
-            if len(eval_output) == max_size:
-                print(f"[[already evaluate]] .. {len(eval_output)}/{max_size}\npath : {eval_file_path}")
-                return eval_output
+            index_records = load_eval_index(eval_file_path)
+            if len(index_records) == max_size:
+                print(f"[[already evaluate]] .. {len(index_records)}/{max_size}\npath : {eval_file_path}")
+                return index_records
             else:
-                print(f"[[continue .. {len(eval_output)}/{max_size}]]\n")
-                return eval_output
+                print(f"[[continue .. {len(index_records)}/{max_size}]]\n")
+                return index_records
         return []
 
-    def _process_exact_match(self, input_set, output_set, start_index):
+    def _process_exact_match(self, input_set, output_set, start_index, previous_records=None, reuse_map=None):
         from itertools import islice
         requests = islice(zip(input_set, output_set), start_index, None)
         outputs = []
-        for idx, (inp, out) in enumerate(tqdm(requests, desc="Processing exact eval")):
+        for idx, (inp, out) in enumerate(tqdm(requests, desc="Processing exact eval"), start_index):
+            if reuse_map and idx in reuse_map:
+                # 바뀌지 않은 item 은 이전 eval record 를 그대로 사용 (judge 대상에서 제외)
+                outputs.append((True, self.to_response_formatter(previous_records[reuse_map[idx]])))
+                continue
             if out is None:
                 out = {'tool_calls': []}
             inp['type_of_output'] = 'call' if self.evaluation_type == 'singlecall' else inp['type_of_output']
@@ -378,24 +849,80 @@ class EvaluationHandler:
             outputs.append((is_pass, response_formatter))
         return outputs
 
+    def to_response_formatter(self, record):
+        """
+        Rebuilds the response formatter of a stored eval record (its report cells are reused as they are).
+        """
+        return RESPONSE_FORMATTER_OBJ[self.evaluation_type](
+            request_model=record['model_request'],
+            response_model=record['model_response'],
+            evaluate_prompt=record['evaluate_prompt'],
+            evaluate_response=record['evaluate_response'],
+            report_arguments=record['report_arguments'],
+        )
+
+    def get_manifest_config(self, only_exact=False):
+        """
+        Returns what the eval records depend on besides the request and prediction of each item (see run_manifest):
+        the judge model, the rubrics and the judge settings.
+        """
+        return {
+            'kind': 'eval',
+            'evaluation_type': self.evaluation_type,
+            'only_exact': bool(only_exact),
+            'judge': self.openai_model,
+            'rubrics': {key: run_manifest.get_text_hash(prompt) for key, prompt in sorted(self.rubric_prompts.items())},
+            'pack_prompt': run_manifest.get_text_hash(self.pack_prompt),
+            'verdict_format': self.verdict_format,
+            'prompt_mode': self.prompt_mode,
+            'compact_history_size': self.prompt_compactor.history_size,
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens,
+            'n': self.n,
+            'vote_max': self.vote_max,
+            'pack_size': self.pack_size,
+            'cascade_judge': self.cascade_model,
+            'cascade_threshold': self.cascade_threshold if self.cascade_model else None,
+            'cascade_confidence': self.cascade_confidence if self.cascade_model else None,
+        }
+
+    def move_previous_eval_records(self, eval_file_path, manifest_config, input_hashes, reuse_map):
+        """
+        Moves the eval records (and their blob file) aside so that the run can rewrite them, and returns the new path.
+        The reused lines are recorded in the manifest of the moved file (see run_manifest.move_to_previous).
+        """
+        previous_file_path = run_manifest.move_to_previous(eval_file_path, manifest_config, input_hashes, reuse_map)
+        if os.path.isfile(get_blob_file_path(eval_file_path)):
+            os.replace(get_blob_file_path(eval_file_path), get_blob_file_path(previous_file_path))
+        return previous_file_path
+
+    def remove_previous_eval_records(self, eval_file_path):
+        blob_file_path = get_blob_file_path(run_manifest.get_previous_file_path(eval_file_path))
+        if os.path.isfile(blob_file_path):
+            os.remove(blob_file_path)
+        run_manifest.remove_previous(eval_file_path)
+
+    def open_eval_record_writer(self, eval_file_path, write_option):
+        # dedup 저장 시 judge prompt 는 rubric template hash + field 값으로 기록
+        templates = list(self.rubric_prompts.values()) + ([self.pack_prompt] if self.pack_prompt else [])
+        return EvalRecordWriter(eval_file_path, write_option, storage=self.eval_storage, templates=templates)
+
     def _finalize_evaluation(self, eval_file_path, eval_log_file_path, outputs, model_name, llm_judge_name, model_path, eval_subtype):
         write_option = 'w'
-        # update evaluate register
+        # save evaluate result (+ index) and update evaluate register
+        eval_raw_fw = self.open_eval_record_writer(eval_file_path, write_option)
+        eval_report_fw = open_results_writer(self.results_format, eval_log_file_path, eval_file_path, write_option,
+                                             self.results_row_group_size)
         for idx, response_formatter in outputs:
-            self.eval_reg.add_eval_output(response_formatter.to_dict())
+            record = response_formatter.to_dict()
+            self.eval_reg.add_index_record(eval_raw_fw.write(record))
+            eval_report_fw.write(response_formatter, record)
+        eval_raw_fw.close()
+        eval_report_fw.close()
         # show evaluate result
         self.eval_reg.display()
-        # save evaluate result
-        eval_raw_fw = open(eval_file_path, write_option)
-        eval_tsv_fw = open(eval_log_file_path, write_option)
-        if write_option == 'w':
-            title = response_formatter.get_tsv_title()
-            eval_tsv_fw.write(f"{title}\n")
-        for idx, response_formatter in outputs:
-            eval_raw_fw.write(f"{json.dumps(response_formatter.to_dict(), ensure_ascii=False)}\n")
-            eval_tsv_fw.write(f"{response_formatter.to_tsv().strip()}\n")
-        eval_raw_fw.close()
-        eval_tsv_fw.close()
+        self.display_judge_stats()
+        display_sampling_stats(self.get_sampling_stats())
 
         if os.path.isfile(self.meta_log_file):
             os.remove(self.meta_log_file)
@@ -403,46 +930,96 @@ class EvaluationHandler:
             os.remove(self.batch_file)
         if os.path.isfile(self.batch_output_file):
             os.remove(self.batch_output_file)
-        print(f"[[model evaluation file : {eval_log_file_path}]]")
+        if os.path.isfile(self.batch_sample_file):
+            os.remove(self.batch_sample_file)
+        print(f"[[model evaluation file : {eval_report_fw.file_path}]]")
 
         self._save_evaluation_result(model_name,llm_judge_name, model_path, eval_subtype)
         
 
-    def _create_batch_file(self, batch_file, outputs):
-        input_prompts = []
+    def _create_batch_file(self, batch_file, outputs, sample_items=()):
+        """
+        Writes the judge requests of the items that are not graded yet (and of the extra samples that need the judge,
+        see _prepare_batch_samples), and returns {custom_id: judge prompt}.
+        """
+        input_prompts = {}
+        requests = [(f"{self.evaluation_type}_{idx}", response_formatter.request_model, response_formatter.response_model)
+                    for idx, (is_pass, response_formatter) in enumerate(outputs) if not is_pass]
+        requests += [(sample_item['custom_id'], sample_item['inp'], sample_item['out'])
+                     for sample_item in sample_items if sample_item['need_judge']]
         # Ensure the directory for batch_file exists
         os.makedirs(os.path.dirname(batch_file), exist_ok=True)
         with open(batch_file, 'w') as fp:
-            for idx, (is_pass, response_formatter) in enumerate(tqdm(outputs, desc="Processing make batch file")):
-                inp = response_formatter.request_model
-                out = response_formatter.response_model
-                if not is_pass:
-                    custom_id = f"{self.evaluation_type}_{idx}"
-                    input_prompt = self.get_input_prompt(inp, out)
-                    messages = [{'role': 'user', 'content': input_prompt}]
-                    reformed_json = openai_utils.get_openai_batch_format(
-                        custom_id,
-                        self.openai_model,
-                        messages,
-                        self.max_tokens,
-                        n=self.n,
-                    )
-                    input_prompts.append(input_prompt)
-                    fp.write(json.dumps(reformed_json, ensure_ascii=False)+'\n')
+            for custom_id, inp, out in tqdm(requests, desc="Processing make batch file"):
+                input_prompt = self.get_input_prompt(inp, out)
+                messages = [{'role': 'user', 'content': input_prompt}]
+                reformed_json = openai_utils.get_openai_batch_format(
+                    custom_id,
+                    self.openai_model,
+                    messages,
+                    self.max_tokens,
+                    n=max(self.n, self.vote_max),
+                    response_format=self.get_response_format(),
+                )
+                input_prompts[custom_id] = input_prompt
+                fp.write(json_codec.dumps(reformed_json)+'\n')
         return input_prompts
+
+    def _prepare_batch_samples(self, outputs, indices, only_exact=False):
+        """
+        Exact-matches the unique extra samples of the multi-sample outputs at indices (the newly evaluated items).
+        The samples that need the judge are submitted in the batch with their own custom_id
+        (<evaluation_type>_<idx>_sample_<n>), and _attach_batch_samples stores the per-sample verdicts.
+
+        Returns:
+            tuple: (prepared items, sample items)
+        """
+        items, sample_items = [], []
+        for idx in indices:
+            response_formatter = outputs[idx][1]
+            item = {'idx': idx, 'inp': response_formatter.request_model, 'out': response_formatter.response_model}
+            item_samples = self._prepare_samples(item, only_exact=only_exact)
+            if not item_samples:
+                continue
+            for sample_num, sample_item in enumerate(item_samples, 1):
+                sample_item['custom_id'] = f"{self.evaluation_type}_{idx}_sample_{sample_num}"
+            items.append(item)
+            sample_items.extend(item_samples)
+        return items, sample_items
+
+    def _attach_batch_samples(self, outputs, items):
+        for item in items:
+            self._attach_samples(item, outputs[item['idx']][1].evaluate_response)
        
-    def _process_rubric_evaluation(self, outputs, is_batch=False):
+    def _process_rubric_evaluation(self, outputs, is_batch=False, on_submitted=None, sample_items=()):
         if is_batch:
-            input_prompts = self._create_batch_file(self.batch_file, outputs)
-            batch_result = self._execute_batch_request(self.batch_file)
-            # write_file
-            for input_prompt, data in zip(input_prompts, batch_result):
+            input_prompts = self._create_batch_file(self.batch_file, outputs, sample_items)
+            if not input_prompts:
+                # judge 할 item 이 없으면 (전부 exact match / 잠정 점수 표본으로 채점됨) batch 를 제출하지 않음
+                if on_submitted is not None:
+                    on_submitted()
+                return outputs
+            batch_result = self._execute_batch_request(self.batch_file, on_submitted=on_submitted)
+            # write_file (batch 결과의 순서는 요청 순서와 다를 수 있으므로 custom_id 로 매칭)
+            sample_items = {sample_item['custom_id']: sample_item for sample_item in sample_items}
+            for data in batch_result:
+                input_prompt = input_prompts.pop(data['custom_id'])
+                evaluate_response = self.tally_votes(self.attach_verdict(data['response']['body']))
+                self.add_judge_usage(data['response']['body'])
+                if data['custom_id'] in sample_items:
+                    sample_item = sample_items[data['custom_id']]
+                    sample_item['evaluate_response'], sample_item['input_prompt'] = evaluate_response, input_prompt
+                    continue
                 # custom_id = f"{self.evaluation_type}_{idx}"
                 idx = int(data['custom_id'].split('_')[-1])
                 response_formatter = outputs[idx][1]
                 response_formatter.evaluate_prompt = input_prompt
-                response_formatter.set_evaluate_response(data['response']['body'])
+                response_formatter.set_evaluate_response(evaluate_response)
                 outputs[idx] = (True, response_formatter)
+            if input_prompts:
+                # batch 결과에 없는 item 은 exact match 응답 (fail) 으로 남으므로 알림
+                logging.error(f"{len(input_prompts)} items are missing from the batch result "
+                              f"(e.g. {next(iter(input_prompts))}); they are recorded with their exact match result")
         else:
             for idx, (is_pass, response_formatter) in enumerate(tqdm(outputs, desc="Processing rubric eval")):
                 inp = response_formatter.request_model
@@ -458,7 +1035,102 @@ class EvaluationHandler:
                     outputs[idx] = (True, response_formatter)
         return outputs
 
-    def _save_evaluation_result(self, model_name, llm_judge_name, model_path, eval_subtype):
+    def get_report_group(self, inp: dict) -> str:
+        """
+        Returns the group an item is scored under (tools_type for singlecall, category for common, type_of_output for dialog).
+        """
+        if self.evaluation_type == SINGLECALL:
+            return str(inp.get('tools_type'))
+        if self.evaluation_type == COMMON:
+            return str(inp.get('category'))
+        return str(inp.get('type_of_output'))
+
+    def load_provisional_sample(self, outputs):
+        """
+        Returns the sample items judged before the batch was submitted (see _judge_provisional_sample),
+        or None if there are none or they do not belong to these outputs.
+        """
+        if not os.path.isfile(self.batch_sample_file):
+            return None
+        with open(self.batch_sample_file, 'r', encoding='utf-8') as f:
+            items = [json_codec.loads(line) for line in f if line.strip()]
+        for item in items:
+            if (item['idx'] >= len(outputs) or outputs[item['idx']][0]
+                    or str(outputs[item['idx']][1].request_model.get('serial_num')) != item['serial_num']):
+                print(f"[[provisional score]] ignoring {self.batch_sample_file}: it does not match the current items")
+                return None
+        return items
+
+    def save_provisional_sample(self, items):
+        """
+        Writes the judged sample items next to the batch meta file, so a rerun that waits on the submitted batch
+        (which does not contain them) restores their verdicts instead of recording their exact match result.
+        """
+        with open(self.batch_sample_file, 'w', encoding='utf-8') as f:
+            for item in items:
+                if item.get('unjudged'):
+                    continue
+                f.write(json_codec.dumps({
+                    'idx': item['idx'],
+                    'serial_num': str(item['inp'].get('serial_num')),
+                    'input_prompt': item['input_prompt'],
+                    'evaluate_response': item['evaluate_response'],
+                }) + '\n')
+
+    def _judge_provisional_sample(self, outputs, saved_items=None, debug=False):
+        """
+        Called before the batch file is created. Synchronously judges a stratified sample (by report group) of the
+        items that need the judge and estimates the score with confidence intervals.
+        The judged items keep their verdicts in outputs, so they are not submitted (and paid for) again in the batch.
+        With saved_items (a rerun, see load_provisional_sample), their verdicts are restored instead of judged again.
+        """
+        strata, judge_indices = {}, {}
+        for idx, (is_pass, response_formatter) in enumerate(outputs):
+            group = self.get_report_group(response_formatter.request_model)
+            row = strata.setdefault(group, {'total': 0, 'exact_pass': 0, 'judge': 0, 'sampled': 0, 'sample_pass': 0})
+            row['total'] += 1
+            if is_pass:
+                row['exact_pass'] += 1
+            else:
+                row['judge'] += 1
+                judge_indices.setdefault(group, []).append(idx)
+        if saved_items is not None:
+            items = [dict(item, group=self.get_report_group(outputs[item['idx']][1].request_model))
+                     for item in saved_items]
+            print(f"[[provisional score]] restored the verdicts of {len(items)} sample items judged before the batch")
+        else:
+            sampled = stratified_sample(judge_indices, self.provisional_sample_size)
+            items = []
+            for group, indices in sampled.items():
+                for idx in indices:
+                    response_formatter = outputs[idx][1]
+                    items.append({'idx': idx, 'group': group, 'evaluate_response': None, 'input_prompt': '',
+                                  'inp': response_formatter.request_model, 'out': response_formatter.response_model})
+            print(f"[[provisional score]] judging a stratified sample of {len(items)} items before the batch is submitted")
+            self._judge_items(items, debug=debug)
+            self.save_provisional_sample(items)
+        for item in items:
+            if item.get('unjudged'):
+                continue
+            row = strata[item['group']]
+            row['sampled'] += 1
+            row['sample_pass'] += int(convert_eval_key(item['evaluate_response']) == PASS_STR)
+            response_formatter = outputs[item['idx']][1]
+            response_formatter.evaluate_prompt = item['input_prompt']
+            response_formatter.set_evaluate_response(item['evaluate_response'])
+            outputs[item['idx']] = (True, response_formatter)
+        return estimate_score(strata, self.provisional_confidence)
+
+    def _save_provisional_result(self, estimate, model_name, llm_judge_name, model_path, eval_subtype):
+        """
+        Called while the batch job is pending. Writes the provisional score (in the score format of the eval type,
+        with confidence intervals) to eval_score.json. The final score overwrites it when the batch completes.
+        """
+        display_estimate(estimate, self.provisional_confidence)
+        score = to_score_dict(estimate, self.provisional_confidence, type(self.eval_reg)())
+        self._save_evaluation_result(model_name, llm_judge_name, model_path, eval_subtype, score=score)
+
+    def _save_evaluation_result(self, model_name, llm_judge_name, model_path, eval_subtype, score=None):
         # 새로운 디렉토리 구조: score/ 사용 (프로젝트 루트)
         project_root = os.path.dirname(REPO_PATH)
         score_dir = os.path.join(project_root, 'score')
@@ -471,54 +1143,81 @@ class EvaluationHandler:
         utils.create_directory(model_score_dir)
         
         eval_score_path = os.path.join(model_score_dir, f"FunctionChat-{model_name_clean}.eval_score.json")
-        
-        singlecall_score = {}
-        dialog_score = {}
-        calldecision_score = {}
-        common_score = {}
-        if os.path.isfile(eval_score_path):
-            with open(eval_score_path, 'r', encoding='utf-8') as f:
-                try:
-                    total_score = json.load(f)
-                    singlecall_score = total_score.get('singlecall_score', {})
-                    dialog_score = total_score.get('dialog_score', {})
-                    calldecision_score = total_score.get('calldecision_score', {})
-                    common_score = total_score.get('common_score', {})
-                except Exception as e:
-                    print(f"Error loading evaluation score: {e}")
-                    singlecall_score = {}
-                    dialog_score = {}
-                    calldecision_score = {}
-                    common_score = {}
-        if self.evaluation_type == SINGLECALL:
-            singlecall_score = self.eval_reg.get_score()
-        elif self.evaluation_type == DIALOG:
-            dialog_score = self.eval_reg.get_score()
-        elif self.evaluation_type == COMMON:
-            if eval_subtype == 'CallDecision':
-                calldecision_score = self.eval_reg.get_score()
-            else:
-                common_score = self.eval_reg.get_score()
-        else:
+
+        # score 가 주어지면 (batch 대기 중 잠정 점수) registor 점수 대신 저장
+        current_score = self.eval_reg.get_score() if score is None else score
+        if score is None and self.score_ci_resamples > 0:
+            current_score = add_score_ci(current_score, self.eval_reg.get_score_counts(),
+                                         n_resamples=self.score_ci_resamples, confidence=self.score_ci_confidence)
+        if self.evaluation_type not in [SINGLECALL, DIALOG, COMMON]:
             raise ValueError(f"Unsupported evaluation type: {self.evaluation_type}")
-        
-        fcb_version, fcb_environments = utils.get_git_info()
 
-        with open(eval_score_path, 'w', encoding='utf-8') as f:
-            total_score = {
-                'fcb_version': fcb_version,
-                'fcb_environments': fcb_environments,
+        fcb_version, fcb_environments = utils.get_git_info()
+        finished_at = time.time()
+        started_at = self.run_started_at or finished_at
+        # 여러 평가(dialog/singlecall/common)가 병렬로 저장해도 섹션이 유실되지 않도록
+        # score store(SQLite WAL)에 트랜잭션으로 저장하고 eval_score.json 은 그 export 로 다시 씀
+        ScoreStore(os.path.join(score_dir, SCORE_DB_NAME)).save(
+            model_name_clean,
+            eval_subtype.lower(),
+            current_score,
+            judge_stats=self.get_judge_stats(),
+            sampling_stats=self.get_sampling_stats(),
+            metadata={
                 'llm_judge_model': llm_judge_name,
                 'target_model_path': str(model_path),
-                'singlecall_score': singlecall_score,
-                'dialog_score': dialog_score,
-                'calldecision_score': calldecision_score
-            }
-            if len(common_score) > 0:
-                total_score[f'{eval_subtype.lower()}_score'] = common_score
-            f.write(json.dumps(total_score, ensure_ascii=False, indent=4))
+                'fcb_version': fcb_version,
+                'fcb_environments': fcb_environments,
+                'started_at': started_at,
+                'finished_at': finished_at,
+                'elapsed': finished_at - started_at,
+            },
+            json_path=eval_score_path,
+        )
         print(f"[[evaluation scores saved to: {eval_score_path}]]")
 
+    def get_judge_stats(self) -> dict:
+        """
+        Returns the judge-side statistics of this run (e.g. compact prompt token savings).
+        """
+        judge_stats = {}
+        if self.prompt_mode == 'compact' and self.prompt_compactor.stats['items'] > 0:
+            judge_stats['compact_prompt'] = self.prompt_compactor.get_stats()
+        if self.judge_usage['requests'] > 0:
+            usage = dict(self.judge_usage)
+            usage['rubric_layout'] = self.rubric_layout
+            usage['cached_ratio'] = (usage['cached_tokens'] / usage['prompt_tokens']) if usage['prompt_tokens'] else 0.0
+            usage['avg_latency'] = usage['latency'] / usage['requests']
+            judge_stats['usage'] = usage
+        if self.cascade_executor is not None and self.cascade_stats.stats:
+            judge_stats['cascade'] = dict(self.cascade_stats.get_stats(), judge=self.cascade_model,
+                                          threshold=self.cascade_threshold, confidence=self.cascade_confidence)
+        if self.vote_stats.stats['items'] > 0:
+            judge_stats['votes'] = self.vote_stats.get_stats()
+        if isinstance(self.executor, JudgePoolExecutor):
+            judge_stats['pool'] = self.executor.get_stats()
+        if self.unjudged > 0:
+            judge_stats['unjudged'] = self.unjudged
+        return judge_stats
+
+    def display_judge_stats(self):
+        if self.prompt_mode == 'compact' and self.prompt_compactor.stats['items'] > 0:
+            self.prompt_compactor.display()
+        if self.judge_usage['requests'] > 0:
+            usage = self.get_judge_stats()['usage']
+            print(f"[[judge usage]] requests : {usage['requests']}, prompt tokens : {usage['prompt_tokens']} "
+                  f"(cached {usage['cached_tokens']}, {usage['cached_ratio']:.1%}), "
+                  f"completion tokens : {usage['completion_tokens']}, avg latency : {usage['avg_latency']:.2f}s")
+        if self.cascade_executor is not None and self.cascade_stats.stats:
+            self.cascade_stats.display()
+        if self.vote_stats.stats['items'] > 0:
+            self.vote_stats.display()
+        if isinstance(self.executor, JudgePoolExecutor):
+            self.executor.display()
+        if self.unjudged > 0:
+            print(f"[[unjudged]] {self.unjudged} judge calls failed on every judge; the evaluation stopped before "
+                  f"the first unjudged item, and is resumed from it when run again")
+
     def _set_batch_file_names(self, model_name=None):
         """
         배치 관련 파일 이름을 설정합니다.
@@ -537,20 +1236,22 @@ class EvaluationHandler:
             self.meta_log_file = os.path.join(score_dir, f".batch_meta_{self.evaluation_type}_{model_name_clean}.jsonl")
             self.batch_file = os.path.join(score_dir, f".batch_{self.evaluation_type}_{model_name_clean}.jsonl")
             self.batch_output_file = os.path.join(score_dir, f".batch_{self.evaluation_type}_{model_name_clean}_result.jsonl")
+            self.batch_sample_file = os.path.join(score_dir, f".batch_sample_{self.evaluation_type}_{model_name_clean}.jsonl")
         else:
             self.meta_log_file = os.path.join(score_dir, f".batch_meta_{self.evaluation_type}.jsonl")
             self.batch_file = os.path.join(score_dir, f".batch_{self.evaluation_type}.jsonl")
             self.batch_output_file = os.path.join(score_dir, f".batch_{self.evaluation_type}_result.jsonl")
+            self.batch_sample_file = os.path.join(score_dir, f".batch_sample_{self.evaluation_type}.jsonl")
 
     def evaluate(self, input_set, output_set, eval_file_path, eval_log_file_path, reset, sample,
                  debug=False, only_exact=False, model_name=None, llm_judge_name=None, model_path=None, is_batch=False,
-                 eval_subtype=None):
+                 eval_subtype=None, input_hashes=None):
         """
         Perform the evaluation based on input and output sets, and manage caching and logging of results.
 
         Parameters:
-            input_set (list): A list of input data for the model.
-            output_set (list): A list of expected output data corresponding to the input data.
+            input_set (list | JsonlReader): A list of input data for the model (read lazily from a JsonlReader).
+            output_set (list | JsonlReader): A list of expected output data corresponding to the input data.
             eval_file_path (str): File path where raw evaluation results are stored.
             eval_log_file_path (str): File path where formatted evaluation logs are stored.
             reset (bool): Whether to reset (overwrite) the existing evaluation results.
@@ -558,20 +1259,60 @@ class EvaluationHandler:
             debug (bool): If True, print detailed debug information during evaluation.
             model_name (str): Name of the model being evaluated.
             llm_judge_name (str): Name of the LLM judge used for evaluation.
+            input_hashes (list): per-item hashes of request + prediction (see run_manifest). Only new or changed
+                                 items are judged; the cached eval records of the other items are reused wherever
+                                 they are in the file. None keeps the line-count based resume.
         """
         if not eval_subtype:
             eval_subtype = self.evaluation_type
+        self.run_started_at = time.time()
         # check cached file
         self._set_batch_file_names(model_name)
         
-        self.eval_reg.set_eval_output(
-            self.load_cached_evaluation_result(eval_file_path, len(input_set)) if not reset else []
-        )
+        manifest_config = self.get_manifest_config(only_exact)
+        index_records = self.load_cached_evaluation_result(eval_file_path, len(input_set)) if not reset else []
+        if input_hashes is None:
+            reuse_map = {idx: idx for idx in range(min(len(index_records), len(input_set)))}
+        else:
+            reuse_map = run_manifest.get_reuse_map(eval_file_path, manifest_config, input_hashes, len(index_records))
+        previous_eval_file_path = None
+        if run_manifest.is_prefix(reuse_map, len(index_records), len(input_set)):
+            self.eval_reg.set_index_records(index_records)
+            reuse_map = {}
+            if input_hashes is not None:
+                # 중단된 재작성이 남긴 이전 eval record (x.prev.jsonl) 는 나머지 item 에도 그대로 옮겨 씀
+                reuse_map = run_manifest.get_previous_reuse_map(eval_file_path, manifest_config, input_hashes,
+                                                                len(index_records))
+            if reuse_map:
+                print(f"[[continue rewrite]] reuse {len(reuse_map)}/{len(input_set) - len(index_records)} "
+                      f"remaining evaluations")
+                previous_eval_file_path = run_manifest.get_previous_file_path(eval_file_path)
+        else:
+            # 새로 추가 / 변경된 item 만 채점하고, 나머지는 이전 eval record 를 (위치가 바뀌었어도) 옮겨 씀
+            # 점수는 합쳐진 전체 record 로 다시 집계
+            print(f"[[stale evaluations]] re-evaluate {len(input_set) - len(reuse_map)}/{len(input_set)}")
+            self.eval_reg.set_index_records([])
         eval_output_length = self.eval_reg.get_eval_output_length()
         if eval_output_length == len(input_set):
+           if input_hashes is not None and not run_manifest.is_fresh(eval_file_path, manifest_config, input_hashes):
+               run_manifest.save_manifest(eval_file_path, manifest_config, input_hashes)
+           self.remove_previous_eval_records(eval_file_path)
            self.eval_reg.display()
            self._save_evaluation_result(model_name, llm_judge_name, model_path, eval_subtype)
            return
+        cached_outputs = []
+        if is_batch and eval_output_length > 0:
+            self.eval_reg.set_index_records([])
+            if previous_eval_file_path is None:
+                # batch 모드는 전체 결과를 한 번에 다시 쓰므로, 이어서 할 때도 저장된 앞부분을 재사용 item 으로 옮김
+                reuse_map = {idx: idx for idx in range(eval_output_length)}
+                eval_output_length = 0
+            else:
+                # 중단된 재작성을 이어서 하면 x.prev 를 덮어쓰지 않도록 저장된 앞부분은 메모리로 읽어 둠
+                current_records = EvalRecordReader(eval_file_path)
+                cached_outputs = [(True, self.to_response_formatter(current_records[idx]))
+                                  for idx in range(eval_output_length)]
+                current_records.close()
         # start evaluation
         start_time = time.time()
         if debug:
@@ -580,76 +1321,122 @@ class EvaluationHandler:
         if sample:
             # TODO : sample 1개만 실행하고 파일에 저장하게 작업 추가
             return
+        if eval_output_length == 0:
+            run_manifest.remove_manifest(eval_file_path)
+        if reuse_map and previous_eval_file_path is None:
+            previous_eval_file_path = self.move_previous_eval_records(eval_file_path, manifest_config, input_hashes,
+                                                                      reuse_map)
 
         # 비배치 모드에서 429 등으로 중간 실패해도 재개(resume) 가능하도록
         # 결과를 1개씩 즉시 파일에 append 합니다.
+        previous_records = EvalRecordReader(previous_eval_file_path) if previous_eval_file_path else None
+        stopped = False
         if not is_batch:
-            write_option = 'a' if (not reset and os.path.isfile(eval_file_path)) else 'w'
-            eval_raw_fw = open(eval_file_path, write_option)
-            eval_tsv_fw = open(eval_log_file_path, write_option)
-            wrote_header = os.path.isfile(eval_log_file_path) and write_option == 'a'
+            write_option = 'a' if (eval_output_length > 0 and os.path.isfile(eval_file_path)) else 'w'
+            # parquet 리포트는 재개 시 기존 eval record 를 먼저 옮겨 쓰므로 EvalRecordWriter 보다 먼저 연다
+            eval_report_fw = open_results_writer(self.results_format, eval_log_file_path, eval_file_path,
+                                                 write_option, self.results_row_group_size)
+            eval_raw_fw = self.open_eval_record_writer(eval_file_path, write_option)
 
             try:
-                for idx in tqdm(range(eval_output_length, len(input_set)), desc="Processing eval (stream)"):
-                    inp = input_set[idx]
-                    out = output_set[idx]
-                    if out is None:
-                        out = {'tool_calls': []}
-                    # singlecall은 CALL 평가로 통일
-                    inp['type_of_output'] = 'call' if self.evaluation_type == SINGLECALL else inp.get('type_of_output')
-
-                    is_pass_bool, evaluate_response, input_prompt = self.exact_match(inp, out)
-
-                    # exact match 통과 or only_exact면 judge 호출 없이 기록
-                    if only_exact or is_pass_bool:
-                        response_formatter = RESPONSE_FORMATTER_OBJ[self.evaluation_type](
-                            request_model=inp,
-                            response_model=out,
-                            evaluate_prompt=input_prompt,
-                            evaluate_response=evaluate_response
-                        )
-                    else:
-                        # rubric judge
-                        try:
-                            evaluate_response, input_prompt = self.fetch(inp, out, debug=debug)
-                        except Exception as e:
-                            # judge API가 402/429 등으로 막혀도 전체 평가/엑셀 생성이 가능하도록 스킵 처리
-                            logging.error(f"Judge call failed at idx={idx} (skip): {type(e).__name__}: {str(e)[:200]}")
-                            evaluate_response = self._default_evaluate_response(
-                                message=f"skip evaluation (judge_error: {type(e).__name__})",
-                                exact="fail",
+                # window 단위로 모아서 (pack / judge_concurrency 만큼 병렬로) judge 하되, 기록은 항상 index 순서대로 append
+                window_size = max(self.judge_concurrency, self.pack_size * PACK_WINDOW_FACTOR if self.pack_size > 1 else 1)
+                written = eval_output_length
+                pbar = tqdm(total=len(input_set) - eval_output_length - len(reuse_map), desc="Processing eval (stream)")
+                for window_start in range(eval_output_length, len(input_set), window_size):
+                    items = []
+                    for idx in range(window_start, min(window_start + window_size, len(input_set))):
+                        if idx in reuse_map:
+                            items.append({'idx': idx, 'record': previous_records[reuse_map[idx]]})
+                            continue
+                        inp = input_set[idx]
+                        out = output_set[idx]
+                        if out is None:
+                            out = {'tool_calls': []}
+                        # singlecall은 CALL 평가로 통일
+                        inp['type_of_output'] = 'call' if self.evaluation_type == SINGLECALL else inp.get('type_of_output')
+                        is_pass_bool, evaluate_response, input_prompt = self.exact_match(inp, out)
+                        items.append({
+                            'idx': idx, 'inp': inp, 'out': out,
+                            # exact match 통과 or only_exact면 judge 호출 없이 기록
+                            'need_judge': not (only_exact or is_pass_bool),
+                            'evaluate_response': evaluate_response,
+                            'input_prompt': input_prompt,
+                        })
+                    eval_items = [item for item in items if 'record' not in item]
+                    # rubric judge
+                    self._judge_items([item for item in eval_items if item['need_judge']], debug=debug)
+                    # multi-sample 출력 (--num_samples > 1) 은 나머지 샘플도 채점 (중복 샘플은 1회)
+                    self._evaluate_samples(eval_items, only_exact=only_exact, debug=debug)
+
+                    for item in items:
+                        if item.get('unjudged'):
+                            # eval file 이 항상 input 의 앞부분이 되도록 첫 미채점 item 에서 멈춤 (재실행 시 여기부터 이어서 채점)
+                            stopped = True
+                            break
+                        if 'record' in item:
+                            response_formatter = self.to_response_formatter(item['record'])
+                        else:
+                            response_formatter = RESPONSE_FORMATTER_OBJ[self.evaluation_type](
+                                request_model=item['inp'],
+                                response_model=item['out'],
+                                evaluate_prompt=item['input_prompt'],
+                                evaluate_response=item['evaluate_response']
                             )
-                        response_formatter = RESPONSE_FORMATTER_OBJ[self.evaluation_type](
-                            request_model=inp,
-                            response_model=out,
-                            evaluate_prompt=input_prompt,
-                            evaluate_response=evaluate_response
-                        )
-                        is_pass_bool = True
-
-                    # header는 첫 줄에만
-                    if not wrote_header:
-                        eval_tsv_fw.write(f"{response_formatter.get_tsv_title()}\n")
-                        wrote_header = True
-
-                    # register + append
-                    self.eval_reg.add_eval_output(response_formatter.to_dict())
-                    eval_raw_fw.write(f"{json.dumps(response_formatter.to_dict(), ensure_ascii=False)}\n")
-                    eval_tsv_fw.write(f"{response_formatter.to_tsv().strip()}\n")
+
+                        # append (+ index) + register, 리포트 (tsv header 는 첫 줄에만)
+                        record = response_formatter.to_dict()
+                        self.eval_reg.add_index_record(eval_raw_fw.write(record))
+                        eval_report_fw.write(response_formatter, record)
+                        written += 1
                     eval_raw_fw.flush()
-                    eval_tsv_fw.flush()
+                    eval_report_fw.flush()
+                    pbar.update(len(eval_items))
+                    if stopped:
+                        break
+                pbar.close()
             finally:
                 eval_raw_fw.close()
-                eval_tsv_fw.close()
+                eval_report_fw.close()
 
             # 완료 후 표시/점수 저장
             self.eval_reg.display()
-            self._save_evaluation_result(model_name, llm_judge_name, model_path, eval_subtype)
+            self.display_judge_stats()
+            display_sampling_stats(self.get_sampling_stats())
+            if stopped:
+                # 일부 item 만으로 집계한 점수로 저장된 점수를 덮어쓰지 않음 (재실행으로 완료될 때 저장)
+                print(f"[[partial evaluation]] {written}/{len(input_set)} items evaluated, the score is not saved")
+            else:
+                self._save_evaluation_result(model_name, llm_judge_name, model_path, eval_subtype)
         else:
-            outputs = self._process_exact_match(input_set, output_set, eval_output_length)
+            outputs = cached_outputs + self._process_exact_match(input_set, output_set, eval_output_length,
+                                                                 previous_records, reuse_map)
+            # multi-sample 출력 (--num_samples > 1) 은 새로 평가하는 item 의 나머지 샘플도 batch 에 넣어 채점
+            sample_parents, sample_items = self._prepare_batch_samples(
+                outputs, [idx for idx in range(eval_output_length, len(outputs)) if idx not in reuse_map], only_exact)
             if not only_exact:
-                outputs = self._process_rubric_evaluation(outputs, is_batch)
+                on_submitted = None
+                # 표본 item 은 batch 에 들어 있지 않으므로, 이미 제출된 batch 를 기다리는 재실행이면 저장된 표본 판정을 복원
+                saved_items = self.load_provisional_sample(outputs) if is_batch else None
+                if saved_items is not None or (is_batch and self.provisional_sample_size > 0
+                                               and not os.path.isfile(self.meta_log_file)):
+                    estimate = self._judge_provisional_sample(outputs, saved_items, debug=debug)
+                    on_submitted = lambda: self._save_provisional_result(
+                        estimate, model_name, llm_judge_name, model_path, eval_subtype)
+                outputs = self._process_rubric_evaluation(outputs, is_batch, on_submitted=on_submitted,
+                                                          sample_items=sample_items)
+            self._attach_batch_samples(outputs, sample_parents)
             self._finalize_evaluation(eval_file_path, eval_log_file_path, outputs, model_name, llm_judge_name, model_path, eval_subtype)
+        if input_hashes is not None:
+            if not is_batch:
+                # manifest 에는 실제로 기록된 줄의 input hash 만 남김
+                input_hashes = input_hashes[:written]
+            run_manifest.save_manifest(eval_file_path, manifest_config, input_hashes)
+        if previous_records is not None:
+            previous_records.close()
+            if not stopped:
+                # 멈춘 경우 나머지 재사용 item 은 재실행 때 x.prev 에서 옮겨 씀 (run_manifest.get_previous_reuse_map)
+                self.remove_previous_eval_records(eval_file_path)
         elapsed_time = time.time() - start_time
         print(f"Total time execution: {elapsed_time:.2f} seconds")
         return
@@ -1,5 +1,6 @@
 from functools import wraps
-from src import formatter
+import numpy as np
+from src.eval_index import to_index_record
 from src.constants import PASS_STR, FAIL_STR, MAX_DIALOG_EVAL_SIZE
 
 
@@ -16,25 +17,101 @@ def validate_params(required_keys):
     return decorator
 
 
+class VerdictCounter:
+    """
+    Compact verdict counters per group (category, type_of_output or tools_type).
+    Counts are kept in a NumPy array indexed by (group code, verdict code), where groups and verdicts
+    are coded in order of first appearance, so memory depends only on the number of groups and verdicts.
+    """
+    def __init__(self):
+        self.group_codes = {}
+        self.verdict_codes = {}
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+        # group 별 verdict 최초 등장 순서 (singlecall display 출력 순서 유지용)
+        self.verdict_order = []
+
+    def add(self, group, verdict, count=1):
+        group_code = self.group_codes.get(group)
+        if group_code is None:
+            group_code = self.group_codes[group] = len(self.group_codes)
+            self.counts = np.vstack([self.counts, np.zeros((1, self.counts.shape[1]), dtype=np.int64)])
+            self.verdict_order.append([])
+        verdict_code = self.verdict_codes.get(verdict)
+        if verdict_code is None:
+            verdict_code = self.verdict_codes[verdict] = len(self.verdict_codes)
+            self.counts = np.hstack([self.counts, np.zeros((self.counts.shape[0], 1), dtype=np.int64)])
+        if self.counts[group_code, verdict_code] == 0:
+            self.verdict_order[group_code].append(verdict_code)
+        self.counts[group_code, verdict_code] += count
+
+    def get_groups(self):
+        return list(self.group_codes)
+
+    def get_column(self, verdict):
+        """
+        Returns the per group counts of a verdict (zeros if the verdict never appeared), in group code order.
+        """
+        verdict_code = self.verdict_codes.get(verdict)
+        if verdict_code is None:
+            return np.zeros(len(self.group_codes), dtype=np.int64)
+        return self.counts[:, verdict_code]
+
+    def get_group_counts(self, group):
+        """
+        Returns {verdict: count} of a group, in order of first appearance within the group.
+        """
+        verdicts = list(self.verdict_codes)
+        group_code = self.group_codes[group]
+        return {verdicts[code]: int(self.counts[group_code, code]) for code in self.verdict_order[group_code]}
+
+    def get_verdict_totals(self):
+        """
+        Returns {verdict: count} over every group, in order of first appearance.
+        """
+        totals = self.counts.sum(axis=0)
+        return {verdict: int(totals[code]) for verdict, code in self.verdict_codes.items()}
+
+
 class AbstractEvaluationRegistor:
     """
     An abstract base class for evaluation registers, designed to handle and store evaluation results.
     This class provides a template for creating specific evaluation register classes that implement
     customized display and additional data handling functionalities.
+
+    Each evaluation output is parsed once when it is added: its verdict is counted per score group
+    (see get_group) and per category, and the full output is not kept.
     """
     def __init__(self):
-        self.eval_dic = {}
-        self.eval_output = []
-        self.indexing_dic = {}
+        self.eval_output_length = 0
+        self.counter = VerdictCounter()
+        self.category_counter = VerdictCounter()
+        self.indexing_keys = set()
+        self.sample_records = []
+
+    def get_group(self, model_request):
+        """
+        Abstract method returning the score group (e.g. type_of_output) of an evaluation request / index record.
+        This method must be implemented by subclasses.
+
+        Raises:
+            NotImplementedError: If not implemented by a subclass.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def get_indexing_key(self, model_request):
+        """
+        Returns the key used to count each request only once in the score groups, or None to count every output.
+        """
+        return None
 
     def get_eval_output_length(self):
         """
-        Returns the number of evaluation outputs stored in the list.
+        Returns the number of evaluation outputs added to the register.
 
         Returns:
-            int: The length of the evaluation output list.
+            int: The number of evaluation outputs.
         """
-        return len(self.eval_output)
+        return self.eval_output_length
 
     def get_pass_count(self):
         """
@@ -43,11 +120,7 @@ class AbstractEvaluationRegistor:
         Returns:
             int: The total number of passing evaluations.
         """
-        pass_count = 0
-        for data in self.eval_output:
-            if formatter.convert_eval_key(data['evaluate_response']) == PASS_STR:
-                pass_count += 1
-        return pass_count
+        return int(self.category_counter.get_column(PASS_STR).sum())
 
     def get_pass_ratio(self):
         """
@@ -56,7 +129,7 @@ class AbstractEvaluationRegistor:
         Returns:
             float: The ratio of passing evaluations (0.0 to 1.0).
         """
-        total = len(self.eval_output)
+        total = self.eval_output_length
         if total == 0:
             return 0.0
         return self.get_pass_count() / total
@@ -69,41 +142,79 @@ class AbstractEvaluationRegistor:
             dict: A dictionary containing detailed scores for each category.
         """
         scores = {}
-        for data in self.eval_output:
-            category = data['model_request'].get('category', 'unknown')
-            if category not in scores:
-                scores[category] = {PASS_STR: 0, FAIL_STR: 0}
-            is_pass = formatter.convert_eval_key(data['evaluate_response'])
-            scores[category][is_pass] += 1
+        for category in self.category_counter.get_groups():
+            scores[category] = {PASS_STR: 0, FAIL_STR: 0}
+            scores[category].update(self.category_counter.get_group_counts(category))
         return scores
 
+    def get_sample_records(self):
+        """
+        Returns (score group, samples) of the multi-sample outputs, for pass@k / consistency metrics.
+        """
+        return self.sample_records
+
     def set_eval_output(self, eval_output):
         """
-        Sets the evaluation output list to a new list of outputs.
+        Replaces the registered evaluation outputs with a new list of outputs.
+
+        Parameters:
+            eval_output (list): A list of evaluation outputs to replace the existing ones.
+        """
+        self.set_index_records([to_index_record(output) for output in eval_output])
+
+    def set_index_records(self, index_records):
+        """
+        Replaces the registered evaluation outputs with the compact index records of a cached run (see eval_index).
+
+        Parameters:
+            index_records (list): index records (serial, subtype, verdict, error code).
+        """
+        self.__init__()
+        for index_record in index_records:
+            self.add_index_record(index_record)
+
+    def set_group_counts(self, group_counts):
+        """
+        Replaces the registered evaluation outputs with pass / fail counts per score group (e.g. an estimated score).
 
         Parameters:
-            eval_output (list): A list of evaluation outputs to replace the existing list.
+            group_counts (dict): score group -> (pass count, total).
         """
-        self.eval_output = eval_output
+        self.__init__()
+        for group, (pass_cnt, total) in group_counts.items():
+            for verdict, count in [(PASS_STR, pass_cnt), (FAIL_STR, total - pass_cnt)]:
+                if count > 0:
+                    self.counter.add(group, verdict, count)
+            self.eval_output_length += total
 
     def add_eval_output(self, output):
         """
-        Adds a single evaluation output to the end of the evaluation output list.
+        Parses the verdict of a single evaluation output and adds it to the counters.
 
         Parameters:
-            output (any): An evaluation result to be added to the list.
+            output (dict): An evaluation result (model_request / evaluate_response).
         """
-        self.eval_output.append(output)
+        self.add_index_record(to_index_record(output))
 
-    def add_eval_dic(self, **kwargs):
+    def add_index_record(self, index_record):
         """
-        Abstract method to add additional evaluation data to the eval_dic dictionary.
-        This method must be implemented by subclasses.
+        Adds the already parsed verdict of a single evaluation output to the counters.
 
-        Raises:
-            NotImplementedError: If not implemented by a subclass.
+        Parameters:
+            index_record (dict): index record (serial_num, type_of_output/tools_type/category, verdict, samples).
         """
-        raise NotImplementedError("Subclasses must implement this method.")
+        is_pass = index_record['verdict']
+        group = self.get_group(index_record)
+        self.eval_output_length += 1
+        self.category_counter.add(index_record.get('category', 'unknown'), is_pass)
+        key = self.get_indexing_key(index_record)
+        if key is None or key not in self.indexing_keys:
+            if key is not None:
+                self.indexing_keys.add(key)
+            self.counter.add(group, is_pass)
+        samples = index_record.get('samples')
+        if samples:
+            self.sample_records.append((str(group), samples))
 
     def display(self):
         """
@@ -120,67 +231,30 @@ class CommonEvaluationRegistor(AbstractEvaluationRegistor):
     def __init__(self):
         super().__init__()
         self.types_of_output = ['call', 'completion', 'slot', 'relevance']
-        self.eval_dic_per_category = {}
-
-    @validate_params(['type_of_output', 'is_pass', 'serial_num'])
-    def add_eval_dic(self, **kwargs):
-        type_of_output = kwargs.get('type_of_output')
-        is_pass = kwargs.get('is_pass')
-        serial_num = kwargs.get('serial_num')
-        if type_of_output not in self.eval_dic:
-            self.eval_dic[type_of_output] = {}
-        if is_pass not in self.eval_dic[type_of_output]:
-            self.eval_dic[type_of_output][is_pass] = []
-        self.eval_dic[type_of_output][is_pass].append(serial_num)
-        self.indexing_dic[serial_num] = (type_of_output, is_pass)
-
-    @validate_params(['category', 'is_pass', 'serial_num'])
-    def add_eval_dic_per_category(self, **kwargs):
-        category = kwargs.get('category')
-        is_pass = kwargs.get('is_pass')
-        serial_num = kwargs.get('serial_num')
-        if category not in self.eval_dic_per_category:
-            self.eval_dic_per_category[category] = {}
-        if is_pass not in self.eval_dic_per_category[category]:
-            self.eval_dic_per_category[category][is_pass] = []
-        self.eval_dic_per_category[category][is_pass].append(serial_num)
-
-    def set_eval_dic(self):
-        for data in self.eval_output:
-            is_pass = formatter.convert_eval_key(data['evaluate_response'])
-            self.add_eval_dic(type_of_output=data['model_request']['type_of_output'],
-                              is_pass=is_pass, serial_num=data['model_request']['serial_num'])
-            self.add_eval_dic_per_category(category=data['model_request']['category'],
-                                           is_pass=is_pass, serial_num=data['model_request']['serial_num'])
+
+    def get_group(self, model_request):
+        return model_request['category']
+
+    def _get_category_counts(self):
+        categories = self.counter.get_groups()
+        pass_counts = self.counter.get_column(PASS_STR)
+        case_counts = pass_counts + self.counter.get_column(FAIL_STR)
+        return sorted(zip(categories, pass_counts.tolist(), case_counts.tolist()))
 
     def display(self):
-        self.set_eval_dic()
+        rows = self._get_category_counts()
         print("Pass Count")
-        total_cnt = 0
-        tot_pass_cnt_per_cate = 0
-        categories = sorted(set(self.eval_dic_per_category.keys()))
-        for category in categories:
-            if category in self.eval_dic_per_category:
-                pass_cnt = len(self.eval_dic_per_category[category].get(PASS_STR, []))
-                tot_pass_cnt_per_cate += pass_cnt
-                case_tot_cnt_per_cate = pass_cnt + len(self.eval_dic_per_category[category].get(FAIL_STR, []))
-                total_cnt += case_tot_cnt_per_cate
-                print(f"  {category} : {pass_cnt}/{case_tot_cnt_per_cate}")
+        for category, pass_cnt, case_tot_cnt_per_cate in rows:
+            print(f"  {category} : {pass_cnt}/{case_tot_cnt_per_cate}")
+        tot_pass_cnt_per_cate = sum(row[1] for row in rows)
+        total_cnt = sum(row[2] for row in rows)
         print(f"  total : {tot_pass_cnt_per_cate}/{total_cnt}")
-        total_cnt = 0
-        tot_pass_cnt_per_cate = 0
         print("Pass Rate")
-        for category in categories:
-            if category in self.eval_dic_per_category:
-                pass_cnt = len(self.eval_dic_per_category[category].get(PASS_STR, []))
-                fail_cnt = len(self.eval_dic_per_category[category].get(FAIL_STR, []))
-                tot_pass_cnt_per_cate += pass_cnt
-                case_tot_cnt_per_cate = pass_cnt + fail_cnt
-                total_cnt += case_tot_cnt_per_cate
-                if case_tot_cnt_per_cate > 0:
-                    print(f"  {category} : {pass_cnt/case_tot_cnt_per_cate:.2f}")
-                else:
-                    print(f"  {category} : 0.00")
+        for category, pass_cnt, case_tot_cnt_per_cate in rows:
+            if case_tot_cnt_per_cate > 0:
+                print(f"  {category} : {pass_cnt/case_tot_cnt_per_cate:.2f}")
+            else:
+                print(f"  {category} : 0.00")
         if total_cnt > 0:
             print(f"  total : {tot_pass_cnt_per_cate/total_cnt:.2f}")
         else:
@@ -188,167 +262,129 @@ class CommonEvaluationRegistor(AbstractEvaluationRegistor):
 
     def get_score(self):
         score_dict = {}
-        if len(self.eval_dic) == 0:
-            self.set_eval_dic()
-        total_cnt = 0
-        tot_pass_cnt_per_cate = 0
-        categories = sorted(set(self.eval_dic_per_category.keys()))
-        for category in categories:
-            if category in self.eval_dic_per_category:
-                pass_cnt = len(self.eval_dic_per_category[category].get(PASS_STR, []))
-                tot_pass_cnt_per_cate += pass_cnt
-                case_tot_cnt_per_cate = pass_cnt + len(self.eval_dic_per_category[category].get(FAIL_STR, []))
-                total_cnt += case_tot_cnt_per_cate
-                score_dict[f'{category} pass cnt'] = pass_cnt
-                score_dict[f'{category} pass rate'] = pass_cnt/case_tot_cnt_per_cate if case_tot_cnt_per_cate > 0 else 0.00
+        rows = self._get_category_counts()
+        for category, pass_cnt, case_tot_cnt_per_cate in rows:
+            score_dict[f'{category} pass cnt'] = pass_cnt
+            score_dict[f'{category} pass rate'] = pass_cnt/case_tot_cnt_per_cate if case_tot_cnt_per_cate > 0 else 0.00
+        tot_pass_cnt_per_cate = sum(row[1] for row in rows)
+        total_cnt = sum(row[2] for row in rows)
         score_dict['total_pass_cnt'] = tot_pass_cnt_per_cate
         score_dict['total_cnt'] = total_cnt
         score_dict['total_pass_rate'] = tot_pass_cnt_per_cate/total_cnt
         return score_dict
 
+    def get_score_counts(self):
+        """
+        Returns the (pass count, total) behind every rate of get_score, for confidence intervals.
+        """
+        rows = self._get_category_counts()
+        score_counts = {f'{category} pass rate': (pass_cnt, case_tot_cnt_per_cate)
+                        for category, pass_cnt, case_tot_cnt_per_cate in rows}
+        score_counts['total_pass_rate'] = (sum(row[1] for row in rows), sum(row[2] for row in rows))
+        return score_counts
+
 class DialogEvaluationRegistor(AbstractEvaluationRegistor):
     def __init__(self):
         super().__init__()
         self.max_size = MAX_DIALOG_EVAL_SIZE
         self.types_of_output = ['call', 'completion', 'slot', 'relevance']
 
-    @validate_params(['type_of_output', 'is_pass', 'serial_num'])
-    def add_eval_dic(self, **kwargs):
-        type_of_output = kwargs.get('type_of_output')
-        is_pass = kwargs.get('is_pass')
-        serial_num = kwargs.get('serial_num')
-        if type_of_output not in self.eval_dic:
-            self.eval_dic[type_of_output] = {}
-        if is_pass not in self.eval_dic[type_of_output]:
-            self.eval_dic[type_of_output][is_pass] = []
-        self.eval_dic[type_of_output][is_pass].append(serial_num)
-        self.indexing_dic[serial_num] = (type_of_output, is_pass)
-
-    def set_eval_dic(self):
-        # set eval_dic
-        for data in self.eval_output:
-            inp = data['model_request']
-            serial_num = inp['serial_num']
-            if serial_num in self.indexing_dic:
-                continue
-            type_of_output = inp['type_of_output']
-            is_pass = formatter.convert_eval_key(data['evaluate_response'])
-            self.add_eval_dic(type_of_output=type_of_output,
-                              is_pass=is_pass, serial_num=serial_num)
+    def get_group(self, model_request):
+        return model_request['type_of_output']
 
-    def display(self):
-        self.set_eval_dic()
+    def get_indexing_key(self, model_request):
+        return model_request['serial_num']
+
+    def _get_output_type_counts(self):
+        pass_counts = dict(zip(self.counter.get_groups(), self.counter.get_column(PASS_STR).tolist()))
+        fail_counts = dict(zip(self.counter.get_groups(), self.counter.get_column(FAIL_STR).tolist()))
+        return [(type_of_output, pass_counts[type_of_output], pass_counts[type_of_output] + fail_counts[type_of_output])
+                for type_of_output in self.types_of_output if type_of_output in pass_counts]
 
-        tot_pass_cnt = 0
+    def display(self):
+        rows = self._get_output_type_counts()
+        tot_pass_cnt = sum(row[1] for row in rows)
         print("\n* pass count")
-        for type_of_output in self.types_of_output:
-            if type_of_output in self.eval_dic:
-                pass_cnt = len(self.eval_dic[type_of_output].get(PASS_STR, []))
-                tot_pass_cnt += pass_cnt
-                case_tot_cnt = pass_cnt + len(self.eval_dic[type_of_output].get(FAIL_STR, []))
-                print(f"  {type_of_output} : {pass_cnt}/{case_tot_cnt}")
+        for type_of_output, pass_cnt, case_tot_cnt in rows:
+            print(f"  {type_of_output} : {pass_cnt}/{case_tot_cnt}")
         print(f"  total : {tot_pass_cnt}/{self.max_size}")
         #
         print("\n* pass rate")
-        for type_of_output in self.types_of_output:
-            if type_of_output in self.eval_dic:
-                pass_cnt = len(self.eval_dic[type_of_output].get(PASS_STR, []))
-                case_tot_cnt = pass_cnt + len(self.eval_dic[type_of_output].get(FAIL_STR, []))
-                rate = (pass_cnt / case_tot_cnt) if case_tot_cnt else 0.0
-                print(f"  {type_of_output} : {rate:.2f}")
+        for type_of_output, pass_cnt, case_tot_cnt in rows:
+            rate = (pass_cnt / case_tot_cnt) if case_tot_cnt else 0.0
+            print(f"  {type_of_output} : {rate:.2f}")
         micro = (tot_pass_cnt / self.max_size) if self.max_size else 0.0
         print(f" avg(micro) : {micro}")
 
     def get_score(self):
-        if len(self.eval_dic) == 0:
-            self.set_eval_dic()
-
         score_dict = {}
-        tot_pass_cnt = 0
-        for type_of_output in self.types_of_output:
-            if type_of_output in self.eval_dic:
-                pass_cnt = len(self.eval_dic[type_of_output].get(PASS_STR, []))
-                tot_pass_cnt += pass_cnt
-                case_tot_cnt = pass_cnt + len(self.eval_dic[type_of_output].get(FAIL_STR, []))
-                score_dict[f'{type_of_output} pass cnt'] = pass_cnt
-                score_dict[f'{type_of_output} pass rate'] = (pass_cnt / case_tot_cnt) if case_tot_cnt else 0.0
+        rows = self._get_output_type_counts()
+        for type_of_output, pass_cnt, case_tot_cnt in rows:
+            score_dict[f'{type_of_output} pass cnt'] = pass_cnt
+            score_dict[f'{type_of_output} pass rate'] = (pass_cnt / case_tot_cnt) if case_tot_cnt else 0.0
+        tot_pass_cnt = sum(row[1] for row in rows)
         score_dict['total_pass_cnt'] = tot_pass_cnt
         score_dict['total_cnt'] = self.max_size
         score_dict['avg(micro)'] = (tot_pass_cnt / self.max_size) if self.max_size else 0.0
-        return score_dict    
+        return score_dict
+
+    def get_score_counts(self):
+        """
+        Returns the (pass count, total) behind every rate of get_score, for confidence intervals.
+        """
+        rows = self._get_output_type_counts()
+        score_counts = {f'{type_of_output} pass rate': (pass_cnt, case_tot_cnt)
+                        for type_of_output, pass_cnt, case_tot_cnt in rows}
+        score_counts['avg(micro)'] = (sum(row[1] for row in rows), self.max_size)
+        return score_counts
 
 
 class SingleCallEvaluationRegistor(AbstractEvaluationRegistor):
-    def __init__(self):
-        super().__init__()
-        self.eval_dic_of_tools_type = {}
-
-    @validate_params(['is_pass', 'serial_num', 'tools_type'])
-    def add_eval_dic(self, **kwargs):
-        is_pass = kwargs.get('is_pass')
-        serial_num = kwargs.get('serial_num')
-        tools_type = kwargs.get('tools_type')
-        if is_pass not in self.eval_dic:
-            self.eval_dic[is_pass] = []
-        self.eval_dic[is_pass].append(serial_num)
-        ##
-        if tools_type not in self.eval_dic_of_tools_type:
-            self.eval_dic_of_tools_type[tools_type] = {}
-        if is_pass not in self.eval_dic_of_tools_type[tools_type]:
-            self.eval_dic_of_tools_type[tools_type][is_pass] = []
-        self.eval_dic_of_tools_type[tools_type][is_pass].append(serial_num)
-        key = f'{serial_num}-{tools_type}'
-        self.indexing_dic[key] = is_pass
-
-    def set_eval_dic(self):
-        for data in self.eval_output:
-            inp = data['model_request']
-            serial_num = inp['serial_num']
-            tools_type = inp['tools_type']
-            key = f'{serial_num}-{tools_type}'
-            if key in self.indexing_dic:
-                continue
-            is_pass = formatter.convert_eval_key(data['evaluate_response'])
-            self.add_eval_dic(tools_type=tools_type,
-                              is_pass=is_pass, serial_num=serial_num)
+    def get_group(self, model_request):
+        return model_request['tools_type']
+
+    def get_indexing_key(self, model_request):
+        return f"{model_request['serial_num']}-{model_request['tools_type']}"
 
     def display(self):
-        self.set_eval_dic()
         tot_cnt = 0
-        for tools_type, values in self.eval_dic_of_tools_type.items():
-            total_count = 0
-            if values:
-                for is_pass, serial_num_list in self.eval_dic_of_tools_type[tools_type].items():
-                    total_count += len(serial_num_list)
-                    tot_cnt += len(serial_num_list)
-                print(f'[[{tools_type} TOTAL {total_count}]]')
-                for is_pass, serial_num_list in self.eval_dic_of_tools_type[tools_type].items():
-                    print(f'* {is_pass} : {len(serial_num_list)}')
-                print()
+        for tools_type in self.counter.get_groups():
+            counts = self.counter.get_group_counts(tools_type)
+            total_count = sum(counts.values())
+            tot_cnt += total_count
+            print(f'[[{tools_type} TOTAL {total_count}]]')
+            for is_pass, count in counts.items():
+                print(f'* {is_pass} : {count}')
+            print()
         print()
         print(f"[[TOTAL {tot_cnt}]]")
-        for is_pass, serial_num_list in self.eval_dic.items():
-            print(f"{is_pass}\t{len(serial_num_list)}")
+        for is_pass, count in self.counter.get_verdict_totals().items():
+            print(f"{is_pass}\t{count}")
 
     def get_score(self):
         score_dict = {}
-        if len(self.eval_dic) == 0:
-            self.set_eval_dic()
-        tot_cnt = 0
-        tot_pass_cnt = 0
-        for tools_type, values in self.eval_dic_of_tools_type.items():
-            tools_type_total_count = 0
-            if values:
-                for is_pass, serial_num_list in self.eval_dic_of_tools_type[tools_type].items():
-                    tools_type_total_count += len(serial_num_list)
-                    tot_cnt += len(serial_num_list)
-                score_dict[f'{tools_type} total'] = tools_type_total_count
-                for is_pass, serial_num_list in self.eval_dic_of_tools_type[tools_type].items():
-                    if is_pass == PASS_STR:
-                        tot_pass_cnt += len(serial_num_list)
-                        score_dict[f'{tools_type} pass cnt'] = len(serial_num_list)
-                        score_dict[f'{tools_type} pass rate'] = len(serial_num_list)/tools_type_total_count
-        score_dict['total_cnt'] = tot_cnt
+        tools_types = self.counter.get_groups()
+        totals = self.counter.counts.sum(axis=1).tolist() if tools_types else []
+        pass_counts = self.counter.get_column(PASS_STR).tolist()
+        for tools_type, tools_type_total_count, pass_cnt in zip(tools_types, totals, pass_counts):
+            score_dict[f'{tools_type} total'] = tools_type_total_count
+            if pass_cnt:
+                score_dict[f'{tools_type} pass cnt'] = pass_cnt
+                score_dict[f'{tools_type} pass rate'] = pass_cnt/tools_type_total_count
+        tot_pass_cnt = sum(pass_counts)
+        score_dict['total_cnt'] = sum(totals)
         score_dict['total_pass_cnt'] = tot_pass_cnt
-        score_dict['total_pass_rate'] = tot_pass_cnt/tot_cnt
-        return score_dict
\ No newline at end of file
+        score_dict['total_pass_rate'] = tot_pass_cnt/score_dict['total_cnt']
+        return score_dict
+
+    def get_score_counts(self):
+        """
+        Returns the (pass count, total) behind every rate of get_score, for confidence intervals.
+        """
+        tools_types = self.counter.get_groups()
+        totals = self.counter.counts.sum(axis=1).tolist() if tools_types else []
+        pass_counts = self.counter.get_column(PASS_STR).tolist()
+        score_counts = {f'{tools_type} pass rate': (pass_cnt, total)
+                        for tools_type, total, pass_cnt in zip(tools_types, totals, pass_counts)}
+        score_counts['total_pass_rate'] = (sum(pass_counts), sum(totals))
+        return score_counts
@@ -1,6 +1,4 @@
-import json
-from typing import Optional, List, Dict
-from pydantic import BaseModel, root_validator
+from src import json_codec
 
 PASS = 'pass'
 FAIL = 'fail'
@@ -15,6 +13,10 @@ def convert_eval_key(response):
       Returns:
           str: pass or fail
     """
+    # structured(json) verdict 가 있으면 텍스트 휴리스틱 없이 그대로 사용
+    verdict = response.get('verdict')
+    if isinstance(verdict, dict) and verdict.get('verdict') in [PASS, FAIL]:
+        return verdict['verdict']
     def contain_is_pass(key):
         if PASS in key.lower():
             return PASS
@@ -43,44 +45,109 @@ def convert_eval_key(response):
     return key
 
 
-class RequestFormatter(BaseModel):
-    serial_num: int
-    messages: list
-    tools: list
-    temperature: float
-    tool_choice: str
-    ground_truth: dict
-    acceptable_arguments: Optional[str] = None
-
-    @root_validator(pre=True)
-    def ensure_acceptable_arguments(cls, values):
-        acceptable_arguments = values.get('acceptable_arguments', '')
-        if isinstance(acceptable_arguments, dict):
-            values['acceptable_arguments'] = json.dumps(acceptable_arguments, ensure_ascii=False)
-        return values
-
-    @root_validator(pre=True)
-    def clean_ground_truth(cls, values):
-        ground_truth = values.get('ground_truth', '')
-        if isinstance(ground_truth, str):
-            args = ground_truth.split('arguments')[1]
-            new_args = args.replace('"include_lowercase"', '\\"include_lowercase\\"')
-            if not new_args.endswith('"}'):
-                new_args = new_args + '"}'
-            elif new_args.endswith('\\"}'):
-                new_args = new_args + '"}'
-            elif new_args.endswith('\\"}"}'):
-                pass
-            elif new_args.endswith('"}"}'):
-                new_args = new_args[:-4] + '\\"}"}'
-            ground_truth = ground_truth.replace(args, new_args)
-            try:
-                ground_truth = json.loads(ground_truth)
-            except Exception as e:
-                print(f"[ERROR] ground_truth format error : {ground_truth}")
-                raise e
-        values['ground_truth'] = ground_truth
-        return values
+def get_error_type(response):
+    """
+      Returns the typed error category of a structured(json) verdict, or '' for free-text verdicts.
+    """
+    verdict = response.get('verdict')
+    if isinstance(verdict, dict):
+        return verdict.get('error_type') or ''
+    return ''
+
+
+def get_vote_split(response):
+    """
+      Returns the majority vote split of the judge samples (e.g. 'pass 2 / fail 1'), or '' for single-sample verdicts.
+    """
+    votes = response.get('votes')
+    if not isinstance(votes, dict):
+        return ''
+    split = f"{PASS} {votes.get(PASS, 0)} / {FAIL} {votes.get(FAIL, 0)}"
+    if votes.get('invalid'):
+        split += f" / invalid {votes['invalid']}"
+    return split
+
+
+def clean_ground_truth(ground_truth):
+    """
+      Parses a ground truth given as a (loosely escaped) JSON string into a dict.
+    """
+    if isinstance(ground_truth, str):
+        args = ground_truth.split('arguments')[1]
+        new_args = args.replace('"include_lowercase"', '\\"include_lowercase\\"')
+        if not new_args.endswith('"}'):
+            new_args = new_args + '"}'
+        elif new_args.endswith('\\"}'):
+            new_args = new_args + '"}'
+        elif new_args.endswith('\\"}"}'):
+            pass
+        elif new_args.endswith('"}"}'):
+            new_args = new_args[:-4] + '\\"}"}'
+        ground_truth = ground_truth.replace(args, new_args)
+        try:
+            ground_truth = json_codec.loads(ground_truth)
+        except Exception as e:
+            print(f"[ERROR] ground_truth format error : {ground_truth}")
+            raise e
+    return ground_truth
+
+
+class RequestFormatter:
+    """
+      Model request record (one line of *.input.jsonl).
+      Field types are checked once per dataset file with validate() (see AbstractPayloadCreator.format_request);
+      each request only normalizes acceptable_arguments / ground_truth.
+    """
+    # to_dict 의 key 순서
+    FIELDS = ('serial_num', 'messages', 'tools', 'temperature', 'tool_choice', 'ground_truth',
+              'acceptable_arguments', 'n',
+              # interned request (see request_catalog): messages / tools 대신 catalog id 를 기록
+              'messages_id', 'tool_ids')
+    FIELD_TYPES = {
+        'serial_num': int,
+        'messages': (list, type(None)),
+        'tools': (list, type(None)),
+        'temperature': (int, float),
+        'tool_choice': str,
+        'ground_truth': (dict, str),
+        'acceptable_arguments': (str, dict, type(None)),
+        'n': int,
+        'messages_id': (str, type(None)),
+        'tool_ids': (list, type(None)),
+    }
+    DEFAULTS = {'messages': None, 'tools': None, 'acceptable_arguments': None, 'n': 1,
+                'messages_id': None, 'tool_ids': None}
+    __slots__ = FIELDS
+
+    def __init__(self, **values):
+        for key in self.FIELDS:
+            setattr(self, key, values[key] if key in values else self.DEFAULTS[key])
+        self.serial_num = int(self.serial_num)
+        self.temperature = float(self.temperature)
+        self.n = int(self.n)
+        if isinstance(self.acceptable_arguments, dict):
+            self.acceptable_arguments = json_codec.dumps_text(self.acceptable_arguments)
+        self.ground_truth = clean_ground_truth(self.ground_truth)
+
+    @classmethod
+    def validate(cls, values):
+        """
+          Checks the fields of a request against FIELD_TYPES.
+
+          Raises:
+              ValueError: If a field is missing or has an unexpected type.
+        """
+        for key in cls.FIELDS:
+            if key not in values and key not in cls.DEFAULTS:
+                raise ValueError(f"{cls.__name__}: field '{key}' is required")
+            value = values.get(key, cls.DEFAULTS.get(key))
+            expected_type = cls.FIELD_TYPES.get(key, str)
+            if not isinstance(value, expected_type):
+                raise ValueError(f"{cls.__name__}: expected type for '{key}' is {expected_type}, but got {type(value)}")
+        if values.get('messages') is None and 'messages_id' not in values:
+            raise ValueError("messages or messages_id is required")
+        if values.get('tools') is None and values.get('tool_ids') is None:
+            raise ValueError("tools or tool_ids is required")
 
     def update(self, **kwargs):
         for key, value in kwargs.items():
@@ -88,48 +155,90 @@ class RequestFormatter(BaseModel):
         return self
 
     def to_dict(self):
-        return self.dict()
+        exclude = ('messages', 'tools') if self.tool_ids is not None else ('messages_id', 'tool_ids')
+        return {key: getattr(self, key) for key in self.FIELDS if key not in exclude}
 
 
 class CommonRequestFormatter(RequestFormatter):
-    category: str
-    type_of_output: str
+    __slots__ = ('category', 'type_of_output')
+    FIELDS = RequestFormatter.FIELDS + __slots__
 
 
 class DialogRequestFormatter(RequestFormatter):
-    type_of_output: str
+    __slots__ = ('type_of_output',)
+    FIELDS = RequestFormatter.FIELDS + __slots__
 
 
 class SingleCallRequestFormatter(RequestFormatter):
-    messages: list
-    tools: list
-    tools_type: str
+    __slots__ = ('tools_type',)
+    FIELDS = RequestFormatter.FIELDS + __slots__
+
+
+class ResponseFormatter:
+    """
+      Eval record of one item (request, model response, judge prompt / response) and its report cells.
+      The report cells (JSON-encoded ground truth, model output, messages, tools, ...) are built on the first access
+      of report_arguments, so an item whose judge response is set later (batch mode) is serialized only once.
+    """
+    __slots__ = ('request_model', 'response_model', 'evaluate_prompt', 'evaluate_response', '_report_arguments')
+    tsv_keys = []
+
+    def __init__(self, request_model, response_model, evaluate_prompt, evaluate_response, report_arguments=None):
+        self.request_model = request_model
+        self.response_model = response_model
+        self.evaluate_prompt = evaluate_prompt
+        self.evaluate_response = evaluate_response
+        self._report_arguments = report_arguments
 
+    @property
+    def report_arguments(self):
+        if self._report_arguments is None:
+            self._report_arguments = self.get_report_arguments()
+        return self._report_arguments
 
-class ResponseFormatter(BaseModel):
-    # UserWarning: Field "model_response" has conflict with protected namespace "model_".
-    request_model: Dict
-    response_model: Dict
-    evaluate_prompt: str
-    evaluate_response: Dict
-    # report
-    tsv_keys: Optional[List[str]] = []
-    report_arguments: Optional[dict] = None
+    def get_report_arguments(self):
+        """
+          Builds the report cells of the item. Must be implemented by subclasses.
+        """
+        raise NotImplementedError("Subclasses must implement this method.")
+
+    def get_report_cells(self):
+        model_request = self.request_model
+        evaluate_response = self.evaluate_response
+        return {
+            'is_pass': convert_eval_key(evaluate_response),
+            'ground_truth': json_codec.dumps_text(model_request['ground_truth']),
+            'acceptable_arguments': json_codec.dumps_text(model_request['acceptable_arguments']),
+            'model_output': json_codec.dumps_text(self.response_model),
+            'reasoning': json_codec.dumps_text({'reasoning': evaluate_response['choices'][0]['message']['content']}),
+            'messages': json_codec.dumps_text(model_request['messages']),
+            'tools': json_codec.dumps_text(model_request['tools']),
+            'error_type': get_error_type(evaluate_response),
+            'vote_split': get_vote_split(evaluate_response),
+        }
 
     def to_dict(self):
-        convert_dict = self.dict()
-        convert_dict['model_request'] = convert_dict['request_model']
-        convert_dict['model_response'] = convert_dict['response_model']
-        del convert_dict['request_model']
-        del convert_dict['response_model']
-        return convert_dict
+        # 필드를 복사 없이 그대로 참조 (기록은 바로 직렬화되고 수정되지 않음)
+        report_arguments = self.report_arguments
+        return {
+            'evaluate_prompt': self.evaluate_prompt,
+            'evaluate_response': self.evaluate_response,
+            'tsv_keys': self.tsv_keys,
+            'report_arguments': report_arguments,
+            'model_request': self.request_model,
+            'model_response': self.response_model,
+            # 재채점/재개 시 judge 텍스트를 다시 파싱하지 않도록 판정 결과를 typed field 로 저장
+            'verdict': report_arguments['is_pass'],
+            'error_type': report_arguments['error_type'],
+        }
 
     def to_tsv(self):
+        report_arguments = self.report_arguments
         output_str = ''
         for key in self.tsv_keys:
             if key == 'input_messages':
                 key = 'messages'
-            output_str += f"{self.report_arguments[key]}\t"
+            output_str += f"{report_arguments[key]}\t"
         return output_str
 
     def get_tsv_title(self):
@@ -140,110 +249,81 @@ class ResponseFormatter(BaseModel):
 
     def set_evaluate_response(self, evaluate_response):
         self.evaluate_response = evaluate_response
-        is_pass = convert_eval_key(evaluate_response)
-        reasoning = json.dumps({'reasoning': evaluate_response['choices'][0]['message']['content']}, ensure_ascii=False)
-        model_output = json.dumps(self.response_model, ensure_ascii=False)
-        self.report_arguments['is_pass'] = is_pass
-        self.report_arguments['reasoning'] = reasoning
+        # 리포트를 아직 만들지 않았으면 첫 접근 시 이 응답으로 만듦
+        if self._report_arguments is not None:
+            self._report_arguments['is_pass'] = convert_eval_key(evaluate_response)
+            self._report_arguments['reasoning'] = json_codec.dumps_text(
+                {'reasoning': evaluate_response['choices'][0]['message']['content']})
+            self._report_arguments['error_type'] = get_error_type(evaluate_response)
+            self._report_arguments['vote_split'] = get_vote_split(evaluate_response)
         return self
 
+
 class CommonResponseFormatter(ResponseFormatter):
-    tsv_keys: Optional[List[str]] = ['serial_num', 'is_pass', 'category', 'type_of_output',
-                                     'ground_truth', 'acceptable_arguments',
-                                     'model_output', 'reasoning', 'input_messages', 'tools']
-
-    @root_validator(pre=True)
-    def set_report_params(cls, values):
-        model_request = values.get('request_model', {})
-        model_response = values.get('response_model', {})
-        evaluate_response = values.get('evaluate_response', {})
-        serial_num = model_request['serial_num']
-        is_pass = convert_eval_key(evaluate_response)
-        category = model_request['category']
-        type_of_output = model_request['type_of_output']
-        ground_truth = json.dumps(model_request['ground_truth'], ensure_ascii=False)
-        acceptable_arguments = json.dumps(model_request['acceptable_arguments'], ensure_ascii=False)
-        model_output = json.dumps(model_response, ensure_ascii=False)
-        reasoning = json.dumps({'reasoning': evaluate_response['choices'][0]['message']['content']}, ensure_ascii=False)
-        messages = json.dumps(model_request['messages'], ensure_ascii=False)
-        tools = json.dumps(model_request['tools'], ensure_ascii=False)
-        values['report_arguments'] = {
-            'serial_num': serial_num,
-            'is_pass': is_pass,
-            'category': category,
-            'type_of_output': type_of_output,
-            'ground_truth': ground_truth,
-            'acceptable_arguments': acceptable_arguments,
-            'model_output': model_output,
-            'reasoning': reasoning,
-            'messages': messages,
-            'tools': tools
+    __slots__ = ()
+    tsv_keys = ['serial_num', 'is_pass', 'category', 'type_of_output',
+                'ground_truth', 'acceptable_arguments',
+                'model_output', 'reasoning', 'input_messages', 'tools', 'error_type', 'vote_split']
+
+    def get_report_arguments(self):
+        cells = self.get_report_cells()
+        return {
+            'serial_num': self.request_model['serial_num'],
+            'is_pass': cells['is_pass'],
+            'category': self.request_model['category'],
+            'type_of_output': self.request_model['type_of_output'],
+            'ground_truth': cells['ground_truth'],
+            'acceptable_arguments': cells['acceptable_arguments'],
+            'model_output': cells['model_output'],
+            'reasoning': cells['reasoning'],
+            'messages': cells['messages'],
+            'tools': cells['tools'],
+            'error_type': cells['error_type'],
+            'vote_split': cells['vote_split']
         }
-        return values
 
 
 class SingleCallResponseFormatter(ResponseFormatter):
-    tsv_keys: Optional[List[str]] = ['serial_num', 'is_pass', 'tools_type',
-                                     'ground_truth', 'acceptable_arguments',
-                                     'model_output', 'reasoning', 'query', 'tools']
-
-    @root_validator(pre=True)
-    def set_report_params(cls, values):
-        model_request = values.get('request_model', {})
-        model_response = values.get('response_model', {})
-        evaluate_response = values.get('evaluate_response', {})
-        serial_num = model_request['serial_num']
-        is_pass = convert_eval_key(evaluate_response)
-        tools_type = model_request['tools_type']
-        ground_truth = json.dumps(model_request['ground_truth'], ensure_ascii=False)
-        acceptable_arguments = json.dumps(model_request['acceptable_arguments'], ensure_ascii=False)
-        model_output = json.dumps(model_response, ensure_ascii=False)
-        reasoning = json.dumps({'reasoning': evaluate_response['choices'][0]['message']['content']}, ensure_ascii=False)
-        messages = json.dumps(model_request['messages'], ensure_ascii=False)
-        tools = json.dumps(model_request['tools'], ensure_ascii=False)
-        values['report_arguments'] = {
-            'serial_num': serial_num,
-            'is_pass': is_pass,
-            'tools_type': tools_type,
-            'ground_truth': ground_truth,
-            'acceptable_arguments': acceptable_arguments,
-            'model_output': model_output,
-            'reasoning': reasoning,
-            'query': messages,
-            'tools': tools
+    __slots__ = ()
+    tsv_keys = ['serial_num', 'is_pass', 'tools_type',
+                'ground_truth', 'acceptable_arguments',
+                'model_output', 'reasoning', 'query', 'tools', 'error_type', 'vote_split']
+
+    def get_report_arguments(self):
+        cells = self.get_report_cells()
+        return {
+            'serial_num': self.request_model['serial_num'],
+            'is_pass': cells['is_pass'],
+            'tools_type': self.request_model['tools_type'],
+            'ground_truth': cells['ground_truth'],
+            'acceptable_arguments': cells['acceptable_arguments'],
+            'model_output': cells['model_output'],
+            'reasoning': cells['reasoning'],
+            'query': cells['messages'],
+            'tools': cells['tools'],
+            'error_type': cells['error_type'],
+            'vote_split': cells['vote_split']
         }
-        return values
 
 
 class DialogResponseFormatter(ResponseFormatter):
-    tsv_keys: Optional[List[str]] = ['serial_num', 'is_pass', 'type_of_output',
-                                     'ground_truth', 'acceptable_arguments',
-                                     'model_output', 'reasoning', 'query', 'tools']
-
-    @root_validator(pre=True)
-    def set_report_params(cls, values):
-        model_request = values.get('request_model', {})
-        model_response = values.get('response_model', {})
-        evaluate_response = values.get('evaluate_response', {})
-        serial_num = model_request['serial_num']
-        is_pass = convert_eval_key(evaluate_response)
-        type_of_output = model_request['type_of_output']
-        ground_truth = json.dumps(model_request['ground_truth'], ensure_ascii=False)
-        acceptable_arguments = json.dumps(model_request['acceptable_arguments'], ensure_ascii=False)
-        model_output = json.dumps(model_response, ensure_ascii=False)
-        reasoning = json.dumps({'reasoning': evaluate_response['choices'][0]['message']['content']}, ensure_ascii=False)
-        messages = json.dumps(model_request['messages'], ensure_ascii=False)
-        tools = json.dumps(model_request['tools'], ensure_ascii=False)
-        values['report_arguments'] = {
-            'serial_num': serial_num,
-            'is_pass': is_pass,
-            'type_of_output': type_of_output,
-            'ground_truth': ground_truth,
-            'acceptable_arguments': acceptable_arguments,
-            'model_output': model_output,
-            'reasoning': reasoning,
-            'query': messages,
-            'tools': tools
+    __slots__ = ()
+    tsv_keys = ['serial_num', 'is_pass', 'type_of_output',
+                'ground_truth', 'acceptable_arguments',
+                'model_output', 'reasoning', 'query', 'tools', 'error_type', 'vote_split']
+
+    def get_report_arguments(self):
+        cells = self.get_report_cells()
+        return {
+            'serial_num': self.request_model['serial_num'],
+            'is_pass': cells['is_pass'],
+            'type_of_output': self.request_model['type_of_output'],
+            'ground_truth': cells['ground_truth'],
+            'acceptable_arguments': cells['acceptable_arguments'],
+            'model_output': cells['model_output'],
+            'reasoning': cells['reasoning'],
+            'query': cells['messages'],
+            'tools': cells['tools'],
+            'error_type': cells['error_type'],
+            'vote_split': cells['vote_split']
         }
-        return values
-    
@@ -0,0 +1,305 @@
+import os
+import zlib
+from array import array
+"""
+This package reads and writes the line files of a run (requests, predictions, eval records, blobs, TSV reports)
+with optional compression, chosen by the suffix of the file path:
+
+- x.jsonl     : plain
+- x.jsonl.gz  : gzip
+- x.jsonl.zst : zstd (requires zstandard)
+
+Compressed files are a sequence of independently compressed frames (gzip members / zstd frames), each holding whole
+lines, so they can be read with zcat / zstdcat, and appends never rewrite earlier frames. A frame is written with a
+single write, so a crash can only leave a truncated last frame: readers skip it, and a writer that appends cuts it off.
+Lines are addressed by (frame start, offset in the frame), so random access decompresses a single frame.
+"""
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = ['none', 'gzip', 'zstd']
+COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+# 압축 frame 하나에 모으는 최소 문자 수 (압축률 / crash 시 다시 만들어야 하는 줄 수의 균형)
+FRAME_SIZE = 1 << 16
+READ_CHUNK_SIZE = 1 << 16
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def check_compression(compression):
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression} (choose one of {COMPRESSIONS})")
+    if compression == 'zstd' and zstandard is None:
+        raise ImportError("compression 'zstd' requires zstandard (pip install zstandard)")
+
+
+def get_compression(file_path):
+    """
+    Returns the compression of a file by its suffix ('gzip' | 'zstd'), or None for a plain file.
+    """
+    for compression, suffix in COMPRESSION_SUFFIXES.items():
+        if file_path.endswith(suffix):
+            return compression
+    return None
+
+
+def add_compression_suffix(file_path, compression):
+    if compression in (None, 'none'):
+        return file_path
+    check_compression(compression)
+    return f"{file_path}{COMPRESSION_SUFFIXES[compression]}"
+
+
+def split_compression_suffix(file_path):
+    """
+    Returns (path without the compression suffix, compression suffix or '').
+    """
+    compression = get_compression(file_path)
+    if compression is None:
+        return file_path, ''
+    suffix = COMPRESSION_SUFFIXES[compression]
+    return file_path[:-len(suffix)], suffix
+
+
+def get_sidecar_path(file_path, suffix, compressed=True):
+    """
+    Returns the path of a file that belongs to a jsonl artifact (x.jsonl[.zst] -> x<suffix>[.zst]).
+    The sidecar keeps the compression of the artifact unless compressed is False; a plain sidecar of a compressed
+    artifact keeps the compression name (x.jsonl.zst -> x.zst<suffix>), so it is not shared with x.jsonl.
+    """
+    base, compression_suffix = split_compression_suffix(file_path)
+    if base.endswith('.jsonl'):
+        base = base[:-len('.jsonl')]
+    if not compressed:
+        return f"{base}{compression_suffix}{suffix}"
+    return f"{base}{suffix}{compression_suffix}"
+
+
+def new_decompressor(compression):
+    if compression == 'zstd':
+        check_compression(compression)
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj(wbits=31)
+
+
+def compress(data, compression):
+    if compression == 'zstd':
+        check_compression(compression)
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    compressor = zlib.compressobj(GZIP_LEVEL, wbits=31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def iter_frames(file_path):
+    """
+    Yields (start, end, data) of every complete frame of a compressed file (a truncated last frame is skipped).
+    """
+    compression = get_compression(file_path)
+    with open(file_path, 'rb') as f:
+        start = 0
+        fed = 0
+        parts = []
+        decompressor = new_decompressor(compression)
+        chunk = b''
+        while True:
+            if not chunk:
+                chunk = f.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    return
+            parts.append(decompressor.decompress(chunk))
+            if not decompressor.eof:
+                fed += len(chunk)
+                chunk = b''
+                continue
+            # frame 끝: 남은 데이터는 다음 frame 의 시작
+            end = start + fed + len(chunk) - len(decompressor.unused_data)
+            yield start, end, b''.join(parts)
+            chunk = decompressor.unused_data
+            start, fed, parts = end, 0, []
+            decompressor = new_decompressor(compression)
+
+
+def iter_line_positions(file_path):
+    """
+    Yields (start, end, offset, line) for every line of a plain or compressed file.
+    For a compressed file, start / end are the bounds of the frame holding the line and offset is the position of
+    the line in the decompressed frame; for a plain file, start / end are the bounds of the line and offset is 0.
+    """
+    if get_compression(file_path) is None:
+        start = 0
+        with open(file_path, 'rb') as f:
+            for line in f:
+                yield start, start + len(line), 0, line
+                start += len(line)
+        return
+    for start, end, data in iter_frames(file_path):
+        offset = 0
+        while offset < len(data):
+            line_end = data.find(b'\n', offset)
+            line_end = len(data) if line_end < 0 else line_end + 1
+            yield start, end, offset, data[offset:line_end]
+            offset = line_end
+
+
+def iter_lines(file_path):
+    """
+    Yields the lines (bytes) of a plain or compressed file.
+    """
+    if get_compression(file_path) is None:
+        with open(file_path, 'rb') as f:
+            yield from f
+        return
+    for _, _, _, line in iter_line_positions(file_path):
+        yield line
+
+
+def read_bytes(file_path):
+    """
+    Returns the (decompressed) content of a plain or compressed file.
+    """
+    if get_compression(file_path) is None:
+        with open(file_path, 'rb') as f:
+            return f.read()
+    return b''.join(data for _, _, data in iter_frames(file_path))
+
+
+def build_frame_line_offsets(file_path):
+    """
+    Returns the frame start and the offset in the frame of every non-blank line of a compressed file,
+    as two arrays of 8 byte integers.
+    """
+    frames, offsets = array('q'), array('q')
+    for start, _, offset, line in iter_line_positions(file_path):
+        if line.strip():
+            frames.append(start)
+            offsets.append(offset)
+    return frames, offsets
+
+
+def get_valid_size(file_path):
+    """
+    Returns the size of the complete frames of a compressed file (the size of a plain file).
+    """
+    if get_compression(file_path) is None:
+        return os.path.getsize(file_path)
+    valid_size = 0
+    for _, end, _ in iter_frames(file_path):
+        valid_size = end
+    return valid_size
+
+
+class FrameReader:
+    """
+    Reads lines of a plain or compressed file by position (see iter_line_positions).
+    The last decompressed frame is cached, so lines read in file order decompress each frame once.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.compression = get_compression(file_path)
+        self.fp = None
+        self.frame_start = None
+        self.frame = b''
+
+    def read_line(self, start, offset=0):
+        if self.fp is None:
+            self.fp = open(self.file_path, 'rb')
+        if self.compression is None:
+            self.fp.seek(start)
+            return self.fp.readline()
+        if start != self.frame_start:
+            self.frame = self._read_frame(start)
+            self.frame_start = start
+        line_end = self.frame.find(b'\n', offset)
+        return self.frame[offset:] if line_end < 0 else self.frame[offset:line_end + 1]
+
+    def _read_frame(self, start):
+        self.fp.seek(start)
+        decompressor = new_decompressor(self.compression)
+        parts = []
+        while not decompressor.eof:
+            chunk = self.fp.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise EOFError(f"truncated frame at {start}: {self.file_path}")
+            parts.append(decompressor.decompress(chunk))
+        return b''.join(parts)
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+        self.frame_start = None
+        self.frame = b''
+
+
+class LineWriter:
+    """
+    Writes text lines to a plain or compressed file (by the suffix of its path).
+    Plain lines are written as they are. Compressed lines are buffered and written as one frame when FRAME_SIZE
+    characters are buffered (flush), or on commit / close.
+
+    Attributes:
+        size (int): bytes written to the file, i.e. the end of the last written line (plain) or frame (compressed).
+    """
+    def __init__(self, file_path, write_option='w', frame_size=FRAME_SIZE):
+        self.file_path = file_path
+        self.compression = get_compression(file_path)
+        self.frame_size = frame_size
+        if self.compression is not None:
+            check_compression(self.compression)
+            if write_option == 'a' and os.path.isfile(file_path):
+                # crash 로 잘린 마지막 frame 은 잘라내고 이어서 기록
+                valid_size = get_valid_size(file_path)
+                if valid_size < os.path.getsize(file_path):
+                    print(f"[[truncated frame]] cut {os.path.getsize(file_path) - valid_size} bytes of {file_path}")
+                    os.truncate(file_path, valid_size)
+        self.fp = open(file_path, f"{write_option}b")
+        self.size = os.path.getsize(file_path) if write_option == 'a' else 0
+        self.buffer = []
+        self.buffered = 0
+
+    def write(self, text):
+        if self.compression is None:
+            data = text.encode('utf-8')
+            self.fp.write(data)
+            self.size += len(data)
+            return
+        self.buffer.append(text)
+        self.buffered += len(text)
+
+    def is_pending(self):
+        """
+        Returns True if written lines are buffered and not in the file yet.
+        """
+        return self.buffered > 0
+
+    def is_full(self):
+        return self.buffered >= self.frame_size
+
+    def flush(self):
+        if self.is_full() or self.compression is None:
+            self.commit()
+
+    def commit(self):
+        """
+        Writes the buffered lines (as one frame) and flushes the file.
+        """
+        if self.buffer:
+            data = compress(''.join(self.buffer).encode('utf-8'), self.compression)
+            self.fp.write(data)
+            self.size += len(data)
+            self.buffer = []
+            self.buffered = 0
+        self.fp.flush()
+
+    def close(self):
+        self.commit()
+        self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
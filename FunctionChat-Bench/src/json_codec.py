@@ -0,0 +1,104 @@
+import json
+"""
+This package is the JSON codec used for reading and writing the benchmark files (jsonl records, reports).
+It uses orjson or msgspec when installed and falls back to the stdlib json module otherwise.
+
+- loads / dumps : fast backend, compact separators (format of stored records only)
+- dumps_text    : stdlib formatting (", " / ": "), for text that a model reads (judge prompts),
+                  so the prompts do not change with the installed backend
+"""
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+BACKENDS = [name for name, module in [('orjson', orjson), ('msgspec', msgspec)] if module is not None] + ['json']
+
+
+def _stdlib_loads(data):
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, ensure_ascii=False)
+
+
+def _orjson_dumps(obj):
+    try:
+        return orjson.dumps(obj).decode('utf-8')
+    except TypeError:
+        # orjson 이 지원하지 않는 값 (int 가 아닌 dict key, 64bit 초과 정수 등) 은 stdlib 으로
+        return _stdlib_dumps(obj)
+
+
+def _msgspec_loads(data):
+    try:
+        return msgspec.json.decode(data)
+    except msgspec.DecodeError as e:
+        # 호출부는 stdlib 과 같은 json.JSONDecodeError 를 기대 (orjson 의 에러는 이미 그 subclass)
+        doc = data.decode('utf-8', errors='replace') if isinstance(data, (bytes, bytearray)) else str(data)
+        raise json.JSONDecodeError(str(e), doc, 0) from e
+
+
+def _msgspec_dumps(obj):
+    try:
+        return msgspec.json.encode(obj).decode('utf-8')
+    except (TypeError, msgspec.EncodeError):
+        return _stdlib_dumps(obj)
+
+
+def _get_codec(name):
+    if name == 'orjson':
+        return orjson.loads, _orjson_dumps
+    if name == 'msgspec':
+        return _msgspec_loads, _msgspec_dumps
+    return _stdlib_loads, _stdlib_dumps
+
+
+backend = BACKENDS[0]
+_loads, _dumps = _get_codec(backend)
+
+
+def set_backend(name):
+    """
+    Switches the codec backend (orjson | msgspec | json). Used by the codec benchmark.
+    """
+    global backend, _loads, _dumps
+    if name not in BACKENDS:
+        raise ValueError(f"json backend '{name}' is not installed (available: {', '.join(BACKENDS)})")
+    backend = name
+    _loads, _dumps = _get_codec(name)
+
+
+def loads(data):
+    """
+    Parses a JSON document from str or bytes.
+    """
+    return _loads(data)
+
+
+def dumps(obj):
+    """
+    Serializes obj to a (non-ASCII-escaped) JSON str with the fastest installed backend.
+    """
+    return _dumps(obj)
+
+
+def dumps_text(obj):
+    """
+    Serializes obj exactly like json.dumps(obj, ensure_ascii=False), whatever the backend.
+    """
+    return _stdlib_dumps(obj)
+
+
+def load_jsonl(file_path):
+    """
+    Reads a jsonl file line by line (skipping blank lines) in binary mode.
+    """
+    with open(file_path, 'rb') as f:
+        return [_loads(line) for line in f if line.strip()]
@@ -0,0 +1,101 @@
+import threading
+from array import array
+from collections.abc import Sequence
+from src import json_codec
+from src.framed_io import FrameReader, build_frame_line_offsets, get_compression, iter_lines
+"""
+This package reads jsonl files lazily, so that inputs, requests, predictions and evaluations are parsed
+one line at a time instead of being loaded (and kept) as a whole list.
+
+- iter_jsonl : generator over the parsed lines of a file
+- JsonlReader : read-only sequence (len / index / iteration) over a file, backed by a byte-offset index
+Both read gzip / zstd compressed files (*.jsonl.gz / *.jsonl.zst, see framed_io) as well.
+"""
+
+
+def iter_jsonl(file_path):
+    """
+    Yields the parsed lines of a jsonl file one by one (blank lines are skipped).
+
+    Parameters:
+        file_path (str): path of the jsonl file.
+    """
+    for line in iter_lines(file_path):
+        if line.strip():
+            yield json_codec.loads(line)
+
+
+def build_line_offsets(file_path):
+    """
+    Returns the byte offset of every non-blank line of a jsonl file, as an array of 8 byte integers.
+    """
+    offsets = array('q')
+    offset = 0
+    with open(file_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                offsets.append(offset)
+            offset += len(line)
+    return offsets
+
+
+class JsonlReader(Sequence):
+    """
+    Lazy, read-only list of the parsed lines of a jsonl file.
+    Only the byte offsets of the lines are kept in memory (8 bytes per line; 16 for a compressed file, which also
+    keeps the frame of each line); an item is read and parsed when it is accessed, so a multi-GB file costs about as
+    much memory as one line (one frame).
+    Every access returns a freshly parsed object, so changes to an item are not kept.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._fp = None
+        self._lock = threading.Lock()
+        if get_compression(file_path) is None:
+            self.frames = None
+            self.offsets = build_line_offsets(file_path)
+        else:
+            self.frames, self.offsets = build_frame_line_offsets(file_path)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError(f"jsonl line index out of range: {idx}")
+        # judge thread 에서 동시에 읽을 수 있으므로 seek + readline 은 lock 안에서
+        with self._lock:
+            if self._fp is None:
+                self._fp = FrameReader(self.file_path)
+            if self.frames is None:
+                line = self._fp.read_line(self.offsets[idx])
+            else:
+                line = self._fp.read_line(self.frames[idx], self.offsets[idx])
+        return json_codec.loads(line)
+
+    def __iter__(self):
+        # 순차 접근은 index 없이 파일을 그대로 스트리밍 (index 이후 추가된 줄은 제외)
+        for idx, item in enumerate(iter_jsonl(self.file_path)):
+            if idx >= len(self):
+                break
+            yield item
+
+    def close(self):
+        with self._lock:
+            if self._fp is not None:
+                self._fp.close()
+                self._fp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        if self._fp is not None:
+            self._fp.close()
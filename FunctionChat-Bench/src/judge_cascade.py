@@ -0,0 +1,199 @@
+import re
+import copy
+import math
+"""
+This package implements the two-tier (cheap -> strong) judge cascade: verdict confidence, threshold calibration and statistics.
+"""
+
+CONFIDENCE_SOURCES = ['logprobs', 'self']
+CONFIDENCE_PATTERN = re.compile(r'confidence"?\s*[:=]\s*"?([01](?:\.\d+)?)', re.IGNORECASE)
+
+SELF_CONFIDENCE_INSTRUCTION = (
+    'Before the two final decision lines, write one line of the form "confidence: <number between 0 and 1>" '
+    'that states how certain you are of your decision.'
+)
+SELF_CONFIDENCE_JSON_INSTRUCTION = (
+    'Also include a "confidence" field (a number between 0 and 1) that states how certain you are of your decision.'
+)
+
+
+def with_self_confidence(prompt, verdict_format='text'):
+    """
+    Appends the self-reported confidence instruction to a judge prompt.
+    """
+    if verdict_format == 'json':
+        return f"{prompt}\n{SELF_CONFIDENCE_JSON_INSTRUCTION}"
+    return f"{prompt}\n{SELF_CONFIDENCE_INSTRUCTION}"
+
+
+def with_confidence_field(response_format):
+    """
+    Returns a copy of the json_schema response_format with a required numeric 'confidence' property.
+    """
+    if not response_format:
+        return response_format
+    response_format = copy.deepcopy(response_format)
+    schema = response_format['json_schema']['schema']
+    schema['properties']['confidence'] = {'type': 'number'}
+    schema['required'] = schema['required'] + ['confidence']
+    return response_format
+
+
+def _normalize_token(token):
+    return (token or '').strip().strip('"\'').strip().lower()
+
+
+def logprob_confidence(evaluate_response, verdict, first=False):
+    """
+    Returns the probability of the verdict token, normalized over the pass/fail alternatives in top_logprobs.
+
+    Parameters:
+        evaluate_response (dict): judge response requested with logprobs/top_logprobs.
+        verdict (str): the parsed verdict (pass | fail).
+        first (bool): use the first verdict token (json verdicts put the verdict field first)
+                      instead of the last one (text verdicts end with the decision lines).
+    Returns:
+        float: confidence in [0, 1], or None if the response carries no usable logprobs.
+    """
+    choices = evaluate_response.get('choices') or []
+    logprobs = (choices[0].get('logprobs') or {}) if choices else {}
+    tokens = [token for token in logprobs.get('content') or [] if _normalize_token(token.get('token')) == verdict]
+    if not tokens:
+        return None
+    token = tokens[0] if first else tokens[-1]
+    mass = {'pass': 0.0, 'fail': 0.0}
+    for alternative in token.get('top_logprobs') or [token]:
+        key = _normalize_token(alternative.get('token'))
+        if key in mass:
+            mass[key] += math.exp(alternative.get('logprob', -math.inf))
+    total = mass['pass'] + mass['fail']
+    if total <= 0.0:
+        return math.exp(token.get('logprob', -math.inf))
+    return mass[verdict] / total
+
+
+def self_confidence(content):
+    """
+    Parses a self-reported 'confidence: 0.x' (text) or '"confidence": 0.x' (json) value from the judge output.
+    """
+    if not content:
+        return None
+    matches = CONFIDENCE_PATTERN.findall(content)
+    if not matches:
+        return None
+    return min(max(float(matches[-1]), 0.0), 1.0)
+
+
+def calibrate_threshold(samples, target_agreement=0.98):
+    """
+    Picks the lowest confidence threshold whose accepted (not escalated) cheap verdicts agree with the strong judge
+    at least `target_agreement` of the time. Escalated items are graded by the strong judge, so they always agree.
+
+    Parameters:
+        samples (list): (confidence, cheap_verdict, strong_verdict) tuples. confidence may be None (always escalated).
+        target_agreement (float): minimum overall agreement with the strong judge.
+    Returns:
+        list: one dict per candidate threshold (threshold, escalation_rate, agreement), sorted by threshold.
+        dict: the chosen row, or None if there are no samples.
+    """
+    if not samples:
+        return [], None
+    thresholds = sorted({0.0, 1.01} | {conf for conf, _, _ in samples if conf is not None})
+    rows = []
+    for threshold in thresholds:
+        escalated, agree = 0, 0
+        for conf, cheap_verdict, strong_verdict in samples:
+            if conf is None or conf < threshold:
+                escalated += 1
+                agree += 1
+            else:
+                agree += int(cheap_verdict == strong_verdict)
+        rows.append({
+            'threshold': threshold,
+            'escalation_rate': escalated / len(samples),
+            'agreement': agree / len(samples),
+        })
+    chosen = next((row for row in rows if row['agreement'] >= target_agreement), rows[-1])
+    return rows, chosen
+
+
+class JudgeCascadeStats:
+    """
+    Accumulates per type_of_output statistics of the judge cascade:
+    how many items were settled by the cheap judge, how many escalated, the cheap/strong agreement on escalated items,
+    and the token usage and latency of each tier.
+    """
+    def __init__(self):
+        self.stats = {}
+
+    def _get(self, output_type):
+        if output_type not in self.stats:
+            self.stats[output_type] = {
+                'items': 0, 'escalated': 0, 'compared': 0, 'agree': 0,
+                'cheap_tokens': 0, 'strong_tokens': 0, 'cheap_latency': 0.0, 'strong_latency': 0.0,
+            }
+        return self.stats[output_type]
+
+    def add(self, output_type, cheap_usage, cheap_latency, strong_usage=None, strong_latency=0.0, agree=None):
+        """
+        Parameters:
+            output_type (str): type_of_output of the item.
+            cheap_usage (dict): usage of the cheap judge response.
+            cheap_latency (float): latency of the cheap judge call.
+            strong_usage (dict): usage of the strong judge response, None if the item was not escalated.
+            strong_latency (float): latency of the strong judge call.
+            agree (bool): whether the cheap and strong verdicts agree (escalated items only).
+        """
+        stats = self._get(output_type)
+        stats['items'] += 1
+        stats['cheap_tokens'] += (cheap_usage or {}).get('total_tokens') or 0
+        stats['cheap_latency'] += cheap_latency
+        if strong_usage is None:
+            return
+        stats['escalated'] += 1
+        stats['strong_tokens'] += strong_usage.get('total_tokens') or 0
+        stats['strong_latency'] += strong_latency
+        if agree is not None:
+            stats['compared'] += 1
+            stats['agree'] += int(agree)
+
+    def get_stats(self):
+        """
+        Returns per type_of_output (and 'total') statistics. Savings are estimated against grading every item
+        with the strong judge, using the average strong-judge tokens/latency of the escalated items.
+        saved_strong_tokens counts the strong-judge tokens avoided, saved_tokens is the net saving after the
+        tokens of the cheap judge (negative when the cascade uses more tokens than the strong judge alone).
+        """
+        total = {}
+        for stats in self.stats.values():
+            for key, value in stats.items():
+                total[key] = total.get(key, 0) + value
+        rows = dict(self.stats)
+        if total:
+            rows['total'] = total
+        result = {}
+        for output_type, stats in rows.items():
+            if not stats['items']:
+                continue
+            row = dict(stats)
+            row['escalation_rate'] = stats['escalated'] / stats['items']
+            row['escalated_agreement'] = stats['agree'] / stats['compared'] if stats['compared'] else None
+            if stats['escalated']:
+                strong_only_tokens = stats['strong_tokens'] / stats['escalated'] * stats['items']
+                strong_only_latency = stats['strong_latency'] / stats['escalated'] * stats['items']
+                cascade_latency = stats['cheap_latency'] + stats['strong_latency']
+                row['saved_strong_calls'] = stats['items'] - stats['escalated']
+                row['saved_strong_tokens'] = int(strong_only_tokens - stats['strong_tokens'])
+                row['saved_tokens'] = int(strong_only_tokens - stats['strong_tokens'] - stats['cheap_tokens'])
+                row['saved_latency_ratio'] = 1 - cascade_latency / strong_only_latency if strong_only_latency else 0.0
+            result[output_type] = row
+        return result
+
+    def display(self):
+        for output_type, row in self.get_stats().items():
+            agreement = row['escalated_agreement']
+            agreement = f"{agreement:.1%}" if agreement is not None else '-'
+            print(f"[[judge cascade]] {output_type} : items {row['items']}, escalated {row['escalated']} "
+                  f"({row['escalation_rate']:.1%}), cheap/strong agreement on escalated {agreement}, "
+                  f"saved strong calls {row.get('saved_strong_calls', row['items'])}"
+                  + (f", net saved tokens ~{row['saved_tokens']}" if 'saved_tokens' in row else ''))
@@ -0,0 +1,125 @@
+import re
+import json
+from src.judge_verdict import ERROR_TYPES
+"""
+This package contains helpers for packed judging (grading several items in one judge request).
+"""
+
+# stream 모드에서 한 번에 모으는 item 수 = pack_size * PACK_WINDOW_FACTOR
+PACK_WINDOW_FACTOR = 4
+VERDICTS = ['pass', 'fail']
+OBJECT_PATTERN = re.compile(r'\{[^{}]*\}', re.DOTALL)
+
+# verdict_format 'json' 의 pack 응답 형식 (strict schema 는 최상위가 object 여야 하므로 배열을 'verdicts' 로 감쌈)
+PACKED_VERDICTS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "packed_judge_verdicts",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "verdicts": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "item": {"type": "integer"},
+                            "verdict": {"type": "string", "enum": VERDICTS},
+                            "error_type": {"type": "string", "enum": ERROR_TYPES},
+                            "reason": {"type": "string"},
+                        },
+                        "required": ["item", "verdict", "error_type", "reason"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["verdicts"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# pack prompt 는 str.format 으로 채우므로 중괄호를 escape
+PACKED_JSON_VERDICT_INSTRUCTION = (
+    'Does each submission meet the criteria? Respond with only a JSON object of the form '
+    '{{"verdicts": [{{"item": <item number>, "verdict": "pass" or "fail", "error_type": "<error type>", '
+    '"reason": "<one or two sentences in Korean>"}}, ...]}} containing exactly one verdict per item, in item order. '
+    f'"error_type" must be one of {json.dumps(ERROR_TYPES)}, and "none" if the verdict is "pass".'
+)
+
+
+def extract_criterion(rubric_prompt):
+    """
+    Returns the static '[Criterion]: ...' block of a rubric prompt (default or cache layout).
+    """
+    start = rubric_prompt.index('[Criterion]')
+    end = rubric_prompt.find('\n***\n', start)
+    return rubric_prompt[start:end if end >= 0 else None].strip()
+
+
+def to_json_verdict_pack_prompt(pack_prompt):
+    """
+    Replaces the JSON array answer instruction at the end of the pack prompt with the JSON verdicts instruction
+    (verdict_format 'json', see PACKED_VERDICTS_RESPONSE_FORMAT).
+    """
+    idx = pack_prompt.rfind('Does each submission meet the criteria?')
+    if idx < 0:
+        return f"{pack_prompt}\n{PACKED_JSON_VERDICT_INSTRUCTION}"
+    return pack_prompt[:idx] + PACKED_JSON_VERDICT_INSTRUCTION
+
+
+def _load_objects(content):
+    start, end = content.find('['), content.rfind(']')
+    if 0 <= start < end:
+        try:
+            objects = json.loads(content[start:end + 1])
+            if isinstance(objects, list):
+                return objects
+        except json.JSONDecodeError:
+            pass
+    # 배열 전체가 깨졌으면 개별 object 단위로 복구
+    objects = []
+    for matched in OBJECT_PATTERN.findall(content):
+        try:
+            objects.append(json.loads(matched))
+        except json.JSONDecodeError:
+            continue
+    return objects
+
+
+def parse_packed_verdicts(content, size):
+    """
+    Parses the JSON array verdicts of a packed judge response.
+
+    Parameters:
+        content (str): judge response text.
+        size (int): number of items in the packed request.
+
+    Returns:
+        list: {'verdict': 'pass'|'fail', 'error_type': str, 'reason': str} per item (1..size), None for missing or malformed items.
+    """
+    verdicts = [None] * size
+    if not content:
+        return verdicts
+    for position, obj in enumerate(_load_objects(content)):
+        if not isinstance(obj, dict):
+            continue
+        item_num = obj.get('item', position + 1)
+        try:
+            item_num = int(item_num)
+        except (TypeError, ValueError):
+            continue
+        verdict = str(obj.get('verdict', '')).strip().strip('"').lower()
+        if not 1 <= item_num <= size or verdict not in VERDICTS or verdicts[item_num - 1] is not None:
+            continue
+        # parse_json_verdict 와 같이 알 수 없는 error_type 은 'other' 로 기록
+        error_type = str(obj.get('error_type') or ('none' if verdict == 'pass' else 'other')).strip().lower()
+        if error_type not in ERROR_TYPES:
+            error_type = 'other'
+        verdicts[item_num - 1] = {
+            'verdict': verdict,
+            'error_type': error_type,
+            'reason': str(obj.get('reason', '')).strip(),
+        }
+    return verdicts
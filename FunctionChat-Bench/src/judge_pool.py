@@ -0,0 +1,192 @@
+import time
+import random
+import logging
+import threading
+from collections import deque
+"""
+This package spreads judge calls across a pool of API keys / endpoints with per-member rate budgets and failover.
+"""
+
+# 재시도해도 해결되지 않는 인증/크레딧 오류 -> 해당 member 를 pool 에서 제외
+FATAL_STATUS_CODES = (401, 402, 403)
+# 일시적인 rate limit -> cooldown 후 다른 member 로 failover
+RATE_LIMIT_STATUS_CODES = (429,)
+# 5xx / timeout / 연결 오류 -> member 안에서는 MEMBER_MAX_RETRIES 번만 시도하고 cooldown 후 다른 member 로 failover
+TRANSIENT_ERROR_NAMES = ('APITimeoutError', 'APIConnectionError', 'InternalServerError', 'ServiceUnavailableError',
+                         'Timeout', 'ReadTimeout', 'ConnectTimeout')
+MEMBER_MAX_RETRIES = 2
+# 한 호출이 pool 전체에서 5xx / timeout 으로 실패할 수 있는 횟수 (단일 executor 의 재시도 횟수와 같음)
+MAX_TRANSIENT_FAILURES = 8
+DEFAULT_COOLDOWN = 30.0
+RATE_WINDOW = 60.0
+
+
+class JudgePoolExhausted(Exception):
+    pass
+
+
+def is_transient_error(e):
+    """
+    Returns True for server errors (5xx), timeouts and connection errors, which another member may not have.
+    """
+    status_code = getattr(e, 'status_code', None)
+    if status_code is not None:
+        return status_code >= 500
+    return isinstance(e, (TimeoutError, ConnectionError)) or type(e).__name__ in TRANSIENT_ERROR_NAMES
+
+
+class JudgePoolMember:
+    """
+    One judge endpoint of the pool with its rate budget (requests / tokens per minute) and health state.
+    """
+    def __init__(self, name, executor, weight=1.0, rpm=None, tpm=None):
+        self.name = name
+        self.executor = executor
+        self.weight = float(weight)
+        self.rpm = int(rpm) if rpm else None
+        self.tpm = int(tpm) if tpm else None
+        self.requests = deque()
+        self.tokens = deque()
+        self.cooldown_until = 0.0
+        self.disabled = None
+        self.stats = {'requests': 0, 'failures': 0, 'rate_limited': 0, 'transient': 0,
+                      'prompt_tokens': 0, 'completion_tokens': 0}
+
+    def _trim(self, now):
+        while self.requests and now - self.requests[0] > RATE_WINDOW:
+            self.requests.popleft()
+        while self.tokens and now - self.tokens[0][0] > RATE_WINDOW:
+            self.tokens.popleft()
+
+    def remaining_ratio(self, now):
+        """
+        Returns the remaining fraction (0~1) of the tighter of the rpm/tpm budgets in the last minute.
+        """
+        self._trim(now)
+        ratio = 1.0
+        if self.rpm:
+            ratio = min(ratio, 1.0 - len(self.requests) / self.rpm)
+        if self.tpm:
+            ratio = min(ratio, 1.0 - sum(tokens for _, tokens in self.tokens) / self.tpm)
+        return max(ratio, 0.0)
+
+    def is_available(self, now):
+        return self.disabled is None and now >= self.cooldown_until and self.remaining_ratio(now) > 0.0
+
+    def next_available_at(self, now):
+        if self.disabled is not None:
+            return None
+        at = max(now, self.cooldown_until)
+        if self.remaining_ratio(now) <= 0.0:
+            oldest = [self.requests[0]] if self.requests else []
+            oldest += [self.tokens[0][0]] if self.tokens else []
+            if oldest:
+                at = max(at, min(oldest) + RATE_WINDOW)
+        return at
+
+    def release(self, reserved_at):
+        # 이 호출이 잡은 요청 슬롯만 반납 (동시 호출의 더 최근 예약은 유지)
+        try:
+            self.requests.remove(reserved_at)
+        except ValueError:
+            # rate window 가 지나 이미 _trim 된 경우
+            pass
+
+    def record(self, now, response):
+        usage = response.get('usage') or {}
+        self.stats['requests'] += 1
+        self.stats['prompt_tokens'] += usage.get('prompt_tokens') or 0
+        self.stats['completion_tokens'] += usage.get('completion_tokens') or 0
+        self.requests.append(now)
+        self.tokens.append((now, usage.get('total_tokens') or 0))
+
+
+class JudgePoolExecutor:
+    """
+    An executor with the same predict() interface as the single judge executors, backed by several members.
+
+    - Each call goes to an available member chosen at random, weighted by `weight` x the remaining rpm/tpm budget.
+    - On 429 the member cools down (Retry-After or `cooldown` seconds) and the call fails over to another member.
+    - On 401/402/403 the member is removed from the pool and the call fails over.
+    - On server errors (5xx), timeouts and connection errors, which the member retries MEMBER_MAX_RETRIES times, the
+      member cools down and the call fails over; the call raises after MAX_TRANSIENT_FAILURES such failures.
+    - When every member is cooling down or out of budget, the call waits for the earliest one instead of failing.
+      JudgePoolExhausted is raised only when every member has been removed.
+    """
+    def __init__(self, members, cooldown=DEFAULT_COOLDOWN):
+        if not members:
+            raise ValueError("judge_pool must have at least one member")
+        self.members = members
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.model = members[0].executor.model
+
+    def _acquire(self):
+        while True:
+            with self.lock:
+                now = time.time()
+                available = [member for member in self.members if member.is_available(now)]
+                if available:
+                    weights = [member.weight * member.remaining_ratio(now) for member in available]
+                    member = random.choices(available, weights=weights)[0]
+                    # 응답 전에 요청 슬롯을 먼저 잡아 동시 호출이 같은 budget 을 초과하지 않도록 함
+                    member.requests.append(now)
+                    return member, now
+                waits = [at for at in (member.next_available_at(now) for member in self.members) if at is not None]
+                if not waits:
+                    raise JudgePoolExhausted("every judge pool member is disabled: " + ', '.join(
+                        f"{member.name}({member.disabled})" for member in self.members))
+                wait_time = max(min(waits) - now, 0.1)
+            logging.warning(f"judge pool: every member is rate limited, waiting {wait_time:.1f}s")
+            time.sleep(wait_time)
+
+    def predict(self, api_request):
+        transient_failures = 0
+        while True:
+            member, reserved_at = self._acquire()
+            try:
+                response = member.executor.predict(api_request)
+            except Exception as e:
+                status_code = getattr(e, 'status_code', None)
+                with self.lock:
+                    member.release(reserved_at)
+                    member.stats['failures'] += 1
+                    if status_code in FATAL_STATUS_CODES:
+                        member.disabled = status_code
+                        logging.error(f"judge pool: {member.name} disabled ({status_code}), failing over")
+                        continue
+                    if status_code in RATE_LIMIT_STATUS_CODES:
+                        member.stats['rate_limited'] += 1
+                        member.cooldown_until = time.time() + self._get_retry_after(e)
+                        logging.warning(f"judge pool: {member.name} rate limited, failing over")
+                        continue
+                    if is_transient_error(e) and transient_failures + 1 < MAX_TRANSIENT_FAILURES:
+                        transient_failures += 1
+                        member.stats['transient'] += 1
+                        member.cooldown_until = time.time() + self.cooldown
+                        logging.warning(f"judge pool: {member.name} failed ({type(e).__name__}), failing over")
+                        continue
+                raise
+            with self.lock:
+                member.release(reserved_at)
+                member.record(time.time(), response)
+            return response
+
+    def _get_retry_after(self, e):
+        headers = getattr(getattr(e, 'response', None), 'headers', None) or {}
+        try:
+            return float(headers.get('retry-after'))
+        except (TypeError, ValueError):
+            return self.cooldown
+
+    def get_stats(self):
+        return {
+            member.name: dict(member.stats, disabled=member.disabled, weight=member.weight, rpm=member.rpm, tpm=member.tpm)
+            for member in self.members
+        }
+
+    def display(self):
+        for name, stats in self.get_stats().items():
+            state = f"disabled({stats['disabled']})" if stats['disabled'] else 'ok'
+            print(f"[[judge pool]] {name} : requests {stats['requests']}, failures {stats['failures']} "
+                  f"(rate limited {stats['rate_limited']}, server error/timeout {stats['transient']}), {state}")
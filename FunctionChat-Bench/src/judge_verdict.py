@@ -0,0 +1,83 @@
+import json
+"""
+This package defines the structured (JSON) judge verdict protocol.
+"""
+
+ERROR_TYPES = [
+    'none',             # pass
+    'selection',        # 함수 미선택 / 다른 함수 선택
+    'function_name',    # 함수 이름 오류
+    'argument_key',     # 인자 key 오류
+    'argument_value',   # 인자 값/타입 오류
+    'hallucination',    # query 에 없는 값 생성
+    'missing_info',     # 필수 정보 누락 / slot 질문 누락
+    'unnecessary_call', # 불필요한 tool 호출
+    'no_call',          # tool 호출이 필요한데 호출하지 않음
+    'language',         # 한국어가 아닌 응답
+    'other',
+]
+
+# verdict/error_type 은 짧고 reason 은 1~2 문장이므로 free-text 채점보다 작은 max_tokens 로 충분
+JSON_VERDICT_MAX_TOKENS = 200
+
+VERDICT_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "judge_verdict",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "verdict": {"type": "string", "enum": ["pass", "fail"]},
+                "error_type": {"type": "string", "enum": ERROR_TYPES},
+                "reason": {"type": "string"},
+            },
+            "required": ["verdict", "error_type", "reason"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# rubric 은 str.format 으로 채우므로 중괄호를 escape
+JSON_VERDICT_INSTRUCTION = (
+    'Does the submission meet the criteria? Respond with only a JSON object of the form '
+    '{{"verdict": "pass" or "fail", "error_type": "<error type>", "reason": "<one or two sentences in Korean>"}}. '
+    f'"error_type" must be one of {json.dumps(ERROR_TYPES)}, and "none" if the verdict is "pass".'
+)
+
+
+def to_json_verdict_rubric(rubric_prompt):
+    """
+    Replaces the free-text answer instruction at the end of a rubric with the JSON verdict instruction.
+    """
+    idx = rubric_prompt.rfind('Does the submission meet the criteria?')
+    if idx < 0:
+        return f"{rubric_prompt}\n{JSON_VERDICT_INSTRUCTION}"
+    return rubric_prompt[:idx] + JSON_VERDICT_INSTRUCTION
+
+
+def parse_json_verdict(content):
+    """
+    Parses a JSON verdict from the judge response text.
+
+    Returns:
+        dict: {'verdict': 'pass'|'fail', 'error_type': str, 'reason': str}, or None if the content is not a valid verdict.
+    """
+    if not content:
+        return None
+    start, end = content.find('{'), content.rfind('}')
+    if not 0 <= start < end:
+        return None
+    try:
+        data = json.loads(content[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    verdict = str(data.get('verdict', '')).strip().lower()
+    if verdict not in ['pass', 'fail']:
+        return None
+    error_type = str(data.get('error_type') or ('none' if verdict == 'pass' else 'other')).strip().lower()
+    if error_type not in ERROR_TYPES:
+        error_type = 'other'
+    return {'verdict': verdict, 'error_type': error_type, 'reason': str(data.get('reason', '')).strip()}
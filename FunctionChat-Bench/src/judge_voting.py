@@ -0,0 +1,129 @@
+from src.formatter import convert_eval_key
+from src.judge_verdict import parse_json_verdict
+from src.constants import PASS_STR, FAIL_STR
+"""
+This package implements sequential (early stopping) majority voting over judge samples.
+"""
+
+
+def new_votes(max_samples):
+    return {'max': max_samples, 'samples': 0, 'requests': 0, PASS_STR: 0, FAIL_STR: 0, 'invalid': 0}
+
+
+def get_majority_size(votes):
+    return votes['max'] // 2 + 1
+
+
+def is_decided(votes):
+    """
+    A vote is decided once one verdict holds a majority of `max` samples, or `max` samples were drawn.
+    """
+    majority_size = get_majority_size(votes)
+    return votes[PASS_STR] >= majority_size or votes[FAIL_STR] >= majority_size or votes['samples'] >= votes['max']
+
+
+def next_increment(votes):
+    """
+    Returns how many samples to request next: the fewest that could still decide the vote
+    (e.g. 2 for the first request of a best-of-3, then 1 if the two disagree).
+    """
+    needed = get_majority_size(votes) - max(votes[PASS_STR], votes[FAIL_STR])
+    return max(1, min(needed, votes['max'] - votes['samples']))
+
+
+def choice_verdict(choice, verdict_format='text'):
+    """
+    Returns the pass/fail verdict of one judge choice, or None if it cannot be parsed.
+    """
+    content = (choice.get('message') or {}).get('content')
+    if not content:
+        return None
+    response = {'choices': [choice]}
+    if verdict_format == 'json':
+        response['verdict'] = parse_json_verdict(content)
+    verdict = convert_eval_key(response)
+    return verdict if verdict in [PASS_STR, FAIL_STR] else None
+
+
+def add_votes(votes, response, verdict_format='text'):
+    """
+    Counts the verdict of every choice in the judge response. A response without choices counts as one invalid sample.
+    """
+    choices = response.get('choices') or []
+    votes['requests'] += 1
+    votes['samples'] += max(len(choices), 1)
+    if not choices:
+        votes['invalid'] += 1
+    for choice in choices:
+        verdict = choice_verdict(choice, verdict_format)
+        votes[verdict or 'invalid'] += 1
+    return votes
+
+
+def merge_vote_responses(responses, votes, verdict_format='text'):
+    """
+    Merges the judge responses of one item into a single evaluate response.
+    A choice with the majority verdict is placed first (so convert_eval_key reads the majority verdict),
+    all choices and the summed usage are kept, and the vote split is recorded under 'votes'.
+    Ties are broken by the earliest valid sample.
+    """
+    choices = [choice for response in responses for choice in response.get('choices') or []]
+    choice_verdicts = [choice_verdict(choice, verdict_format) for choice in choices]
+    if votes[PASS_STR] != votes[FAIL_STR]:
+        verdict = PASS_STR if votes[PASS_STR] > votes[FAIL_STR] else FAIL_STR
+    else:
+        verdict = next((v for v in choice_verdicts if v is not None), None)
+    if verdict is not None:
+        first = choice_verdicts.index(verdict)
+        choices = [choices[first]] + choices[:first] + choices[first + 1:]
+    usage = {}
+    for response in responses:
+        for key, value in (response.get('usage') or {}).items():
+            if isinstance(value, (int, float)):
+                usage[key] = usage.get(key, 0) + value
+    merged = {k: v for k, v in responses[0].items() if k not in ['choices', 'usage', 'verdict']}
+    merged['choices'] = [dict(choice, index=index) for index, choice in enumerate(choices)]
+    merged['usage'] = usage
+    valid = votes[PASS_STR] + votes[FAIL_STR]
+    merged['votes'] = dict(votes, verdict=verdict,
+                           agreement=max(votes[PASS_STR], votes[FAIL_STR]) / valid if valid else 0.0)
+    if verdict_format == 'json' and choices:
+        json_verdict = parse_json_verdict(choices[0]['message'].get('content'))
+        if json_verdict is not None:
+            merged['verdict'] = json_verdict
+    return merged
+
+
+class VoteStats:
+    """
+    Accumulates how many samples/requests majority voting used and how often the votes were unanimous.
+    """
+    def __init__(self):
+        self.stats = {'items': 0, 'samples': 0, 'max_samples': 0, 'requests': 0, 'unanimous': 0, 'agreement': 0.0}
+
+    def add(self, votes):
+        self.stats['items'] += 1
+        self.stats['max_samples'] += votes['max']
+        self.stats['samples'] += votes['samples']
+        self.stats['requests'] += votes['requests']
+        valid = votes[PASS_STR] + votes[FAIL_STR]
+        self.stats['unanimous'] += int(valid == votes['samples'] and max(votes[PASS_STR], votes[FAIL_STR]) == valid)
+        self.stats['agreement'] += max(votes[PASS_STR], votes[FAIL_STR]) / valid if valid else 0.0
+
+    def get_stats(self):
+        items = self.stats['items']
+        return {
+            'max': self.stats['max_samples'] / items,
+            'items': items,
+            'avg_samples': self.stats['samples'] / items,
+            'avg_requests': self.stats['requests'] / items,
+            'unanimous_ratio': self.stats['unanimous'] / items,
+            'mean_agreement': self.stats['agreement'] / items,
+            'saved_samples_ratio': 1 - self.stats['samples'] / self.stats['max_samples'],
+        }
+
+    def display(self):
+        stats = self.get_stats()
+        print(f"[[judge votes]] items : {stats['items']}, best of {stats['max']:g}, "
+              f"avg samples : {stats['avg_samples']:.2f} (saved {stats['saved_samples_ratio']:.1%}), "
+              f"unanimous : {stats['unanimous_ratio']:.1%}, mean agreement : {stats['mean_agreement']:.1%}")
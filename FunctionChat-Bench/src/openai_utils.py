@@ -4,8 +4,8 @@ import traceback
 from functools import wraps
 
 
-def get_openai_batch_format(custom_id, openai_model, messages, max_tokens=8192, n: int = 1):
-    return {
+def get_openai_batch_format(custom_id, openai_model, messages, max_tokens=8192, n: int = 1, response_format=None):
+    batch_format = {
         "custom_id": custom_id,
         "method": "POST",
         "url": "/v1/chat/completions",
@@ -16,3 +16,7 @@ def get_openai_batch_format(custom_id, openai_model, messages, max_tokens=8192,
             "n": int(n) if n else 1,
         }
     }
+    if response_format:
+        batch_format["body"]["response_format"] = response_format
+    return batch_format
+
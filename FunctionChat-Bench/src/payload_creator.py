@@ -1,9 +1,13 @@
 import os
-import json
 from functools import wraps
 from typing import Any, Callable
 from tqdm import tqdm
 from src import utils
+from src import json_codec
+from src import run_manifest
+from src.framed_io import LineWriter
+from src.jsonl_reader import JsonlReader
+from src.request_catalog import RequestCatalogWriter, RequestReader, get_catalog_file_path
 from src.formatter import (
     CommonRequestFormatter,
     DialogRequestFormatter,
@@ -46,7 +50,7 @@ class AbstractPayloadCreator:
     """
     An abstract class designed to create payloads for API requests based on provided parameters and system prompts.
     """
-    def __init__(self, temperature, max_size, system_prompt_file_path):
+    def __init__(self, temperature, max_size, system_prompt_file_path, n=1):
         """
         Initializes the payload creator with temperature settings, maximum payload list size, and a path to a system prompt file.
 
@@ -54,12 +58,16 @@ class AbstractPayloadCreator:
             temperature (float): Determines the variability of the model's responses.
             max_size (int): Maximum size or number of payloads to maintain.
             system_prompt_file_path (str): Path to a file containing the prompt text used in payloads.
+            n (int): Number of samples to generate per request (pass@k).
         """
         self.temperature = temperature
+        self.n = int(n or 1)
         self.max_size = max_size
         self.system_prompt = None
         if system_prompt_file_path:
             self.system_prompt = self.get_prompt_text(system_prompt_file_path)
+        self.validated_formatters = set()
+        self.request_hashes = []
 
     def create_payload(self, **kwargs):
         """
@@ -70,6 +78,57 @@ class AbstractPayloadCreator:
         """
         raise NotImplementedError("Subclasses must implement this method.")
 
+    def format_request(self, formatter_class, arguments):
+        """
+        Returns the request jsonl line of the arguments. The field types are validated on the first request of
+        each formatter (i.e. once per dataset file) instead of on every request.
+
+        Parameters:
+            formatter_class (type): RequestFormatter subclass of the evaluation type.
+            arguments (dict): request fields.
+
+        Returns:
+            str: The request serialized as one JSON line.
+        """
+        if formatter_class not in self.validated_formatters:
+            formatter_class.validate(arguments)
+            self.validated_formatters.add(formatter_class)
+        request = formatter_class(**arguments).to_dict()
+        # request 별 content hash (run manifest, 예측 / 채점 재사용 판단에 사용)
+        self.request_hashes.append(run_manifest.get_item_hash(request))
+        return f"{json_codec.dumps(request)}\n"
+
+    def get_manifest_config(self, kwargs):
+        """
+        Returns what the request file depends on besides its items (see run_manifest):
+        the dataset file, the system prompt, temperature, n and tools_type.
+        """
+        return {
+            'kind': 'request',
+            'creator': type(self).__name__,
+            'input': run_manifest.get_file_hash(kwargs['input_file_path']),
+            'system_prompt': run_manifest.get_text_hash(self.system_prompt),
+            'temperature': self.temperature,
+            'n': self.n,
+            'tools_type': kwargs.get('tools_type'),
+        }
+
+    def open_request_file(self, request_file_path):
+        """
+        Opens the request file and its catalog for writing.
+        """
+        self.request_hashes = []
+        return LineWriter(request_file_path), RequestCatalogWriter(get_catalog_file_path(request_file_path))
+
+    def close_request_file(self, request_file_path, fi, catalog, config):
+        """
+        Closes the request file and its catalog, writes the run manifest and returns the lazy request list.
+        """
+        fi.close()
+        catalog.close()
+        run_manifest.save_manifest(request_file_path, config, [], self.request_hashes)
+        return RequestReader(request_file_path)
+
     def get_prompt_text(self, file_path):
         """
         Retrieves and returns the prompt text from a specified file.
@@ -86,19 +145,25 @@ class AbstractPayloadCreator:
                 prompt = ff.read().strip()
         return prompt
 
-    def load_cached_payload(self, request_file_path):
+    def load_cached_payload(self, request_file_path, config):
         """
-        Loads cached payload list from a specified file if it exists and meets the required size.
+        Loads cached payload list from a specified file if its run manifest matches the current config
+        (dataset content, system prompt, temperature, n, tools_type).
 
         Parameters:
             request_file_path (str): Path to the file containing cached payloads.
+            config (dict): current manifest config (see get_manifest_config).
 
         Returns:
-            list: A list of cached payloads if they exist; otherwise, an empty list.
+            RequestReader: A lazy list of cached payloads if they exist; otherwise, an empty list.
         """
         if utils.is_exist_file(request_file_path):
-            api_request_list = utils.load_to_jsonl(request_file_path)
-            if len(api_request_list) == self.max_size:
+            # manifest 의 config hash / 파일 크기만 비교 (request 파일은 읽지 않음),
+            # catalog id 로 기록된 request 는 catalog 파일이 있어야 복원 가능
+            is_cached = (run_manifest.is_fresh(request_file_path, config, [])
+                         and os.path.isfile(get_catalog_file_path(request_file_path)))
+            if is_cached:
+                api_request_list = RequestReader(request_file_path)
                 print(f"[[already existed request jsonl file]] ..{len(api_request_list)}\npath : {request_file_path}")
                 print(f"[[already existed request jsonl file]] ..{len(api_request_list)}")
                 return api_request_list
@@ -109,21 +174,22 @@ class AbstractPayloadCreator:
 
 
 class CommonPayloadCreator(AbstractPayloadCreator):
-    def __init__(self, temperature):
-        super().__init__(temperature, 0, None)
+    def __init__(self, temperature, n=1):
+        super().__init__(temperature, 0, None, n)
 
     @type_check(validate_params)
     def create_payload(self, **kwargs):
-        test_set = utils.load_to_jsonl(kwargs['input_file_path'])
+        test_set = JsonlReader(kwargs['input_file_path'])
         self.max_size = len(test_set)
-        api_request_list = []
+        config = self.get_manifest_config(kwargs)
         if kwargs['reset'] is False:
-            api_request_list = self.load_cached_payload(kwargs['request_file_path'])
-            if len(api_request_list) == self.max_size:
+            api_request_list = self.load_cached_payload(kwargs['request_file_path'], config)
+            if len(api_request_list) > 0:
                 return api_request_list
         else:
             print("[[reset!! create requests jsonl file]]")
-        # 2. create requests json list
+        # 2. create requests json list (한 건씩 바로 requests jsonl 파일에 기록, tools / messages 는 catalog 에 한 번만 기록)
+        fi, catalog = self.open_request_file(kwargs['request_file_path'])
         for idx, test_input in enumerate(tqdm(test_set)):
             # test_input keys = ['serial_num', 'category', 'input_message', 'input_tools', 'type_of_output', 'ground_truth', 'acceptable_arguments']
             serial_num = test_input['serial_num']
@@ -135,80 +201,76 @@ class CommonPayloadCreator(AbstractPayloadCreator):
             arguments = {}
             arguments['serial_num'] = serial_num
             arguments['category'] = category
-            arguments['tools'] = tools
+            arguments['tool_ids'] = catalog.intern_tools(tools)
             arguments['ground_truth'] = ground_truth
             arguments['type_of_output'] = type_of_output
             arguments['acceptable_arguments'] = acceptable_arguments
-            arguments['messages'] = test_input['input_messages']
+            arguments['messages_id'] = catalog.intern_messages(test_input['input_messages'])
             arguments['temperature'] = self.temperature
             arguments['tool_choice'] = 'auto'
-            api_request_list.append(CommonRequestFormatter(**arguments).to_dict())
-        # 3. write requests jsonl file
-        fi = open(kwargs['request_file_path'], 'w')
-        for api_request in api_request_list:
-            fi.write(f"{json.dumps(api_request, ensure_ascii=False)}\n")
-        fi.close()
-        return api_request_list
+            arguments['n'] = self.n
+            fi.write(self.format_request(CommonRequestFormatter, arguments))
+        return self.close_request_file(kwargs['request_file_path'], fi, catalog, config)
 
 
 class DialogPayloadCreator(AbstractPayloadCreator):
-    def __init__(self, temperature, system_prompt_file_path):
-        super().__init__(temperature, 200, system_prompt_file_path)
+    def __init__(self, temperature, system_prompt_file_path, n=1):
+        super().__init__(temperature, 200, system_prompt_file_path, n)
 
     @type_check(validate_params)
     def create_payload(self, **kwargs):
-        test_set = utils.load_to_jsonl(kwargs['input_file_path'])
+        test_set = JsonlReader(kwargs['input_file_path'])
         # update input file max_size
         self.max_size = len(test_set)
         # kwargs keys = ['input_file_path', 'request_file_path', 'reset']
         # 1. check to cached file
-        api_request_list = []
+        config = self.get_manifest_config(kwargs)
         if kwargs['reset'] is False:
-            api_request_list = self.load_cached_payload(kwargs['request_file_path'])
-            if len(api_request_list) == self.max_size:
+            api_request_list = self.load_cached_payload(kwargs['request_file_path'], config)
+            if len(api_request_list) > 0:
                 return api_request_list
         else:
             print("[[reset!! create requests jsonl file]]")
-        # 2. create requests json list
+        # 2. create requests json list (한 건씩 바로 requests jsonl 파일에 기록)
+        #    (tools 는 dialog 당 한 번, 이전 turn 과 겹치는 history 는 prefix node 를 공유해 catalog 에 한 번만 기록)
+        fi, catalog = self.open_request_file(kwargs['request_file_path'])
         for idx, test_input in enumerate(tqdm(test_set)):
             # test_input keys = ['dialog_num', 'tools_count', 'tools', 'turns']
-            tools = test_input['tools']
+            tool_ids = catalog.intern_tools(test_input['tools'])
             for turn in test_input['turns']:
                 messages = [{'role': 'system', 'content': self.system_prompt}]
                 messages.extend(turn['query'])
                 arguments = {key: turn[key] for key in ['serial_num', 'ground_truth', 'acceptable_arguments', 'type_of_output']}
-                arguments['tools'] = tools
-                arguments['messages'] = messages
+                arguments['tool_ids'] = tool_ids
+                arguments['messages_id'] = catalog.intern_messages(messages)
                 arguments['temperature'] = self.temperature
                 arguments['tool_choice'] = 'auto'
-                api_request_list.append(DialogRequestFormatter(**arguments).to_dict())
-        # 3. write requests jsonl file
-        fi = open(kwargs['request_file_path'], 'w')
-        for api_request in api_request_list:
-            fi.write(f"{json.dumps(api_request, ensure_ascii=False)}\n")
-        fi.close()
-        return api_request_list
+                arguments['n'] = self.n
+                fi.write(self.format_request(DialogRequestFormatter, arguments))
+        return self.close_request_file(kwargs['request_file_path'], fi, catalog, config)
 
 
 class SingleCallPayloadCreator(AbstractPayloadCreator):
-    def __init__(self, temperature, system_prompt_file_path):
-        super().__init__(temperature, 500, system_prompt_file_path)
+    def __init__(self, temperature, system_prompt_file_path, n=1):
+        super().__init__(temperature, 500, system_prompt_file_path, n)
 
     @type_check(validate_params)
     def create_payload(self, **kwargs):
         # kwargs keys = ['input_file_path', 'request_file_path', 'reset', 'tools_type']
-        test_set = utils.load_to_jsonl(kwargs['input_file_path'])
+        test_set = JsonlReader(kwargs['input_file_path'])
         # update input file max_size
         self.max_size = len(test_set)
         # 1. check to cached file
-        api_request_list = []
+        config = self.get_manifest_config(kwargs)
         if kwargs['reset'] is False:
-            api_request_list = self.load_cached_payload(kwargs['request_file_path'])
-            if len(api_request_list) == self.max_size:
+            api_request_list = self.load_cached_payload(kwargs['request_file_path'], config)
+            if len(api_request_list) > 0:
                 return api_request_list
         else:
             print("[[reset!! create requests jsonl file]]")
-        # 2. create requests json list
+        # 2. create requests json list (한 건씩 바로 requests jsonl 파일에 기록)
+        #    (tools_type 별로 같은 query 를 쓰는 request 들은 tools / messages 의 catalog id 만 기록)
+        fi, catalog = self.open_request_file(kwargs['request_file_path'])
         for idx, test_input in enumerate(tqdm(test_set)):
             # test_input keys = ['function_num', 'function_name', 'function_info', 'query',
             #                    'ground_truth', 'acceptable_arguments', 'tools']
@@ -217,28 +279,25 @@ class SingleCallPayloadCreator(AbstractPayloadCreator):
             tools_type = kwargs['tools_type']
             for t in test_input['tools']:
                 if tools_type == 'all' or t['type'] == tools_type:
-                    tools_list.append((t['content'], t['type']))
+                    tools_list.append((catalog.intern_tools(t['content']), t['type']))
             for q_idx, query in enumerate(test_input['query']):
                 messages = [{'role': 'system', 'content': self.system_prompt}, {'role': 'user', 'content': query['content']}]
-                for tools, t_type in tools_list:
+                messages_id = catalog.intern_messages(messages)
+                for tool_ids, t_type in tools_list:
                     arguments = {
                         'serial_num': query['serial_num'],
-                        'messages': messages,
+                        'messages_id': messages_id,
                         'temperature': self.temperature,
                         'tool_choice': 'auto',
-                        'tools': tools,
+                        'n': self.n,
+                        'tool_ids': tool_ids,
                         'tools_type': t_type,
                         'acceptable_arguments': test_input['acceptable_arguments'][q_idx]['content'],
                         'ground_truth': test_input['ground_truth'][q_idx]['content'],
                     }
-                    api_request_list.append(SingleCallRequestFormatter(**arguments).to_dict())
-        # 3. write requests jsonl file
-        fi = open(kwargs['request_file_path'], 'w')
-        for api_request in api_request_list:
-            fi.write(f"{json.dumps(api_request, ensure_ascii=False)}\n")
-        fi.close()
+                    fi.write(self.format_request(SingleCallRequestFormatter, arguments))
         print(f"[[model request file : {kwargs['request_file_path']}]]")
-        return api_request_list
+        return self.close_request_file(kwargs['request_file_path'], fi, catalog, config)
 
 
 class PayloadCreatorFactory:
@@ -246,7 +305,7 @@ class PayloadCreatorFactory:
     A factory class for creating specific payload creators based on the type of evaluation.
     """
     @staticmethod
-    def get_payload_creator(evaluation_type, temperature, system_prompt_file_path=None):
+    def get_payload_creator(evaluation_type, temperature, system_prompt_file_path=None, n=1):
         """
         Returns an instance of a payload creator based on the specified evaluation type.
 
@@ -254,6 +313,7 @@ class PayloadCreatorFactory:
             evaluation_type (str): The type of evaluation, which determines the type of payload creator.
             temperature (float): The variability setting for the model's responses used in the payload.
             system_prompt_file_path (str, optional): Path to the file containing the system prompt for payloads.
+            n (int, optional): Number of samples to generate per request (pass@k).
 
         Returns:
             A payload creator instance appropriate for the given evaluation type.
@@ -262,10 +322,10 @@ class PayloadCreatorFactory:
             ValueError: If the specified evaluation type is not supported.
         """
         if evaluation_type == 'common':
-            return CommonPayloadCreator(temperature)
+            return CommonPayloadCreator(temperature, n)
         elif evaluation_type == 'dialog':
-            return DialogPayloadCreator(temperature, system_prompt_file_path)
+            return DialogPayloadCreator(temperature, system_prompt_file_path, n)
         elif evaluation_type == 'singlecall':
-            return SingleCallPayloadCreator(temperature, system_prompt_file_path)
+            return SingleCallPayloadCreator(temperature, system_prompt_file_path, n)
         else:
             raise ValueError("Unsupported evaluation type")
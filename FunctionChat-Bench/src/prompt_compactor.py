@@ -0,0 +1,202 @@
+import re
+from src import json_codec
+from src.blob_store import get_blob_hash
+"""
+This package builds compact judge prompt sections (tools, history, response) and keeps token statistics.
+"""
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _ENCODING = None
+
+THINK_PATTERN = re.compile(r'<think(?:ing)?>.*?</think(?:ing)?>\s*', re.DOTALL | re.IGNORECASE)
+REASONING_KEYS = ['reasoning', 'reasoning_content', 'reasoning_details']
+
+
+def estimate_tokens(text):
+    """
+    Returns the token count of the text (tiktoken if installed, otherwise a character-based estimate).
+    Hangul and other non-ascii characters are counted as about one token each.
+    """
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    non_ascii = len(text) - len(text.encode('ascii', 'ignore'))
+    return non_ascii + (len(text) - non_ascii) // 4
+
+
+def strip_reasoning(text):
+    """
+    Removes <think>...</think> blocks (and a dangling '...</think>' prefix) from the text.
+    """
+    if not isinstance(text, str):
+        return text
+    text = THINK_PATTERN.sub('', text)
+    if '</think>' in text:
+        text = text.split('</think>')[-1]
+    return text.strip()
+
+
+def get_tool_call_names(message):
+    if not message:
+        return []
+    names = []
+    for tool_call in message.get('tool_calls') or []:
+        name = (tool_call.get('function') or {}).get('name')
+        if name:
+            names.append(name)
+    return names
+
+
+class JudgePromptCompactor:
+    """
+    Compacts the per-item sections of a judge prompt.
+
+    - tools: only the tools referenced by the ground truth, the prediction and the history are kept in full,
+             the others are reduced to name/description/required parameters.
+    - history: the last `history_size` messages are kept, older messages are summarized into one line each.
+    - response: only role/content/tool_calls are kept and reasoning (think) blocks are stripped.
+
+    The compact forms of tools and messages (and their token counts) are memoized per dialog, so the shared tools and
+    history of a dialog are compacted and tokenized only once instead of once per turn. The memo is keyed on the
+    content hash of the serialized tool or message, so equal content hits the memo whether or not the turns share
+    objects, and a changed object never hits a stale entry.
+    """
+    def __init__(self, history_size=6, summary_chars=80):
+        self.history_size = history_size
+        self.summary_chars = summary_chars
+        self._scope = None
+        self._tool_cache = {}
+        self._message_cache = {}
+        self.stats = {'items': 0, 'full_tokens': 0, 'compact_tokens': 0}
+
+    def set_dialog(self, messages):
+        """
+        Starts the memo of the dialog of a request; the memo of the previous dialog is dropped.
+        The turns of a dialog (and the tools_type variants of a singlecall query) start with the same first
+        non-system message, so its content hash identifies the dialog.
+        """
+        first = next((message for message in messages or [] if message.get('role') != 'system'), None)
+        scope = get_blob_hash(json_codec.dumps_text(first))
+        if scope != self._scope:
+            self._scope = scope
+            self._tool_cache.clear()
+            self._message_cache.clear()
+
+    def _get_tool(self, tool):
+        full = json_codec.dumps_text(tool)
+        key = get_blob_hash(full)
+        cached = self._tool_cache.get(key)
+        if cached is None:
+            func = tool.get('function', {})
+            brief = json_codec.dumps_text({
+                'name': func.get('name'),
+                'description': func.get('description'),
+                'required': (func.get('parameters') or {}).get('required', []),
+            })
+            cached = (full, brief, estimate_tokens(full), estimate_tokens(brief))
+            self._tool_cache[key] = cached
+        return cached
+
+    def _get_message(self, message):
+        full = json_codec.dumps_text(message)
+        key = get_blob_hash(full)
+        cached = self._message_cache.get(key)
+        if cached is None:
+            compact = {k: v for k, v in message.items() if k not in REASONING_KEYS}
+            if message.get('role') == 'assistant':
+                compact['content'] = strip_reasoning(message.get('content'))
+            names = get_tool_call_names(message)
+            if names:
+                summary_text = f"{', '.join(names)}(...)"
+            else:
+                summary_text = str(compact.get('content') or '')
+                if len(summary_text) > self.summary_chars:
+                    summary_text = summary_text[:self.summary_chars] + '...'
+            compact = json_codec.dumps_text(compact)
+            summary = f"{message.get('role')}: {summary_text}"
+            cached = (full, compact, summary, estimate_tokens(full), estimate_tokens(compact), estimate_tokens(summary))
+            self._message_cache[key] = cached
+        return cached
+
+    def compact_tools(self, tools, referenced_names):
+        parts = []
+        for tool in tools or []:
+            full, brief, _, _ = self._get_tool(tool)
+            name = tool.get('function', {}).get('name')
+            parts.append(full if name in referenced_names else brief)
+        return '[' + ', '.join(parts) + ']'
+
+    def _split_history(self, messages):
+        messages = [message for message in messages or [] if message.get('role') != 'system']
+        return messages[:-self.history_size], messages[-self.history_size:]
+
+    def compact_messages(self, messages):
+        head, tail = self._split_history(messages)
+        parts = []
+        if head:
+            summary = ' | '.join(self._get_message(message)[2] for message in head)
+            parts.append(json_codec.dumps_text({'role': 'summary', 'content': f"({len(head)} earlier messages) {summary}"}))
+        parts.extend(self._get_message(message)[1] for message in tail)
+        return '[' + ', '.join(parts) + ']'
+
+    def get_saved_tokens(self, tools, referenced_names, messages):
+        """
+        Returns the estimated token count the compact tools and history save over their full serialization,
+        from the memoized per-tool / per-message counts (the full sections are not serialized).
+        """
+        saved = 0
+        for tool in tools or []:
+            _, _, full_tokens, brief_tokens = self._get_tool(tool)
+            if tool.get('function', {}).get('name') not in referenced_names:
+                saved += full_tokens - brief_tokens
+        # system message 는 compact query 에서 빠지고, 나머지는 요약(head) / compact(tail) 로 대체됨
+        saved += sum(self._get_message(message)[3] for message in messages or [] if message.get('role') == 'system')
+        head, tail = self._split_history(messages)
+        saved += sum(cached[3] - cached[5] for cached in map(self._get_message, head))
+        saved += sum(cached[3] - cached[4] for cached in map(self._get_message, tail))
+        return saved
+
+    def compact_response(self, out):
+        return {
+            'role': out.get('role', 'assistant'),
+            'content': strip_reasoning(out.get('content')),
+            'tool_calls': out.get('tool_calls'),
+        }
+
+    def referenced_tool_names(self, inp, ground_truth, out):
+        names = set(get_tool_call_names(ground_truth))
+        names.update(get_tool_call_names(out))
+        if 'name' in ground_truth:
+            # singlecall ground truth is a bare {"name": .., "arguments": ..}
+            names.add(ground_truth['name'])
+        for message in inp.get('messages') or []:
+            names.update(get_tool_call_names(message))
+        return names
+
+    def add_stats(self, compact_prompt, saved_tokens, items=1):
+        """
+        Parameters:
+            compact_prompt (str): the compact prompt that is sent to the judge.
+            saved_tokens (int): estimated token count the compact sections save over the full ones.
+            items (int): number of items graded by the prompt (packed judging).
+        """
+        compact_tokens = estimate_tokens(compact_prompt)
+        self.stats['items'] += items
+        self.stats['full_tokens'] += compact_tokens + saved_tokens
+        self.stats['compact_tokens'] += compact_tokens
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['saved_tokens'] = stats['full_tokens'] - stats['compact_tokens']
+        stats['saved_ratio'] = (stats['saved_tokens'] / stats['full_tokens']) if stats['full_tokens'] else 0.0
+        return stats
+
+    def display(self):
+        stats = self.get_stats()
+        print(f"[[compact judge prompt]] items : {stats['items']}, "
+              f"full ~{stats['full_tokens']} tokens -> compact ~{stats['compact_tokens']} tokens "
+              f"(saved ~{stats['saved_tokens']}, {stats['saved_ratio']:.1%})")
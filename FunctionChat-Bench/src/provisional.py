@@ -0,0 +1,120 @@
+import math
+import random
+from statistics import NormalDist
+"""
+This package estimates a provisional score with confidence intervals from a stratified sample of judge items,
+while the full OpenAI batch job is still pending.
+"""
+
+
+def stratified_sample(strata, sample_size, seed=0):
+    """
+    Draws a stratified random sample with proportional allocation (at least one item per non-empty stratum).
+
+    Parameters:
+        strata (dict): stratum -> list of item indices.
+        sample_size (int): total number of items to draw.
+        seed (int): random seed.
+    Returns:
+        dict: stratum -> sampled item indices.
+    """
+    population = sum(len(indices) for indices in strata.values())
+    rng = random.Random(seed)
+    sampled = {}
+    for stratum, indices in sorted(strata.items()):
+        if not indices:
+            sampled[stratum] = []
+            continue
+        size = min(len(indices), max(1, round(sample_size * len(indices) / population)))
+        sampled[stratum] = rng.sample(indices, size)
+    return sampled
+
+
+def _interval(estimate, variance, z):
+    margin = z * math.sqrt(max(variance, 0.0))
+    return [max(0.0, estimate - margin), min(1.0, estimate + margin)]
+
+
+def estimate_score(strata, confidence=0.95):
+    """
+    Estimates the pass rate of each stratum and of the total with a stratified estimator.
+    Exact-match passes are known; only the judge items are estimated from the sample,
+    with a finite population correction so a fully judged stratum has a zero-width interval.
+
+    Parameters:
+        strata (dict): stratum -> {'total', 'exact_pass', 'judge', 'sampled', 'sample_pass'}.
+        confidence (float): confidence level of the intervals.
+    Returns:
+        dict: per stratum and 'total' -> {'pass_rate', 'ci', 'total', 'sampled'}.
+    """
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    result = {}
+    total_items, total_pass, total_variance = 0, 0.0, 0.0
+    for stratum, row in sorted(strata.items()):
+        judge, sampled = row['judge'], row['sampled']
+        p = row['sample_pass'] / sampled if sampled else 0.0
+        variance = 0.0
+        if 0 < sampled < judge:
+            # 표본이 전부 pass/fail 이어도 구간 폭이 0이 되지 않도록 보정한 비율로 분산 계산
+            p_var = (row['sample_pass'] + 0.5) / (sampled + 1)
+            variance = judge ** 2 * (1 - sampled / judge) * p_var * (1 - p_var) / max(sampled - 1, 1)
+        estimated_pass = row['exact_pass'] + p * judge
+        pass_rate = estimated_pass / row['total'] if row['total'] else 0.0
+        result[stratum] = {
+            'pass_rate': pass_rate,
+            'ci': _interval(pass_rate, variance / row['total'] ** 2 if row['total'] else 0.0, z),
+            'total': row['total'],
+            'sampled': sampled,
+        }
+        total_items += row['total']
+        total_pass += estimated_pass
+        total_variance += variance
+    pass_rate = total_pass / total_items if total_items else 0.0
+    result['total'] = {
+        'pass_rate': pass_rate,
+        'ci': _interval(pass_rate, total_variance / total_items ** 2 if total_items else 0.0, z),
+        'total': total_items,
+        'sampled': sum(row['sampled'] for row in strata.values()),
+    }
+    return result
+
+
+def to_score_dict(estimate, confidence, registor):
+    """
+    Converts an estimate into the eval_score.json score of an eval type (marked as provisional).
+
+    Parameters:
+        estimate (dict): see estimate_score.
+        confidence (float): confidence level of the intervals.
+        registor (AbstractEvaluationRegistor): an empty registor of the eval type; its get_score keys are used,
+                                               with the estimated (rounded) pass counts.
+    Returns:
+        dict: the keys of registor.get_score with the estimated rates, a '<rate> ci' interval next to every rate,
+              'provisional', 'ci_confidence' and 'judged_sample_size'.
+    """
+    registor.set_group_counts({stratum: (round(row['pass_rate'] * row['total']), row['total'])
+                               for stratum, row in estimate.items() if stratum != 'total'})
+    rates = {}
+    for key, (_, total) in registor.get_score_counts().items():
+        stratum = key[:-len(' pass rate')] if key.endswith(' pass rate') else 'total'
+        row = estimate.get(stratum, estimate['total'])
+        # 전체 rate 의 분모가 item 수와 다른 경우 (dialog avg(micro)) 그 분모 기준으로 환산
+        scale = row['total'] / total if total else 0.0
+        rates[key] = (row['pass_rate'] * scale, [bound * scale for bound in row['ci']])
+    # 최종 점수 (add_score_ci) 와 같은 순서로 rate 바로 뒤에 '<rate> ci' 를 둠
+    score_dict = {'provisional': True}
+    for key, value in registor.get_score().items():
+        if key in rates:
+            score_dict[key], score_dict[f'{key} ci'] = rates[key]
+        else:
+            score_dict[key] = value
+    score_dict['ci_confidence'] = confidence
+    score_dict['judged_sample_size'] = estimate['total']['sampled']
+    return score_dict
+
+
+def display_estimate(estimate, confidence):
+    print(f"[[provisional score]] ({confidence:.0%} CI, final score follows when the batch completes)")
+    for stratum, row in estimate.items():
+        print(f"  {stratum} : {row['pass_rate']:.3f} [{row['ci'][0]:.3f}, {row['ci'][1]:.3f}] "
+              f"(judged sample {row['sampled']} / {row['total']})")
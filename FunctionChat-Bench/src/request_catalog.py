@@ -0,0 +1,139 @@
+import os
+from src import json_codec
+from src.blob_store import get_blob_hash
+from src.framed_io import LineWriter, get_sidecar_path
+from src.jsonl_reader import JsonlReader, iter_jsonl
+"""
+This package interns the tools and messages of the model requests (*.input.jsonl) into a catalog file
+(*.input.catalog.jsonl), so that a tool shared by many requests, or a dialog history shared by the turns of a dialog,
+is stored once.
+
+- tools    : every distinct tool is one catalog entry; a request keeps the list of its tool ids ('tool_ids')
+- messages : every message is a node of a prefix tree (parent prefix id + message); a request keeps the id of its
+             last node ('messages_id'), so the turns of a dialog share the nodes of their common history
+RequestReader materializes the requests when they are read. The materialized requests share the (read-only) tool and
+message objects of the catalog instead of holding copies of them.
+"""
+
+TOOL_KEY = 'tool'
+MESSAGE_KEY = 'message'
+
+
+def get_catalog_file_path(request_file_path):
+    return get_sidecar_path(request_file_path, '.catalog.jsonl')
+
+
+def is_interned(request):
+    return 'messages_id' in request or 'tool_ids' in request
+
+
+class RequestCatalogWriter:
+    """
+    Writes the catalog entries of the requests being created; each distinct tool / message prefix is written once.
+    """
+    def __init__(self, catalog_file_path):
+        self.known = set()
+        self.fw = LineWriter(catalog_file_path, 'w')
+
+    def _write(self, entry_id, entry):
+        if entry_id not in self.known:
+            self.fw.write(f"{json_codec.dumps(dict(entry, id=entry_id))}\n")
+            self.known.add(entry_id)
+        return entry_id
+
+    def intern_tools(self, tools):
+        """
+        Returns the catalog ids of a tools list.
+        """
+        tool_ids = []
+        for tool in tools:
+            tool_id = get_blob_hash(json_codec.dumps_text(tool))
+            tool_ids.append(self._write(tool_id, {TOOL_KEY: tool}))
+        return tool_ids
+
+    def intern_messages(self, messages):
+        """
+        Returns the catalog id of the last prefix node of a messages list (None for an empty list).
+        """
+        parent = None
+        for message in messages:
+            node_id = get_blob_hash(f"{parent}\t{json_codec.dumps_text(message)}")
+            parent = self._write(node_id, {'parent': parent, MESSAGE_KEY: message})
+        return parent
+
+    def close(self):
+        self.fw.close()
+
+
+class RequestCatalog:
+    """
+    In-memory catalog of a request file. Message prefixes are materialized once per node as tuples that extend
+    the tuple of their parent, so the turns of a dialog share one copy of every message.
+    """
+    def __init__(self, catalog_file_path):
+        self.tools = {}
+        self.nodes = {}
+        for entry in iter_jsonl(catalog_file_path):
+            if TOOL_KEY in entry:
+                self.tools[entry['id']] = entry[TOOL_KEY]
+            else:
+                self.nodes[entry['id']] = (entry['parent'], entry[MESSAGE_KEY])
+        self._prefixes = {None: ()}
+
+    def get_prefix(self, node_id):
+        if node_id in self._prefixes:
+            return self._prefixes[node_id]
+        # 긴 history 에서도 재귀 없이 아직 만들지 않은 조상 node 부터 순서대로 생성
+        chain = []
+        while node_id not in self._prefixes:
+            chain.append(node_id)
+            node_id = self.nodes[node_id][0]
+        prefix = self._prefixes[node_id]
+        for node_id in reversed(chain):
+            prefix = prefix + (self.nodes[node_id][1],)
+            self._prefixes[node_id] = prefix
+        return prefix
+
+    def materialize(self, request):
+        """
+        Replaces the catalog ids of a request ('tool_ids', 'messages_id') with its tools and messages.
+        """
+        if not is_interned(request):
+            return request
+        tool_ids = request.pop('tool_ids', None)
+        messages_id = request.pop('messages_id', None)
+        materialized = {}
+        for key, value in request.items():
+            # 원래 request 와 같은 key 순서 (serial_num, messages, tools, ...) 로 복원
+            materialized[key] = value
+            if key == 'serial_num':
+                materialized['messages'] = list(self.get_prefix(messages_id))
+                materialized['tools'] = [self.tools[tool_id] for tool_id in tool_ids or []]
+        return materialized
+
+
+class RequestReader(JsonlReader):
+    """
+    Lazy list of the requests of a request file, materialized from its catalog.
+    Request files written without a catalog are read as they are.
+    """
+    def __init__(self, request_file_path):
+        super().__init__(request_file_path)
+        catalog_file_path = get_catalog_file_path(request_file_path)
+        self.catalog = RequestCatalog(catalog_file_path) if os.path.isfile(catalog_file_path) else None
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        return self._materialize(super().__getitem__(idx))
+
+    def __iter__(self):
+        for request in super().__iter__():
+            yield self._materialize(request)
+
+    def _materialize(self, request):
+        if self.catalog is None:
+            if is_interned(request):
+                raise FileNotFoundError(f"request catalog not found: {get_catalog_file_path(self.file_path)}")
+            return request
+        return self.catalog.materialize(request)
@@ -1,16 +1,24 @@
-import json
 import time
 import concurrent
 import warnings
+from itertools import islice
 from tqdm import tqdm
 import threading
 
 from src import utils
+from src import json_codec
+from src import run_manifest
+from src.framed_io import LineWriter
+from src.jsonl_reader import JsonlReader
 from src.api_executor import APIExecutorFactory
+from src.sampling import get_choice_message, get_response_message
 
 # multiprocessing 리소스 경고 억제 (Python 3.12에서 ThreadPoolExecutor 사용 시 발생하는 무해한 경고)
 warnings.filterwarnings('ignore', category=UserWarning, module='multiprocessing.resource_tracker')
 
+# 요청 순서대로 기록하기 위해 메모리에 들고 있는 (in-flight + 순서 대기) 응답 수 = max_threads * factor
+RESPONSE_WINDOW_FACTOR = 16
+
 
 class ResponseHandler:
     """
@@ -32,6 +40,23 @@ class ResponseHandler:
                                                            base_url=base_url, served_model_name=served_model_name,
                                                            gcloud_project_id=gcloud_project_id,
                                                            gcloud_location=gcloud_location)
+        self.manifest_config = self.get_manifest_config(model, served_model_name)
+
+    @staticmethod
+    def get_manifest_config(model, served_model_name):
+        """
+        Returns what the predictions depend on besides the requests (see run_manifest): the model.
+        """
+        return {'kind': 'predict', 'model': model, 'served_model_name': served_model_name}
+
+    def save_manifest(self, predict_file_path, input_hashes, outputs):
+        """
+        Writes the run manifest of a complete predictions file (request hash and response hash of each item).
+        """
+        if input_hashes is None:
+            return
+        run_manifest.save_manifest(predict_file_path, self.manifest_config, input_hashes,
+                                   [run_manifest.get_item_hash(output) for output in outputs])
 
     def load_cached_response(self, predict_file_path, max_size):
         """
@@ -42,10 +67,10 @@ class ResponseHandler:
             max_size (int): Maximum number of responses expected.
 
         Returns:
-            list: A list of cached responses if they exist and meet the expected size; otherwise, an empty list.
+            JsonlReader: A lazy list of the cached responses if they exist; otherwise, an empty list.
         """
         if utils.is_exist_file(predict_file_path):
-            outputs = utils.load_to_jsonl(predict_file_path)
+            outputs = JsonlReader(predict_file_path)
             if len(outputs) == max_size:
                 print(f"[[already existed response jsonl file]]\npath : {predict_file_path}")
                 return outputs
@@ -54,9 +79,38 @@ class ResponseHandler:
                 return outputs
         return []
 
-    def fetch_and_save(self, api_request_list, predict_file_path, reset, sample, debug, max_threads=2):
+    def predict_samples(self, api_request):
+        """
+        Requests n samples (api_request['n']) in one call. If the provider returns fewer choices than n
+        (n is not supported), the remaining samples are requested with concurrent n=1 calls.
+
+        Returns:
+            dict: the response of the first sample, with all samples stored under 'samples' when n > 1.
+        """
+        n = int(api_request.get('n', 1) or 1)
+        response = self.executor.predict(api_request)
+        if n <= 1:
+            return response
+        samples = [get_choice_message(choice) for choice in response.get('choices') or []][:n]
+        if not samples:
+            samples = [get_response_message(response)]
+        missing = n - len(samples)
+        if missing > 0:
+            single_request = dict(api_request, n=1)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=missing) as executor:
+                for extra in executor.map(self.executor.predict, [single_request] * missing):
+                    samples.append(get_response_message(extra))
+        # 첫 번째 샘플은 기존 단일 응답과 같은 구조로 유지
+        response['choices'] = (response.get('choices') or [])[:1]
+        response['samples'] = samples
+        return response
+
+    def fetch_and_save(self, api_request_list, predict_file_path, reset, sample, debug, max_threads=2,
+                       input_hashes=None):
         """
         Fetches responses from the API using multithreading and saves them. If responses are partially cached, it continues from where it left off.
+        With input_hashes (request hashes of the run manifest), only the responses of new or changed requests are fetched;
+        the cached responses of the other requests are reused, wherever they are in the request list.
 
         Parameters:
             api_request_list (list): List of API requests to process.
@@ -65,11 +119,11 @@ class ResponseHandler:
             sample (bool): If True, it executes only a single input to fetch the response. (e.g., for quick testing).
             debug (bool): If True, it print detailed debug information.
             max_threads (int): Maximum number of threads to use for API requests.
+            input_hashes (list): per-request hashes (see run_manifest); None keeps the line-count based resume.
 
         Returns:
-            list: A list of all responses fetched and saved.
+            JsonlReader: A lazy list of all responses fetched and saved.
         """
-        outputs = []
         # models() 호출은 선택사항이므로 실패해도 계속 진행
         # 빠른 실행을 위해 debug 모드에서만 모델 리스트 조회
         if debug:
@@ -81,54 +135,129 @@ class ResponseHandler:
                 print(f"⚠️ 모델 리스트 조회 실패 (계속 진행): {e}")
 
         # 1. check existing responses
+        start_index = 0
+        write_option = 'w'
+        reuse_map = {}
+        previous_outputs = None
+        total = len(api_request_list)
         if not reset:
-            outputs = self.load_cached_response(predict_file_path, len(api_request_list))
-            if len(outputs) == len(api_request_list):
-                return outputs
-        write_option = 'a' if reset is False else 'w'
-        outputs = [None] * len(api_request_list) 
+            if input_hashes is not None and run_manifest.is_fresh(predict_file_path, self.manifest_config, input_hashes):
+                print(f"[[already existed response jsonl file]]\npath : {predict_file_path}")
+                return JsonlReader(predict_file_path)
+            outputs = self.load_cached_response(predict_file_path, total)
+            if input_hashes is None:
+                reuse_map = {idx: idx for idx in range(min(len(outputs), total))}
+            else:
+                reuse_map = run_manifest.get_reuse_map(predict_file_path, self.manifest_config,
+                                                       input_hashes, len(outputs))
+            if run_manifest.is_prefix(reuse_map, len(outputs), total):
+                if len(outputs) == total:
+                    # manifest 없이 저장된 (이전 버전) 응답은 현재 request 의 응답으로 manifest 기록
+                    self.save_manifest(predict_file_path, input_hashes, outputs)
+                    run_manifest.remove_previous(predict_file_path)
+                    return outputs
+                # 저장된 응답 다음 요청부터 이어서 append
+                start_index = len(outputs)
+                write_option = 'a'
+                reuse_map = {}
+                if input_hashes is not None:
+                    # 중단된 재작성이 남긴 이전 응답 (x.prev.jsonl) 은 나머지 request 에도 그대로 옮겨 씀
+                    reuse_map = run_manifest.get_previous_reuse_map(predict_file_path, self.manifest_config,
+                                                                    input_hashes, start_index)
+                if reuse_map:
+                    print(f"[[continue rewrite]] reuse {len(reuse_map)}/{total - start_index} remaining responses")
+                    previous_outputs = JsonlReader(run_manifest.get_previous_file_path(predict_file_path))
+            else:
+                print(f"[[stale responses]] re-fetch {total - len(reuse_map)}/{total} (new or changed requests)")
+                if reuse_map:
+                    # 바뀌지 않은 request 의 응답은 이전 파일에서 (위치가 바뀌었어도) 그대로 옮겨 쓰고 나머지만 요청
+                    outputs.close()
+                    previous_file_path = run_manifest.move_to_previous(predict_file_path, self.manifest_config,
+                                                                       input_hashes, reuse_map)
+                    previous_outputs = JsonlReader(previous_file_path)
 
+        if write_option == 'w':
+            run_manifest.remove_manifest(predict_file_path)
         start_time = time.time()
         # 2. fetch responses using multithreading
-        with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor:
-            futures = {
-                executor.submit(self.executor.predict, api_request): idx
-                for idx, api_request in enumerate(api_request_list)
-            }
-
-            # 3. process completed futures
-            for future in tqdm(concurrent.futures.as_completed(futures), total=len(futures)):
-            #for future in concurrent.futures.as_completed(futures):
-                idx = futures[future] # 병렬처리는 순서가 보장이 안되어서 인덱스 매칭 필요
-                response_output = None
-                try:
-                    # 3번 재시도
-                    for retry in range(3):
-                        try:
-                            response_output = future.result(timeout=60)
-                            break
-                        except Exception as e:
-                            error_type = type(e).__name__
-                            error_msg = str(e)
-                            print(f"❌ API 호출 실패 (재시도 {retry + 1}/3) - 인덱스 {idx}: {error_type}: {error_msg[:300]}")
-                            if retry < 2:
-                                time.sleep(2)
-                    
-                    if response_output is None:
-                        response_output = {"role": "assistant", "content": "", "tool_calls": [], "error": f"api response is None after 3 retries"}
-                    outputs[idx] = response_output
-                except Exception as e:
-                    error_type = type(e).__name__
-                    error_msg = str(e)
-                    print(f"❌ 최종 실패 - 인덱스 {idx}: {error_type}: {error_msg[:300]}")
-                    response_output = {"role": "assistant", "content": "", "tool_calls": [], "error": f"{error_type}: {error_msg[:200]}"}
-                    outputs[idx] = response_output
+        #    in-flight + 순서 대기 응답은 window 개로 제한하고, 응답은 요청 순서대로 바로 파일에 append
+        window = max(1, max_threads) * RESPONSE_WINDOW_FACTOR
+        requests = islice(enumerate(api_request_list), start_index, None)
+        futures = {}
+        pending = {}
+        next_idx = start_index
+        pbar = tqdm(total=total - start_index - len(reuse_map))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_threads) as executor, \
+                LineWriter(predict_file_path, write_option) as fp:
+            def submit_requests():
+                while len(futures) + len(pending) < window:
+                    request = next(requests, None)
+                    if request is None:
+                        return
+                    idx, api_request = request
+                    if idx in reuse_map:
+                        continue
+                    futures[executor.submit(self.predict_samples, api_request)] = idx
+
+            def save_responses():
+                # save response (재사용 응답은 이전 파일에서 그대로)
+                nonlocal next_idx
+                while next_idx in pending or next_idx in reuse_map:
+                    if next_idx in pending:
+                        response_output = pending.pop(next_idx)
+                    else:
+                        response_output = previous_outputs[reuse_map[next_idx]]
+                    fp.write(f'{json_codec.dumps(response_output)}\n')
+                    next_idx += 1
+                fp.flush()
+
+            submit_requests()
+            save_responses()
+            while futures:
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                # 3. process completed futures
+                for future in done:
+                    idx = futures.pop(future) # 병렬처리는 순서가 보장이 안되어서 인덱스 매칭 필요
+                    pending[idx] = self.get_response_output(future, idx)
+                    pbar.update(1)
+                save_responses()
+                submit_requests()
+            save_responses()
+        pbar.close()
+        if previous_outputs is not None:
+            previous_outputs.close()
+            run_manifest.remove_previous(predict_file_path)
         end_time = time.time()
         elapsed_time = end_time - start_time
         print(f"Total time execution: {elapsed_time:.2f} seconds")
-        # save response
-        with open(predict_file_path, write_option) as fp:
-            for response_output in outputs:
-                fp.write(f'{json.dumps(response_output, ensure_ascii=False)}\n')
         print(f"[[model response file : {predict_file_path}]]")
+        outputs = JsonlReader(predict_file_path)
+        self.save_manifest(predict_file_path, input_hashes, outputs)
         return outputs
+
+    def get_response_output(self, future, idx):
+        """
+        Returns the response of a completed request future, or an error response if the request failed.
+        """
+        response_output = None
+        try:
+            # 3번 재시도
+            for retry in range(3):
+                try:
+                    response_output = future.result(timeout=60)
+                    break
+                except Exception as e:
+                    error_type = type(e).__name__
+                    error_msg = str(e)
+                    print(f"❌ API 호출 실패 (재시도 {retry + 1}/3) - 인덱스 {idx}: {error_type}: {error_msg[:300]}")
+                    if retry < 2:
+                        time.sleep(2)
+
+            if response_output is None:
+                response_output = {"role": "assistant", "content": "", "tool_calls": [], "error": f"api response is None after 3 retries"}
+        except Exception as e:
+            error_type = type(e).__name__
+            error_msg = str(e)
+            print(f"❌ 최종 실패 - 인덱스 {idx}: {error_type}: {error_msg[:300]}")
+            response_output = {"role": "assistant", "content": "", "tool_calls": [], "error": f"{error_type}: {error_msg[:200]}"}
+        return response_output
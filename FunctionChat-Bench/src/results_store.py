@@ -0,0 +1,229 @@
+import os
+from src import json_codec
+from src.blob_store import iter_eval_records
+from src.framed_io import COMPRESSION_SUFFIXES, LineWriter, get_compression, split_compression_suffix
+"""
+This package writes the per-item evaluation report next to the eval records (*.eval.jsonl).
+
+- tsv (default) : *.eval_report.tsv, one line of JSON-encoded cells per item (ResponseFormatter.to_tsv)
+- parquet : *.eval_results.parquet, typed columns (serial, subtype, verdict, error type, judge latency / tokens)
+            and the text cells of the report, plus a 'payload' column holding the raw eval record.
+            Rows are written incrementally in row groups, and readers can project only the columns they need.
+            Requires pyarrow.
+"""
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+RESULTS_FORMATS = ['tsv', 'parquet']
+DEFAULT_ROW_GROUP_SIZE = 1000
+TSV_SUFFIX = '.eval_report.tsv'
+PARQUET_SUFFIX = '.eval_results.parquet'
+# 리포트에 필요한 컬럼 (payload 제외)
+REPORT_COLUMNS = ['serial_num', 'subtype', 'category', 'verdict', 'error_type', 'vote_split',
+                  'query', 'ground_truth', 'model_output', 'reasoning']
+
+RESULT_SCHEMA = pa.schema([
+    ('serial_num', pa.string()),
+    ('subtype', pa.string()),
+    ('category', pa.string()),
+    ('verdict', pa.string()),
+    ('error_type', pa.string()),
+    ('vote_split', pa.string()),
+    ('judge_latency', pa.float64()),
+    ('prompt_tokens', pa.int64()),
+    ('completion_tokens', pa.int64()),
+    ('query', pa.string()),
+    ('tools', pa.string()),
+    ('ground_truth', pa.string()),
+    ('acceptable_arguments', pa.string()),
+    ('model_output', pa.string()),
+    ('reasoning', pa.string()),
+    ('payload', pa.binary()),
+]) if pa is not None else None
+
+
+def get_results_file_path(eval_log_file_path):
+    """
+    Returns the parquet results path of a TSV report path (*.eval_report.tsv[.gz|.zst] -> *.eval_results.parquet).
+    """
+    # parquet 은 자체 (zstd) 압축을 쓰므로 TSV 의 압축 suffix 는 떼어냄
+    eval_log_file_path, _ = split_compression_suffix(eval_log_file_path)
+    if eval_log_file_path.endswith(TSV_SUFFIX):
+        return eval_log_file_path[:-len(TSV_SUFFIX)] + PARQUET_SUFFIX
+    return f"{eval_log_file_path}{PARQUET_SUFFIX}"
+
+
+def remove_stale_results(eval_log_file_path, results_file_path):
+    """
+    Removes the reports of eval_log_file_path written in another format or compression than results_file_path,
+    so a rerun with another results_format / compression never leaves a stale report next to the new one
+    (the excel report picks one of them by a fixed preference).
+    """
+    tsv_file_path, _ = split_compression_suffix(eval_log_file_path)
+    sibling_paths = [tsv_file_path, get_results_file_path(eval_log_file_path)]
+    sibling_paths += [f"{tsv_file_path}{suffix}" for suffix in COMPRESSION_SUFFIXES.values()]
+    for file_path in sibling_paths:
+        if file_path != results_file_path and os.path.isfile(file_path):
+            os.remove(file_path)
+
+
+def check_results_format(results_format):
+    if results_format not in RESULTS_FORMATS:
+        raise ValueError(f"Unsupported results_format: {results_format} (choose one of {RESULTS_FORMATS})")
+    if results_format == 'parquet' and pa is None:
+        raise ImportError("results_format 'parquet' requires pyarrow (pip install pyarrow)")
+
+
+def to_result_row(record):
+    """
+    Converts an eval record (see ResponseFormatter.to_dict) into a typed results row.
+    """
+    report_arguments = record['report_arguments']
+    evaluate_response = record.get('evaluate_response') or {}
+    usage = evaluate_response.get('usage') or {}
+    serial_num = report_arguments.get('serial_num')
+    return {
+        'serial_num': None if serial_num is None else str(serial_num),
+        'subtype': report_arguments.get('tools_type') or report_arguments.get('type_of_output'),
+        'category': report_arguments.get('category'),
+        'verdict': record.get('verdict', report_arguments.get('is_pass')),
+        'error_type': record.get('error_type', report_arguments.get('error_type')) or None,
+        'vote_split': report_arguments.get('vote_split') or None,
+        'judge_latency': evaluate_response.get('latency'),
+        'prompt_tokens': usage.get('prompt_tokens'),
+        'completion_tokens': usage.get('completion_tokens'),
+        'query': report_arguments.get('query', report_arguments.get('messages')),
+        'tools': report_arguments.get('tools'),
+        'ground_truth': report_arguments.get('ground_truth'),
+        'acceptable_arguments': report_arguments.get('acceptable_arguments'),
+        'model_output': report_arguments.get('model_output'),
+        'reasoning': report_arguments.get('reasoning'),
+        'payload': json_codec.dumps(record).encode('utf-8'),
+    }
+
+
+def get_tsv_title(record):
+    """
+    Returns the TSV report header of an eval record (see ResponseFormatter.get_tsv_title).
+    """
+    return '#' + ''.join(f"{key}\t" for key in record['tsv_keys'])
+
+
+def to_tsv_line(record):
+    """
+    Returns the TSV report line of an eval record (see ResponseFormatter.to_tsv).
+    """
+    report_arguments = record['report_arguments']
+    return ''.join(f"{report_arguments['messages' if key == 'input_messages' else key]}\t"
+                   for key in record['tsv_keys'])
+
+
+class TsvReportWriter:
+    """
+    Writes the TSV report (*.eval_report.tsv, gzip / zstd compressed with a .gz / .zst suffix).
+    The header is written with the first line of a new file.
+    A compressed report is written in frames that need not end where the frames of the eval records end,
+    so when an evaluation is resumed it is rewritten from the eval records instead of appended to
+    (as is a report that does not exist yet, e.g. when the previous run wrote another format).
+    """
+    def __init__(self, eval_log_file_path, write_option='w', eval_file_path=None):
+        self.file_path = eval_log_file_path
+        rewrite = (write_option == 'a'
+                   and (get_compression(eval_log_file_path) is not None or not os.path.isfile(eval_log_file_path))
+                   and eval_file_path and os.path.isfile(eval_file_path))
+        self.fw = LineWriter(eval_log_file_path, 'w' if rewrite else write_option)
+        self.wrote_header = write_option == 'a' and not rewrite
+        if rewrite:
+            for record in iter_eval_records(eval_file_path):
+                self.write(None, record)
+
+    def write(self, response_formatter, record=None):
+        if record is None:
+            record = response_formatter.to_dict()
+        if not self.wrote_header:
+            self.fw.write(f"{get_tsv_title(record)}\n")
+            self.wrote_header = True
+        self.fw.write(f"{to_tsv_line(record).strip()}\n")
+
+    def flush(self):
+        self.fw.flush()
+
+    def close(self):
+        self.fw.close()
+
+
+class ParquetResultsWriter:
+    """
+    Writes the parquet results (*.eval_results.parquet) in row groups of row_group_size rows.
+    The file is written to a temporary path and moved in place on close, so readers never see a partial file.
+    When an evaluation is resumed, the rows of the already written eval records are copied first,
+    so the results always match the eval records file.
+    """
+    def __init__(self, results_file_path, eval_file_path=None, row_group_size=DEFAULT_ROW_GROUP_SIZE):
+        check_results_format('parquet')
+        self.file_path = results_file_path
+        self.tmp_file_path = f"{results_file_path}.tmp"
+        self.row_group_size = max(1, int(row_group_size))
+        self.rows = []
+        self.writer = pq.ParquetWriter(self.tmp_file_path, RESULT_SCHEMA, compression='zstd')
+        if eval_file_path and os.path.isfile(eval_file_path):
+            for record in iter_eval_records(eval_file_path):
+                self.write(None, record)
+
+    def write(self, response_formatter, record=None):
+        if record is None:
+            record = response_formatter.to_dict()
+        self.rows.append(to_result_row(record))
+        if len(self.rows) >= self.row_group_size:
+            self._write_rows()
+
+    def flush(self):
+        # 작은 row group 이 많아지지 않도록 row group 은 row_group_size 가 찼을 때만 기록
+        pass
+
+    def _write_rows(self):
+        if self.rows:
+            self.writer.write_table(pa.Table.from_pylist(self.rows, schema=RESULT_SCHEMA))
+            self.rows = []
+
+    def close(self):
+        self._write_rows()
+        self.writer.close()
+        os.replace(self.tmp_file_path, self.file_path)
+
+
+def open_results_writer(results_format, eval_log_file_path, eval_file_path, write_option='w',
+                        row_group_size=DEFAULT_ROW_GROUP_SIZE):
+    """
+    Returns the report writer of results_format ('tsv' | 'parquet').
+
+    Parameters:
+        results_format (str): report format.
+        eval_log_file_path (str): TSV report path (the parquet path is derived from it).
+        eval_file_path (str): eval records path, used to copy the existing rows when write_option is 'a'
+                              (parquet, compressed TSV).
+        write_option (str): 'w' for a new report, 'a' to continue a resumed evaluation.
+        row_group_size (int): rows per parquet row group.
+
+    Reports of the same evaluation in another format or compression are removed (see remove_stale_results).
+    """
+    check_results_format(results_format)
+    if results_format == 'parquet':
+        results_file_path = get_results_file_path(eval_log_file_path)
+        remove_stale_results(eval_log_file_path, results_file_path)
+        return ParquetResultsWriter(results_file_path, eval_file_path if write_option == 'a' else None, row_group_size)
+    remove_stale_results(eval_log_file_path, eval_log_file_path)
+    return TsvReportWriter(eval_log_file_path, write_option, eval_file_path)
+
+
+def read_results(results_file_path, columns=None):
+    """
+    Reads parquet results into a DataFrame, reading only the given columns (all but 'payload' by default).
+    """
+    check_results_format('parquet')
+    return pq.read_table(results_file_path, columns=columns or REPORT_COLUMNS).to_pandas()
@@ -0,0 +1,241 @@
+import os
+import json
+import hashlib
+from collections import defaultdict, deque
+from src import json_codec
+from src.blob_store import get_blob_hash
+from src.framed_io import get_sidecar_path
+"""
+This package keeps a manifest (<file>.manifest.json) next to each run artifact (requests, predictions, eval records).
+
+A manifest records
+- config_hash : hash of everything the artifact depends on besides its items
+                (dataset file, system prompt, temperature / tools_type for requests, model for predictions,
+                judge model, rubrics and judge settings for eval records)
+- inputs      : per-item hash of what each line was produced from (request -> prediction, request + prediction -> eval)
+- items       : per-item hash of each line (requests, predictions)
+- size        : byte size of the artifact when the manifest was written
+
+so that freshness is decided without reading the artifact (is_fresh), and a rerun can tell exactly which cached lines
+are still valid (get_reuse_map) instead of trusting line counts. Cached lines are matched to the current items by input
+hash, so items inserted, removed or moved in the dataset do not invalidate the other items. An artifact that is rewritten
+is moved to x.prev.jsonl with a manifest of its reusable lines, which stays until the rewrite is complete, so an
+interrupted rewrite resumes by appending and still copies the remaining items from it (get_previous_reuse_map). Item hashes are computed from the stdlib JSON
+formatting of the items, so they do not change with the installed JSON backend.
+"""
+
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = '.manifest.json'
+
+
+def get_manifest_path(file_path):
+    return f"{file_path}{MANIFEST_SUFFIX}"
+
+
+def get_item_hash(item):
+    return get_blob_hash(json_codec.dumps_text(item))
+
+
+def get_pair_hashes(first_hashes, second_hashes):
+    """
+    Returns the per-item hashes of two aligned hash lists (e.g. request + prediction of each item).
+    """
+    return [get_blob_hash(f"{first}\t{second}") for first, second in zip(first_hashes, second_hashes)]
+
+
+def get_config_hash(config):
+    return get_blob_hash(json.dumps(config, sort_keys=True, ensure_ascii=False))
+
+
+def get_digest(hashes):
+    return get_blob_hash('\n'.join(hashes))
+
+
+def get_file_hash(file_path, chunk_size=1 << 20):
+    """
+    Returns the content hash of a file, or None if it does not exist.
+    """
+    if not file_path or not os.path.isfile(file_path):
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_text_hash(text):
+    return None if text is None else get_blob_hash(text)
+
+
+def load_manifest(file_path):
+    """
+    Returns the manifest of an artifact, or None if it is missing, unreadable or of another version.
+    """
+    manifest_path = get_manifest_path(file_path)
+    if not os.path.isfile(manifest_path):
+        return None
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[[manifest]] ignoring unreadable manifest {manifest_path}: {e}")
+        return None
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(file_path, config, inputs, items=None):
+    """
+    Writes the manifest of a complete artifact (atomically, so readers never see a partial manifest).
+
+    Parameters:
+        file_path (str): artifact path.
+        config (dict): everything the artifact depends on besides its items (JSON-serializable).
+        inputs (list): per-item hash of what each line was produced from.
+        items (list): per-item hash of each line.
+    """
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'size': os.path.getsize(file_path),
+        'config_hash': get_config_hash(config),
+        'config': config,
+        'inputs_digest': get_digest(inputs),
+        'inputs': list(inputs),
+        'items': list(items or []),
+    }
+    manifest_path = get_manifest_path(file_path)
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, manifest_path)
+
+
+def is_fresh(file_path, config, inputs):
+    """
+    Returns True if the artifact is complete and was produced from the same config and inputs,
+    without reading the artifact itself.
+    """
+    manifest = load_manifest(file_path)
+    if manifest is None or not os.path.isfile(file_path):
+        return False
+    return (manifest['size'] == os.path.getsize(file_path)
+            and manifest['config_hash'] == get_config_hash(config)
+            and manifest['inputs_digest'] == get_digest(inputs))
+
+
+def get_items(file_path):
+    """
+    Returns the per-item hashes recorded in the manifest of an artifact (None without a manifest).
+    """
+    manifest = load_manifest(file_path)
+    return None if manifest is None else manifest['items']
+
+
+def get_reuse_map(file_path, config, inputs, cached_count):
+    """
+    Returns {index of a current item: line of the cached artifact that can be reused for it}.
+
+    - without a manifest (artifact of an earlier version): the cached lines by position, as the line-count check did
+    - with another config_hash: none
+    - otherwise: the lines whose recorded input hash equals the hash of an item (the line at the same position first,
+      so duplicated items keep their order). Lines appended after the manifest was written (an interrupted resume)
+      were produced from the current inputs at the same position.
+    """
+    manifest = load_manifest(file_path)
+    if manifest is None:
+        return {idx: idx for idx in range(min(cached_count, len(inputs)))}
+    if manifest['config_hash'] != get_config_hash(config):
+        return {}
+    recorded = manifest['inputs'][:cached_count]
+    reuse_map = {}
+    lines = defaultdict(deque)
+    for line, input_hash in enumerate(recorded):
+        if line < len(inputs) and inputs[line] == input_hash:
+            reuse_map[line] = line
+        else:
+            lines[input_hash].append(line)
+    for idx in range(len(recorded), min(cached_count, len(inputs))):
+        reuse_map[idx] = idx
+    for idx, input_hash in enumerate(inputs):
+        if idx not in reuse_map and lines.get(input_hash):
+            reuse_map[idx] = lines[input_hash].popleft()
+    return reuse_map
+
+
+def is_prefix(reuse_map, cached_count, total):
+    """
+    Returns True if the cached lines are exactly the first items, in order (so the run can resume by appending).
+    """
+    return (cached_count <= total and len(reuse_map) == cached_count
+            and all(reuse_map.get(idx) == idx for idx in range(cached_count)))
+
+
+def get_previous_reuse_map(file_path, config, inputs, start_index):
+    """
+    Returns {index of a current item (from start_index): line of the previous version of the artifact} when a rewrite
+    was interrupted (see move_to_previous), so the resumed run still copies the unchanged items from x.prev.jsonl
+    instead of producing them again. Returns {} without a previous version, or one of another config.
+    """
+    previous_file_path = get_previous_file_path(file_path)
+    manifest = load_manifest(previous_file_path)
+    if manifest is None or not os.path.isfile(previous_file_path):
+        return {}
+    if manifest['config_hash'] != get_config_hash(config):
+        return {}
+    lines = defaultdict(deque)
+    for line, input_hash in enumerate(manifest['inputs']):
+        if input_hash:
+            lines[input_hash].append(line)
+    reuse_map = {}
+    for idx in range(start_index, len(inputs)):
+        if lines.get(inputs[idx]):
+            reuse_map[idx] = lines[inputs[idx]].popleft()
+    return reuse_map
+
+
+def move_to_previous(file_path, config, inputs, reuse_map):
+    """
+    Moves an artifact that is about to be rewritten to x.prev.jsonl and returns the new path.
+    The previous version gets a manifest with the input hash of each line that the rewrite reuses (as decided by
+    reuse_map), so an interrupted rewrite can still reuse them when it is resumed (see get_previous_reuse_map).
+    """
+    previous_file_path = get_previous_file_path(file_path)
+    os.replace(file_path, previous_file_path)
+    remove_manifest(file_path)
+    if inputs is None or not reuse_map:
+        remove_manifest(previous_file_path)
+        return previous_file_path
+    previous_inputs = [''] * (max(reuse_map.values()) + 1)
+    for idx, line in reuse_map.items():
+        previous_inputs[line] = inputs[idx]
+    save_manifest(previous_file_path, config, previous_inputs)
+    return previous_file_path
+
+
+def remove_previous(file_path):
+    """
+    Removes the previous version of an artifact (and its manifest) once the rewrite is complete.
+    """
+    previous_file_path = get_previous_file_path(file_path)
+    for path in [previous_file_path, get_manifest_path(previous_file_path)]:
+        if os.path.isfile(path):
+            os.remove(path)
+
+
+def remove_manifest(file_path):
+    """
+    Removes the manifest of an artifact that is about to be rewritten, so that an interrupted rewrite is resumed
+    by position (its lines are in the order of the current items) and never matched with the previous inputs.
+    """
+    manifest_path = get_manifest_path(file_path)
+    if os.path.isfile(manifest_path):
+        os.remove(manifest_path)
+
+
+def get_previous_file_path(file_path):
+    """
+    Path the previous version of an artifact is moved to while it is rewritten (x.jsonl -> x.prev.jsonl).
+    """
+    return get_sidecar_path(file_path, '.prev.jsonl')
@@ -0,0 +1,96 @@
+import json
+from collections import Counter
+from src.constants import PASS_STR
+"""
+This package handles multi-sample (n > 1) model outputs: sample extraction, deduplication and pass@k / consistency metrics.
+"""
+
+
+def get_choice_message(choice):
+    message = choice.get('message') or {}
+    return {
+        'role': message.get('role', 'assistant'),
+        'content': message.get('content'),
+        'tool_calls': message.get('tool_calls'),
+    }
+
+
+def get_response_message(response):
+    """
+    Returns the first choice message of a (parsed) response, falling back to its top-level content/tool_calls.
+    """
+    if response.get('choices'):
+        return get_choice_message(response['choices'][0])
+    return {'role': response.get('role', 'assistant'), 'content': response.get('content'),
+            'tool_calls': response.get('tool_calls')}
+
+
+def get_samples(out):
+    """
+    Returns the samples of a model output (the output itself when it is single-sample).
+    """
+    if out is None:
+        return []
+    return out.get('samples') or [out]
+
+
+def sample_key(sample):
+    """
+    Canonical key of a sample, so that identical samples are exact-matched/judged only once.
+    Tool call ids are ignored and arguments are compared as parsed JSON.
+    """
+    tool_calls = []
+    for tool_call in sample.get('tool_calls') or []:
+        func = tool_call.get('function') or {}
+        arguments = func.get('arguments')
+        try:
+            arguments = json.dumps(json.loads(arguments), ensure_ascii=False, sort_keys=True)
+        except (TypeError, ValueError):
+            pass
+        tool_calls.append((func.get('name'), arguments))
+    return (sample.get('content') or '').strip(), tuple(tool_calls)
+
+
+def summarize_samples(sample_records):
+    """
+    Computes pass@1, pass@k and self-consistency of multi-sample evaluation records.
+
+    - pass@1 : mean fraction of passing samples per item (unbiased estimate from k samples)
+    - pass@k : fraction of items with at least one passing sample
+    - self_consistency : mean share of the most common (deduplicated) sample per item
+    - verdict_consistency : fraction of items whose samples all got the same verdict
+
+    Parameters:
+        sample_records (list): (report group, samples) of the multi-sample evaluation records.
+    Returns:
+        dict: metrics per group and 'total', or {} if no record has samples.
+    """
+    groups = {}
+    for record_group, samples in sample_records:
+        for group in [record_group, 'total']:
+            groups.setdefault(group, []).append(samples)
+    result = {}
+    for group in sorted(groups, key=lambda group: group == 'total'):
+        group_samples = groups[group]
+        items = len(group_samples)
+        pass_at_1 = sum(s['verdicts'].count(PASS_STR) / s['k'] for s in group_samples) / items
+        pass_at_k = sum(1 for s in group_samples if PASS_STR in s['verdicts']) / items
+        self_consistency = sum(Counter(s['groups']).most_common(1)[0][1] / s['k'] for s in group_samples) / items
+        verdict_consistency = sum(1 for s in group_samples if len(set(s['verdicts'])) == 1) / items
+        result[group] = {
+            'items': items,
+            'k': max(s['k'] for s in group_samples),
+            'pass@1': pass_at_1,
+            'pass@k': pass_at_k,
+            'self_consistency': self_consistency,
+            'verdict_consistency': verdict_consistency,
+            'avg_unique_samples': sum(s['unique'] for s in group_samples) / items,
+        }
+    return result
+
+
+def display_sampling_stats(stats):
+    for group, row in stats.items():
+        print(f"[[sampling]] {group} : items {row['items']}, k {row['k']}, pass@1 {row['pass@1']:.3f}, "
+              f"pass@{row['k']} {row['pass@k']:.3f}, self-consistency {row['self_consistency']:.3f}, "
+              f"verdict consistency {row['verdict_consistency']:.3f}")
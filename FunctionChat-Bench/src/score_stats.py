@@ -0,0 +1,172 @@
+import numpy as np
+"""
+This package computes vectorized score statistics: bootstrap confidence intervals of pass rates,
+and paired McNemar / permutation tests between models on shared items.
+"""
+
+DEFAULT_RESAMPLES = 10000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_ALPHA = 0.05
+
+
+def bootstrap_ci(pass_counts, totals, n_resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE, seed=0):
+    """
+    Percentile bootstrap confidence intervals of several pass rates at once.
+    Resampling n binary outcomes with replacement only changes the pass count, which then follows
+    Binomial(n, pass_rate); so all resamples of all rates are drawn as one (rates x resamples) binomial matrix.
+
+    Parameters:
+        pass_counts (array-like): pass count of each rate.
+        totals (array-like): number of items of each rate (the denominator).
+        n_resamples (int): number of bootstrap resamples.
+        confidence (float): confidence level of the intervals.
+        seed (int): random seed.
+    Returns:
+        np.ndarray: (rates x 2) lower/upper bounds.
+    """
+    pass_counts = np.asarray(pass_counts, dtype=np.int64)
+    totals = np.asarray(totals, dtype=np.int64)
+    if pass_counts.size == 0:
+        return np.zeros((0, 2))
+    safe_totals = np.maximum(totals, 1)
+    rates = np.clip(pass_counts / safe_totals, 0.0, 1.0)
+    rng = np.random.default_rng(seed)
+    resampled = rng.binomial(safe_totals[:, None], rates[:, None], size=(len(totals), n_resamples)) / safe_totals[:, None]
+    alpha = (1 - confidence) / 2
+    bounds = np.quantile(resampled, [alpha, 1 - alpha], axis=1).T
+    bounds[totals == 0] = 0.0
+    return bounds
+
+
+def add_score_ci(score_dict, score_counts, n_resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE):
+    """
+    Returns a copy of a registor score dict with a '<key> ci' interval next to every rate in score_counts.
+
+    Parameters:
+        score_dict (dict): score dict (see get_score of the registors).
+        score_counts (dict): rate key -> (pass count, total), see get_score_counts of the registors.
+    """
+    keys = [key for key in score_counts if key in score_dict]
+    bounds = bootstrap_ci([score_counts[key][0] for key in keys], [score_counts[key][1] for key in keys],
+                          n_resamples=n_resamples, confidence=confidence)
+    result = {}
+    for key, value in score_dict.items():
+        result[key] = value
+        if key in keys:
+            result[f'{key} ci'] = [float(bound) for bound in bounds[keys.index(key)]]
+    result['ci_confidence'] = confidence
+    result['ci_resamples'] = n_resamples
+    return result
+
+
+def to_outcome_matrix(model_outcomes):
+    """
+    Aligns per-model outcomes on the union of item keys.
+
+    Parameters:
+        model_outcomes (list): one {item key: is_pass(bool)} dict per model.
+    Returns:
+        np.ndarray: (models x items) pass matrix (bool).
+        np.ndarray: (models x items) presence matrix (bool).
+    """
+    keys = sorted({key for outcomes in model_outcomes for key in outcomes}, key=str)
+    columns = {key: idx for idx, key in enumerate(keys)}
+    passed = np.zeros((len(model_outcomes), len(keys)), dtype=bool)
+    present = np.zeros((len(model_outcomes), len(keys)), dtype=bool)
+    for row, outcomes in enumerate(model_outcomes):
+        idx = np.fromiter((columns[key] for key in outcomes), dtype=np.int64, count=len(outcomes))
+        present[row, idx] = True
+        passed[row, idx] = np.fromiter(outcomes.values(), dtype=bool, count=len(outcomes))
+    return passed, present
+
+
+def _binomial_two_sided(discordant, smaller):
+    """
+    Exact two-sided p-value of `smaller` successes in `discordant` fair coin flips, for arrays of counts.
+    """
+    p_values = np.ones(discordant.shape)
+    max_n = int(discordant.max()) if discordant.size else 0
+    if max_n == 0:
+        return p_values
+    # log n! 테이블로 이항 pmf 를 한 번에 계산
+    log_factorial = np.concatenate([[0.0], np.cumsum(np.log(np.arange(1, max_n + 1)))])
+    for n in np.unique(discordant[discordant > 0]):
+        k = np.arange(n + 1)
+        cdf = np.cumsum(np.exp(log_factorial[n] - log_factorial[k] - log_factorial[n - k] - n * np.log(2)))
+        mask = discordant == n
+        p_values[mask] = np.minimum(1.0, 2 * cdf[smaller[mask]])
+    return p_values
+
+
+def paired_tests(passed, present, n_resamples=DEFAULT_RESAMPLES, seed=0):
+    """
+    Paired tests between every pair of models on the items both models were evaluated on.
+
+    - mcnemar_p : exact McNemar test on the discordant pairs (i passes and j fails, or the reverse)
+    - permutation_p : paired permutation (sign flip) test of the pass rate difference; for binary outcomes
+      only discordant items change sign, so the null distribution is one binomial draw per discordant count
+
+    Parameters:
+        passed (np.ndarray): (models x items) pass matrix, see to_outcome_matrix.
+        present (np.ndarray): (models x items) presence matrix.
+        n_resamples (int): number of permutations.
+        seed (int): random seed.
+    Returns:
+        dict: (models x models) matrices 'shared', 'diff' (rate_i - rate_j on shared items),
+              'only_i' (i passes, j fails), 'only_j', 'mcnemar_p' and 'permutation_p'.
+    """
+    passed = (passed & present).astype(np.int64)
+    failed = (~passed.astype(bool) & present).astype(np.int64)
+    present = present.astype(np.int64)
+    shared = present @ present.T
+    only_i = passed @ failed.T
+    only_j = only_i.T
+    discordant = only_i + only_j
+    diff = np.divide(only_i - only_j, shared, out=np.zeros(shared.shape), where=shared > 0)
+    mcnemar_p = _binomial_two_sided(discordant, np.minimum(only_i, only_j))
+    permutation_p = np.ones(shared.shape)
+    observed = np.abs(only_i - only_j)
+    rng = np.random.default_rng(seed)
+    # 귀무분포는 discordant 개수에만 의존 -> 같은 개수의 pair 는 한 번 뽑은 분포를 공유
+    for n in np.unique(discordant[discordant > 0]):
+        null_stat = np.sort(np.abs(2 * rng.binomial(n, 0.5, size=n_resamples) - n))
+        mask = discordant == n
+        exceed = n_resamples - np.searchsorted(null_stat, observed[mask], side='left')
+        permutation_p[mask] = (exceed + 1) / (n_resamples + 1)
+    return {
+        'shared': shared,
+        'diff': diff,
+        'only_i': only_i,
+        'only_j': only_j,
+        'mcnemar_p': mcnemar_p,
+        'permutation_p': permutation_p,
+    }
+
+
+def holm_adjust(p_matrix):
+    """
+    Holm-Bonferroni adjustment of the p-values of every unordered model pair (upper triangle), returned as a symmetric matrix.
+    """
+    size = p_matrix.shape[0]
+    rows, cols = np.triu_indices(size, k=1)
+    p_values = p_matrix[rows, cols]
+    adjusted = np.ones(p_matrix.shape)
+    if p_values.size == 0:
+        return adjusted
+    order = np.argsort(p_values)
+    scaled = np.minimum(1.0, np.maximum.accumulate(p_values[order] * (p_values.size - np.arange(p_values.size))))
+    holm = np.empty(p_values.size)
+    holm[order] = scaled
+    adjusted[rows, cols] = holm
+    adjusted[cols, rows] = holm
+    return adjusted
+
+
+def significance_marker(p_value, alpha=DEFAULT_ALPHA):
+    if p_value < alpha / 50:
+        return '***'
+    if p_value < alpha / 5:
+        return '**'
+    if p_value < alpha:
+        return '*'
+    return ''
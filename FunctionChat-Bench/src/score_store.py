@@ -0,0 +1,229 @@
+import os
+import json
+import time
+import sqlite3
+import tempfile
+"""
+This package stores evaluation scores in a SQLite database (WAL mode), so that dialog / singlecall / common runs
+of the same model can save their scores in parallel. The FunctionChat-<model>.eval_score.json file is kept as an
+exported view of the database, rewritten atomically after every save.
+"""
+
+SCORE_DB_NAME = 'eval_score.sqlite'
+SCORE_SECTIONS = ['singlecall_score', 'dialog_score', 'calldecision_score']
+METADATA_KEYS = ['llm_judge_model', 'target_model_path', 'fcb_version', 'fcb_environments',
+                 'started_at', 'finished_at', 'elapsed']
+
+CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS scores (
+    model_name TEXT NOT NULL,
+    score_key TEXT NOT NULL,
+    stats_key TEXT NOT NULL,
+    score TEXT NOT NULL,
+    judge_stats TEXT,
+    sampling_stats TEXT,
+    llm_judge_model TEXT,
+    target_model_path TEXT,
+    fcb_version TEXT,
+    fcb_environments TEXT,
+    started_at REAL,
+    finished_at REAL,
+    elapsed REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (model_name, score_key)
+)
+"""
+
+UPSERT = """
+INSERT INTO scores (model_name, score_key, stats_key, score, judge_stats, sampling_stats, llm_judge_model,
+                    target_model_path, fcb_version, fcb_environments, started_at, finished_at, elapsed, updated_at)
+VALUES (:model_name, :score_key, :stats_key, :score, :judge_stats, :sampling_stats, :llm_judge_model,
+        :target_model_path, :fcb_version, :fcb_environments, :started_at, :finished_at, :elapsed, :updated_at)
+ON CONFLICT (model_name, score_key) DO UPDATE SET
+    stats_key = excluded.stats_key,
+    score = excluded.score,
+    judge_stats = excluded.judge_stats,
+    sampling_stats = excluded.sampling_stats,
+    llm_judge_model = excluded.llm_judge_model,
+    target_model_path = excluded.target_model_path,
+    fcb_version = excluded.fcb_version,
+    fcb_environments = excluded.fcb_environments,
+    started_at = excluded.started_at,
+    finished_at = excluded.finished_at,
+    elapsed = excluded.elapsed,
+    updated_at = excluded.updated_at
+"""
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False) if value is not None else None
+
+
+def _loads(value):
+    return json.loads(value) if value is not None else None
+
+
+def get_score_key(stats_key):
+    """
+    Returns the eval_score.json section of an eval subtype (e.g. 'calldecision' -> 'calldecision_score').
+    """
+    return f'{stats_key}_score'
+
+
+class ScoreStore:
+    """
+    Transactional score store. Each (model, eval subtype) is one row with its score, judge/sampling stats and
+    run metadata. Writers take the database write lock (BEGIN IMMEDIATE) for the upsert and the JSON export,
+    so concurrent processes never overwrite each other's sections.
+    """
+    def __init__(self, db_path, timeout=60.0):
+        self.db_path = db_path
+        self.timeout = timeout
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA busy_timeout = %d' % int(self.timeout * 1000))
+        conn.execute(CREATE_TABLE)
+        return conn
+
+    def save(self, model_name, stats_key, score, judge_stats=None, sampling_stats=None, metadata=None,
+             json_path=None):
+        """
+        Upserts the score of one eval subtype of a model and re-exports the model's eval_score.json.
+        Every field is replaced, so judge/sampling stats that are empty in this run are removed.
+
+        Parameters:
+            model_name (str): target model name.
+            stats_key (str): eval subtype (dialog, singlecall, calldecision, ...).
+            score (dict): registor score dict.
+            judge_stats (dict): judge statistics of the run.
+            sampling_stats (dict): multi-sample statistics of the run.
+            metadata (dict): run metadata (see METADATA_KEYS).
+            json_path (str): eval_score.json path to export; rows of an existing file are imported first.
+        """
+        metadata = metadata or {}
+        row = {key: metadata.get(key) for key in METADATA_KEYS}
+        row['fcb_version'] = _dumps(row['fcb_version'])
+        row['fcb_environments'] = _dumps(row['fcb_environments'])
+        row.update({
+            'model_name': model_name,
+            'score_key': get_score_key(stats_key),
+            'stats_key': stats_key,
+            'score': json.dumps(score, ensure_ascii=False),
+            # 이번 실행에서 비어 있는 통계는 NULL 로 덮어써 이전 실행의 값을 지움
+            'judge_stats': _dumps(judge_stats or None),
+            'sampling_stats': _dumps(sampling_stats or None),
+            'updated_at': time.time(),
+        })
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if json_path is not None:
+                    self._import_json(conn, model_name, json_path)
+                conn.execute(UPSERT, row)
+                if json_path is not None:
+                    self._export_json(conn, model_name, json_path)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+
+    def load(self, model_name):
+        """
+        Returns the eval_score.json view of a model.
+        """
+        conn = self._connect()
+        try:
+            return self._to_json_view(self._select(conn, model_name))
+        finally:
+            conn.close()
+
+    def _select(self, conn, model_name):
+        return conn.execute('SELECT * FROM scores WHERE model_name = ? ORDER BY updated_at',
+                            (model_name,)).fetchall()
+
+    def _import_json(self, conn, model_name, json_path):
+        """
+        Imports the sections of an eval_score.json written before the score store existed (once per model).
+        """
+        if self._select(conn, model_name) or not os.path.isfile(json_path):
+            return
+        try:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                total_score = json.load(f)
+        except Exception as e:
+            print(f"Error loading evaluation score: {e}")
+            return
+        judge_stats = total_score.get('judge_stats', {})
+        sampling_stats = total_score.get('sampling_stats', {})
+        for key, score in total_score.items():
+            if not key.endswith('_score') or not score:
+                continue
+            stats_key = key[:-len('_score')]
+            conn.execute(UPSERT, {
+                'model_name': model_name,
+                'score_key': key,
+                'stats_key': stats_key,
+                'score': json.dumps(score, ensure_ascii=False),
+                'judge_stats': _dumps(judge_stats.get(stats_key) or None),
+                'sampling_stats': _dumps(sampling_stats.get(stats_key) or None),
+                'llm_judge_model': total_score.get('llm_judge_model'),
+                'target_model_path': total_score.get('target_model_path'),
+                'fcb_version': _dumps(total_score.get('fcb_version')),
+                'fcb_environments': _dumps(total_score.get('fcb_environments')),
+                'started_at': None,
+                'finished_at': None,
+                'elapsed': None,
+                'updated_at': 0.0,
+            })
+
+    def _to_json_view(self, rows):
+        if not rows:
+            return {}
+        latest = rows[-1]
+        total_score = {
+            'fcb_version': _loads(latest['fcb_version']),
+            'fcb_environments': _loads(latest['fcb_environments']),
+            'llm_judge_model': latest['llm_judge_model'],
+            'target_model_path': latest['target_model_path'],
+        }
+        for section in SCORE_SECTIONS:
+            total_score[section] = {}
+        judge_stats, sampling_stats, runs = {}, {}, {}
+        for row in rows:
+            total_score[row['score_key']] = _loads(row['score'])
+            if row['judge_stats']:
+                judge_stats[row['stats_key']] = _loads(row['judge_stats'])
+            if row['sampling_stats']:
+                sampling_stats[row['stats_key']] = _loads(row['sampling_stats'])
+            runs[row['stats_key']] = {
+                'llm_judge_model': row['llm_judge_model'],
+                'fcb_version': _loads(row['fcb_version']),
+                'started_at': row['started_at'],
+                'finished_at': row['finished_at'],
+                'elapsed': row['elapsed'],
+            }
+        if judge_stats:
+            total_score['judge_stats'] = judge_stats
+        if sampling_stats:
+            total_score['sampling_stats'] = sampling_stats
+        total_score['runs'] = runs
+        return total_score
+
+    def _export_json(self, conn, model_name, json_path):
+        # 같은 디렉토리의 임시 파일에 쓴 뒤 rename -> 읽는 쪽은 항상 완전한 파일만 봄
+        total_score = self._to_json_view(self._select(conn, model_name))
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(json_path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(json.dumps(total_score, ensure_ascii=False, indent=4))
+            os.replace(tmp_path, json_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,248 @@
+import os
+import mmap
+import struct
+import hashlib
+from src import json_codec
+from src.blob_store import BlobReader, get_blob_file_path
+from src.eval_index import get_index_file_path, load_eval_index
+from src.framed_io import FrameReader, get_compression, get_sidecar_path, iter_line_positions
+from src.jsonl_reader import iter_jsonl
+from src.request_catalog import RequestCatalog, get_catalog_file_path
+"""
+This package writes and reads the serial index of a run artifact (<file>.serial.idx next to requests, predictions
+and eval records), so that a single item (e.g. how a model answered serial 1234) is read without loading the file.
+
+The index is a binary file: a header (artifact size, key file size, entry count) followed by one fixed size entry per
+line, sorted by serial hash:
+
+    serial hash (8) | subtype hash (8) | line (8) | start (8) | offset in frame (4) | length (4)
+
+The subtype is the tools_type (singlecall) or type_of_output of the item. SerialIndex maps the index with mmap and
+binary searches it, so a lookup touches a few index pages and the bytes of the matching lines (one frame of a
+compressed artifact). Predictions hold no serial, so their keys are taken from the request file they are aligned with.
+An index whose artifact (or key file) has another size is rebuilt on open.
+"""
+
+SERIAL_INDEX_SUFFIX = '.serial.idx'
+SERIAL_INDEX_MAGIC = b'FCBSIDX1'
+HEADER = struct.Struct('<8sqqq')
+ENTRY = struct.Struct('<QQqqII')
+KEY = struct.Struct('<Q')
+
+
+def get_serial_index_path(file_path):
+    # index 는 binary (mmap) 이므로 artifact 가 압축되어도 plain 으로 기록
+    return get_sidecar_path(file_path, SERIAL_INDEX_SUFFIX, compressed=False)
+
+
+def get_key_hash(value):
+    text = '' if value is None else str(value)
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def get_serial_key(item):
+    """
+    Returns (serial_num, subtype) of a request, an eval record or an eval index record.
+    """
+    if 'model_request' in item:
+        item = item['model_request']
+    return item.get('serial_num'), item.get('tools_type') or item.get('type_of_output')
+
+
+def load_serial_keys(file_path, request_file_path=None):
+    """
+    Returns the (serial_num, subtype) of every line of an artifact: from its request file (predictions),
+    from its eval index (eval records) or from its own lines (requests).
+    """
+    if request_file_path is not None:
+        return [get_serial_key(request) for request in iter_jsonl(request_file_path)]
+    if os.path.isfile(get_index_file_path(file_path)):
+        return [get_serial_key(index_record) for index_record in load_eval_index(file_path)]
+    return [get_serial_key(item) for item in iter_jsonl(file_path)]
+
+
+def get_file_size(file_path):
+    return os.path.getsize(file_path) if file_path else -1
+
+
+def write_serial_index(file_path, request_file_path=None, keys=None):
+    """
+    Writes the serial index of an artifact (atomically).
+
+    Parameters:
+        file_path (str): artifact path.
+        request_file_path (str): request file the lines of a predictions file are aligned with.
+        keys (list): (serial_num, subtype) of every line; loaded with load_serial_keys if None.
+    Returns:
+        int: number of indexed lines.
+    """
+    if keys is None:
+        keys = load_serial_keys(file_path, request_file_path)
+    entries = []
+    positions = ((start, end, offset, line) for start, end, offset, line in iter_line_positions(file_path)
+                 if line.strip())
+    for idx, ((serial_num, subtype), (start, _, offset, line)) in enumerate(zip(keys, positions)):
+        entries.append((get_key_hash(serial_num), get_key_hash(subtype), idx, start, offset, len(line)))
+    entries.sort()
+    index_path = get_serial_index_path(file_path)
+    tmp_path = f"{index_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(SERIAL_INDEX_MAGIC, os.path.getsize(file_path), get_file_size(request_file_path),
+                            len(entries)))
+        f.write(b''.join(ENTRY.pack(*entry) for entry in entries))
+    os.replace(tmp_path, index_path)
+    return len(entries)
+
+
+def update_serial_indexes(file_paths):
+    """
+    Writes the serial indexes of the artifacts of a run that exist ({'request', 'predict', 'eval'} paths).
+    """
+    request_file_path = file_paths['request']
+    for key in ['request', 'predict', 'eval']:
+        file_path = file_paths[key]
+        if os.path.isfile(file_path):
+            write_serial_index(file_path, request_file_path if key == 'predict' else None)
+
+
+class SerialIndex:
+    """
+    Point lookups into an artifact by serial number (and subtype) through its mmap-ed serial index.
+    Eval records of a 'dedup' run are re-hydrated from their blob file and interned requests are materialized
+    from their catalog; both are loaded on the first lookup that needs them.
+    """
+    def __init__(self, file_path, request_file_path=None):
+        self.file_path = file_path
+        self.index_path = get_serial_index_path(file_path)
+        if not self._is_valid(request_file_path):
+            print(f"[[rebuild serial index]] {self.index_path}")
+            write_serial_index(file_path, request_file_path)
+        self._index_fp = open(self.index_path, 'rb')
+        self._index = mmap.mmap(self._index_fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.count = HEADER.unpack_from(self._index, 0)[3]
+        self.compression = get_compression(file_path)
+        self._fp = None
+        self._data = None
+        self._frame_reader = None
+        self._blob_reader = None
+        self._catalog = None
+
+    def _is_valid(self, request_file_path):
+        if not os.path.isfile(self.index_path):
+            return False
+        with open(self.index_path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return False
+        magic, size, key_file_size, _ = HEADER.unpack(header)
+        return (magic == SERIAL_INDEX_MAGIC and size == os.path.getsize(self.file_path)
+                and key_file_size == get_file_size(request_file_path))
+
+    def __len__(self):
+        return self.count
+
+    def _get_entry(self, position):
+        return ENTRY.unpack_from(self._index, HEADER.size + position * ENTRY.size)
+
+    def _lower_bound(self, serial_hash):
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if KEY.unpack_from(self._index, HEADER.size + mid * ENTRY.size)[0] < serial_hash:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def find(self, serial_num, subtype=None):
+        """
+        Returns the entries (serial hash, subtype hash, line, start, offset, length) of the lines of a serial number
+        (of a subtype if given), in line order.
+        """
+        serial_hash = get_key_hash(serial_num)
+        subtype_hash = None if subtype is None else get_key_hash(subtype)
+        entries = []
+        for position in range(self._lower_bound(serial_hash), self.count):
+            entry = self._get_entry(position)
+            if entry[0] != serial_hash:
+                break
+            if subtype_hash is None or entry[1] == subtype_hash:
+                entries.append(entry)
+        # entry 는 (serial, subtype, line) 순으로 정렬되어 있으므로 line 순서로 되돌림
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def find_lines(self, serial_num, subtype=None):
+        """
+        Returns the line numbers of a serial number (of a subtype if given).
+        """
+        return [entry[2] for entry in self.find(serial_num, subtype)]
+
+    def read_bytes(self, entry):
+        _, _, _, start, offset, length = entry
+        if self.compression is not None:
+            if self._frame_reader is None:
+                self._frame_reader = FrameReader(self.file_path)
+            return self._frame_reader.read_line(start, offset)
+        if self._data is None:
+            self._fp = open(self.file_path, 'rb')
+            self._data = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data[start:start + length]
+
+    def get(self, serial_num, subtype=None):
+        """
+        Returns the parsed lines of a serial number (of a subtype if given), in line order.
+        """
+        return [self._load(self.read_bytes(entry)) for entry in self.find(serial_num, subtype)]
+
+    def _load(self, line):
+        item = json_codec.loads(line)
+        if 'model_request' in item:
+            blob_file_path = get_blob_file_path(self.file_path)
+            if self._blob_reader is None and os.path.isfile(blob_file_path):
+                self._blob_reader = BlobReader(blob_file_path)
+            return item if self._blob_reader is None else self._blob_reader.hydrate_record(item)
+        if 'messages_id' in item or 'tool_ids' in item:
+            if self._catalog is None:
+                self._catalog = RequestCatalog(get_catalog_file_path(self.file_path))
+            return self._catalog.materialize(item)
+        return item
+
+    def close(self):
+        self._index.close()
+        self._index_fp.close()
+        if self._data is not None:
+            self._data.close()
+            self._fp.close()
+            self._data = None
+        if self._frame_reader is not None:
+            self._frame_reader.close()
+        if self._blob_reader is not None:
+            self._blob_reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def lookup(serial_num, file_paths, subtype=None, request_file_path=None):
+    """
+    Joins the lines of a serial number across artifacts of the same kind (e.g. the predictions or the eval records
+    of several models).
+
+    Parameters:
+        serial_num: serial number to look up.
+        file_paths (dict): {name (e.g. model): artifact path}; missing files are skipped.
+        subtype (str): tools_type / type_of_output to look up (all subtypes if None).
+        request_file_path (str): request file the artifacts are aligned with (predictions only).
+    Returns:
+        dict: {name: parsed lines of the serial number}
+    """
+    results = {}
+    for name, file_path in file_paths.items():
+        if not os.path.isfile(file_path):
+            continue
+        with SerialIndex(file_path, request_file_path) as index:
+            results[name] = index.get(serial_num, subtype)
+    return results
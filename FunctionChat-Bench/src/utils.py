@@ -1,10 +1,11 @@
 import os
-import json
 import time
 import requests
 import subprocess
 import pandas as pd
 from tqdm import tqdm
+from src import json_codec
+from src.framed_io import LineWriter, iter_lines
 """
 This is a package that collects commonly used basic utilities.
 """
@@ -47,7 +48,7 @@ def load_to_json(file_name):
     datas = None
     with open(file_name, 'r') as ff:
         try:
-            datas = json.loads(ff.read())
+            datas = json_codec.loads(ff.read())
         except Exception as e:
             print(file_name)
             print("[Exception]", e)
@@ -57,22 +58,24 @@ def load_to_json(file_name):
 
 def load_to_jsonl(input_file_path):
     output = []
-    with open(input_file_path) as f:
-        for line in tqdm(f.readlines()):
-            try:
-                output.append(json.loads(line))
-            except Exception as e:
-                print(line)
-                print("[Exception]", e)
-                raise e
+    # 파일 전체를 readlines 로 올리지 않고 binary 로 한 줄씩 파싱 (*.gz / *.zst 는 frame 단위로 풀면서)
+    for line in tqdm(iter_lines(input_file_path)):
+        if not line.strip():
+            continue
+        try:
+            output.append(json_codec.loads(line))
+        except Exception as e:
+            print(line)
+            print("[Exception]", e)
+            raise e
     return output
 
 
 def save_to_jsonl(data, filename):
     if isinstance(data, list):
-        with open(filename, 'w', encoding='utf-8') as f:
+        with LineWriter(filename, 'w') as f:
             for item in data:
-                f.write(json.dumps(item, ensure_ascii=False) + '\n')
+                f.write(json_codec.dumps(item) + '\n')
     else:
         raise Exception(f"save_to_jsonl error : data type is invalid. ({type(data)})")
 
@@ -88,13 +91,13 @@ def get_output_filename(source_file):
 
 def save_cache(data, cache_path):
     with open(cache_path, 'w') as f:
-        f.write(json.dumps(data, ensure_ascii=False))
+        f.write(json_codec.dumps(data))
     return cache_path
 
 
 def load_cache(cache_path):
     with open(cache_path, 'r') as f:
-        return json.loads(f.read())
+        return json_codec.loads(f.read())
 
 
 def create_directory_if_not_exists(directory_path):
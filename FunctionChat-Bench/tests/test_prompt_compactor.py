@@ -0,0 +1,59 @@
+import copy
+import unittest
+
+from src.prompt_compactor import JudgePromptCompactor
+"""
+Unit tests of the compact judge prompt memo (python -m unittest discover -s tests, from FunctionChat-Bench).
+"""
+
+TOOL = {'type': 'function', 'function': {'name': 'get_weather', 'description': '날씨 조회',
+                                         'parameters': {'type': 'object', 'required': ['city']}}}
+MESSAGES = [
+    {'role': 'system', 'content': 'system prompt'},
+    {'role': 'user', 'content': '서울 날씨 알려줘'},
+    {'role': 'assistant', 'content': '<think>...</think>어느 날짜요?'},
+]
+
+
+class CompactorMemoTest(unittest.TestCase):
+    def setUp(self):
+        self.compactor = JudgePromptCompactor(history_size=1)
+
+    def test_equal_content_hits_the_memo(self):
+        self.compactor.set_dialog(MESSAGES)
+        query = self.compactor.compact_messages(MESSAGES)
+        memo = dict(self.compactor._message_cache)
+        # 같은 turn 의 request 를 따로 읽어 객체가 달라도 memo 재사용
+        messages = copy.deepcopy(MESSAGES)
+        self.compactor.set_dialog(messages)
+        self.assertEqual(self.compactor.compact_messages(messages), query)
+        self.assertEqual(len(self.compactor._message_cache), 2)
+        for key, cached in memo.items():
+            self.assertIs(self.compactor._message_cache[key], cached)
+
+    def test_changed_object_is_not_served_from_the_memo(self):
+        tool = copy.deepcopy(TOOL)
+        self.compactor.set_dialog(MESSAGES)
+        self.assertIn('get_weather', self.compactor.compact_tools([tool], set()))
+        tool['function']['name'] = 'get_forecast'
+        self.assertIn('get_forecast', self.compactor.compact_tools([tool], set()))
+
+    def test_memo_is_dropped_for_another_dialog(self):
+        self.compactor.set_dialog(MESSAGES)
+        self.compactor.compact_messages(MESSAGES)
+        other = [{'role': 'user', 'content': '부산 날씨 알려줘'}]
+        self.compactor.set_dialog(other)
+        self.assertEqual(self.compactor._message_cache, {})
+
+    def test_saved_tokens(self):
+        self.compactor.set_dialog(MESSAGES)
+        saved = self.compactor.get_saved_tokens([TOOL], set(), MESSAGES)
+        cached = [self.compactor._get_message(message) for message in MESSAGES]
+        tool = self.compactor._get_tool(TOOL)
+        # system 은 빠지고, user 는 요약, assistant 는 think 블록 없는 compact 로 대체
+        self.assertEqual(saved, (tool[2] - tool[3]) + cached[0][3] + (cached[1][3] - cached[1][5])
+                         + (cached[2][3] - cached[2][4]))
+
+
+if __name__ == '__main__':
+    unittest.main()
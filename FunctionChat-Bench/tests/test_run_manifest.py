@@ -0,0 +1,166 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src import run_manifest
+"""
+Unit tests of the run manifest reuse logic (python -m unittest discover -s tests, from FunctionChat-Bench).
+"""
+
+CONFIG = {'kind': 'eval', 'judge': 'judge-model'}
+
+
+def get_hashes(items):
+    return [run_manifest.get_item_hash(item) for item in items]
+
+
+class RunManifestTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.tmp_dir, 'x.eval.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_artifact(self, items, config=CONFIG, manifest=True):
+        with open(self.file_path, 'w', encoding='utf-8') as f:
+            for item in items:
+                f.write(f"{item}\n")
+        if manifest:
+            run_manifest.save_manifest(self.file_path, config, get_hashes(items))
+
+    def get_line_count(self):
+        with open(self.file_path, 'r', encoding='utf-8') as f:
+            return sum(1 for _ in f)
+
+    def get_reuse_map(self, items, config=CONFIG):
+        return run_manifest.get_reuse_map(self.file_path, config, get_hashes(items), self.get_line_count())
+
+
+class GetReuseMapTest(RunManifestTestCase):
+    def test_unchanged_items_are_a_prefix(self):
+        self.write_artifact(['a', 'b', 'c'])
+        reuse_map = self.get_reuse_map(['a', 'b', 'c'])
+        self.assertEqual(reuse_map, {0: 0, 1: 1, 2: 2})
+        self.assertTrue(run_manifest.is_prefix(reuse_map, 3, 3))
+
+    def test_inserted_item(self):
+        self.write_artifact(['a', 'b', 'c'])
+        reuse_map = self.get_reuse_map(['a', 'new', 'b', 'c'])
+        self.assertEqual(reuse_map, {0: 0, 2: 1, 3: 2})
+        self.assertFalse(run_manifest.is_prefix(reuse_map, 3, 4))
+
+    def test_appended_item_resumes_by_appending(self):
+        self.write_artifact(['a', 'b'])
+        reuse_map = self.get_reuse_map(['a', 'b', 'c'])
+        self.assertEqual(reuse_map, {0: 0, 1: 1})
+        self.assertTrue(run_manifest.is_prefix(reuse_map, 2, 3))
+
+    def test_removed_item(self):
+        self.write_artifact(['a', 'b', 'c', 'd'])
+        reuse_map = self.get_reuse_map(['a', 'c', 'd'])
+        self.assertEqual(reuse_map, {0: 0, 1: 2, 2: 3})
+        self.assertFalse(run_manifest.is_prefix(reuse_map, 4, 3))
+
+    def test_changed_item(self):
+        self.write_artifact(['a', 'b', 'c'])
+        reuse_map = self.get_reuse_map(['a', 'b2', 'c'])
+        self.assertEqual(reuse_map, {0: 0, 2: 2})
+        self.assertFalse(run_manifest.is_prefix(reuse_map, 3, 3))
+
+    def test_moved_items(self):
+        self.write_artifact(['a', 'b', 'c'])
+        reuse_map = self.get_reuse_map(['c', 'a', 'b'])
+        self.assertEqual(reuse_map, {0: 2, 1: 0, 2: 1})
+        self.assertFalse(run_manifest.is_prefix(reuse_map, 3, 3))
+
+    def test_duplicated_items_keep_their_order(self):
+        self.write_artifact(['a', 'b', 'a'])
+        self.assertEqual(self.get_reuse_map(['a', 'b', 'a']), {0: 0, 1: 1, 2: 2})
+        # 앞에 item 이 추가되어도 중복 item 은 원래 순서대로 매칭
+        self.assertEqual(self.get_reuse_map(['x', 'a', 'b', 'a']), {1: 0, 2: 1, 3: 2})
+
+    def test_duplicated_item_added(self):
+        self.write_artifact(['a', 'b'])
+        reuse_map = self.get_reuse_map(['a', 'a', 'b'])
+        # 각 line 은 한 item 에만 재사용
+        self.assertEqual(reuse_map, {0: 0, 2: 1})
+
+    def test_other_config_reuses_nothing(self):
+        self.write_artifact(['a', 'b'])
+        self.assertEqual(self.get_reuse_map(['a', 'b'], config={'kind': 'eval', 'judge': 'other'}), {})
+
+    def test_without_manifest_reuses_by_position(self):
+        self.write_artifact(['a', 'b', 'c'], manifest=False)
+        self.assertEqual(self.get_reuse_map(['z', 'b']), {0: 0, 1: 1})
+
+    def test_lines_appended_after_manifest_are_reused_by_position(self):
+        # 이어서 하던 실행이 manifest 를 쓰기 전에 중단된 경우
+        self.write_artifact(['a', 'b'])
+        with open(self.file_path, 'a', encoding='utf-8') as f:
+            f.write("c\n")
+        reuse_map = self.get_reuse_map(['a', 'b', 'c', 'd'])
+        self.assertEqual(reuse_map, {0: 0, 1: 1, 2: 2})
+        self.assertTrue(run_manifest.is_prefix(reuse_map, 3, 4))
+
+
+class InterruptedRewriteTest(RunManifestTestCase):
+    def start_rewrite(self, items):
+        inputs = get_hashes(items)
+        reuse_map = run_manifest.get_reuse_map(self.file_path, CONFIG, inputs, self.get_line_count())
+        previous_file_path = run_manifest.move_to_previous(self.file_path, CONFIG, inputs, reuse_map)
+        return previous_file_path, reuse_map
+
+    def test_move_to_previous(self):
+        self.write_artifact(['a', 'b', 'c'])
+        previous_file_path, _ = self.start_rewrite(['new', 'a', 'b', 'c'])
+        self.assertEqual(previous_file_path, run_manifest.get_previous_file_path(self.file_path))
+        self.assertFalse(os.path.isfile(self.file_path))
+        self.assertIsNone(run_manifest.load_manifest(self.file_path))
+        self.assertIsNotNone(run_manifest.load_manifest(previous_file_path))
+
+    def test_resume_reuses_previous_lines(self):
+        self.write_artifact(['a', 'b', 'c'])
+        items = ['new', 'a', 'b', 'c']
+        self.start_rewrite(items)
+        # 재작성이 첫 두 item 을 기록한 뒤 중단 (manifest 없음 -> 위치 기준으로 이어서 append)
+        self.write_artifact(['new', 'a'], manifest=False)
+        inputs = get_hashes(items)
+        reuse_map = run_manifest.get_reuse_map(self.file_path, CONFIG, inputs, 2)
+        self.assertTrue(run_manifest.is_prefix(reuse_map, 2, len(items)))
+        self.assertEqual(run_manifest.get_previous_reuse_map(self.file_path, CONFIG, inputs, 2), {2: 1, 3: 2})
+
+    def test_resume_after_another_edit(self):
+        self.write_artifact(['a', 'b', 'c'])
+        self.start_rewrite(['new', 'a', 'b', 'c'])
+        self.write_artifact(['new'], manifest=False)
+        # 중단 후 dataset 이 다시 바뀌어도 이전 line 은 input hash 로 매칭
+        inputs = get_hashes(['new', 'c', 'b', 'd'])
+        self.assertEqual(run_manifest.get_previous_reuse_map(self.file_path, CONFIG, inputs, 1), {1: 2, 2: 1})
+
+    def test_unused_previous_lines_are_not_reused(self):
+        self.write_artifact(['a', 'b', 'c'])
+        # 'b' 가 바뀌어 재작성에서 재사용되지 않는 line 은 이어서 할 때도 재사용하지 않음
+        self.start_rewrite(['a', 'b2', 'c'])
+        self.write_artifact([], manifest=False)
+        inputs = get_hashes(['a', 'b', 'c'])
+        self.assertEqual(run_manifest.get_previous_reuse_map(self.file_path, CONFIG, inputs, 0), {0: 0, 2: 2})
+
+    def test_previous_of_other_config_is_ignored(self):
+        self.write_artifact(['a', 'b'])
+        self.start_rewrite(['x', 'a', 'b'])
+        inputs = get_hashes(['x', 'a', 'b'])
+        self.assertEqual(run_manifest.get_previous_reuse_map(self.file_path, {'kind': 'eval'}, inputs, 0), {})
+
+    def test_remove_previous(self):
+        self.write_artifact(['a', 'b'])
+        previous_file_path, _ = self.start_rewrite(['x', 'a', 'b'])
+        run_manifest.remove_previous(self.file_path)
+        self.assertFalse(os.path.isfile(previous_file_path))
+        self.assertFalse(os.path.isfile(run_manifest.get_manifest_path(previous_file_path)))
+        self.assertEqual(run_manifest.get_previous_reuse_map(self.file_path, CONFIG, get_hashes(['a']), 0), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
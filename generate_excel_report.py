@@ -5,14 +5,18 @@ FunctionChat-Bench 평가 결과 엑셀 리포트 생성기
 - 간결하고 명확한 구조
 """
 
+import io
 import os
-import json
+import sys
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
 from collections import Counter
+from itertools import islice
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 
 REPO_PATH = Path(__file__).parent.absolute()
@@ -20,6 +24,20 @@ SCORE_PATH = REPO_PATH / "score"
 REPORTS_PATH = REPO_PATH / "reports"
 REPORTS_PATH.mkdir(exist_ok=True)
 
+sys.path.insert(0, str(REPO_PATH / "FunctionChat-Bench"))
+from src.score_stats import (  # noqa: E402
+    DEFAULT_ALPHA,
+    DEFAULT_CONFIDENCE,
+    bootstrap_ci,
+    holm_adjust,
+    paired_tests,
+    significance_marker,
+    to_outcome_matrix,
+)
+from src import results_store  # noqa: E402
+from src import framed_io  # noqa: E402
+from src import json_codec  # noqa: E402
+
 # =============================================================================
 # 색상 팔레트 (부드럽고 깔끔하게)
 # =============================================================================
@@ -68,38 +86,120 @@ BORDER = Border(
 ALIGN_CENTER = Alignment(horizontal='center', vertical='center')
 ALIGN_LEFT = Alignment(horizontal='left', vertical='center')
 ALIGN_WRAP = Alignment(horizontal='left', vertical='top', wrap_text=True)
+ALIGNS = {"center": ALIGN_CENTER, "left": ALIGN_LEFT, "wrap": ALIGN_WRAP}
+
+# Details 시트 분할: 시트당 최대 행 수, 파일당 최대 시트 수 (넘치면 *_part2.xlsx ... 에 이어서 기록)
+DETAIL_SHEET_ROWS = 100_000
+DETAIL_FILE_SHEETS = 5
 
 # =============================================================================
 # 유틸리티
 # =============================================================================
 def has_evaluation_data(model_dir):
-    return len(list(model_dir.glob("*.eval_report.tsv"))) > 0
-
-def set_cell(ws, row, col, value, font=None, fill=None, border=None, align=None, fmt=None):
-    cell = ws.cell(row=row, column=col, value=value)
-    if font: cell.font = font
-    if fill: cell.fill = fill
-    if border: cell.border = border
-    if align: cell.alignment = align
-    if fmt: cell.number_format = fmt
-    return cell
-
-def set_formula(ws, row, col, formula, font=None, fill=None, border=None, align=None, fmt=None):
-    cell = ws.cell(row=row, column=col)
-    cell.value = formula
-    if font: cell.font = font
-    if fill: cell.fill = fill
-    if border: cell.border = border
-    if align: cell.alignment = align
-    if fmt: cell.number_format = fmt
-    return cell
+    return len(list(model_dir.glob(f"*{results_store.TSV_SUFFIX}*"))) > 0 or \
+        len(list(model_dir.glob(f"*{results_store.PARQUET_SUFFIX}"))) > 0
+
+def get_report_file(model_dir, stem):
+    """평가 결과 파일 (parquet 결과가 있고 pyarrow 가 있으면 parquet, 아니면 tsv / 압축된 tsv.gz, tsv.zst)"""
+    parquet_file = model_dir / f"{stem}{results_store.PARQUET_SUFFIX}"
+    if parquet_file.exists() and results_store.pa is not None:
+        return parquet_file
+    tsv_file = model_dir / f"{stem}{results_store.TSV_SUFFIX}"
+    for suffix in framed_io.COMPRESSION_SUFFIXES.values():
+        compressed_file = Path(f"{tsv_file}{suffix}")
+        if not tsv_file.exists() and compressed_file.exists():
+            return compressed_file
+    return tsv_file
+
+# 리포트에 필요한 tsv 컬럼 (tools 등 큰 컬럼은 읽지 않음)
+REPORT_TSV_COLUMNS = {'#serial_num', 'is_pass', 'type_of_output', 'tools_type', 'category', 'query', 'input_messages',
+                      'ground_truth', 'model_output', 'reasoning', 'error_type', 'vote_split'}
+
+def load_report(report_file):
+    """평가 결과를 tsv 컬럼명의 DataFrame 으로 로드 (리포트에 필요한 컬럼만 읽음)"""
+    usecols = lambda column: column in REPORT_TSV_COLUMNS
+    if framed_io.get_compression(str(report_file)) is not None:
+        # frame 단위로 압축된 tsv 는 frame 을 이어 붙여 읽음
+        return pd.read_csv(io.BytesIO(framed_io.read_bytes(str(report_file))), sep='\t', usecols=usecols)
+    if report_file.suffix != '.parquet':
+        return pd.read_csv(report_file, sep='\t', usecols=usecols)
+    df = results_store.read_results(report_file)
+    df = df.rename(columns={'serial_num': '#serial_num', 'verdict': 'is_pass'})
+    df['type_of_output'] = df['subtype']
+    df['tools_type'] = df['subtype']
+    df['input_messages'] = df['query']
+    return df
+
+class ReportWorkbook:
+    """
+    write_only 모드 Workbook: 행을 시트에 바로 흘려 쓰므로 셀을 메모리에 들고 있지 않음
+    셀 스타일은 (font, fill, align, fmt, border) 조합마다 NamedStyle 하나를 등록해서 모든 셀이 공유
+    """
+    def __init__(self):
+        self.wb = Workbook(write_only=True)
+        self.styles = set()
+
+    def create_sheet(self, title, widths, freeze=None, row_height=None):
+        return ReportSheet(self, title, widths, freeze, row_height)
+
+    def get_style(self, font, fill=None, align=None, fmt=None, border=True):
+        name = f"{font}|{fill or ''}|{align or ''}|{fmt or ''}|{'border' if border else ''}"
+        if name not in self.styles:
+            style = NamedStyle(name=name, font=FONTS[font])
+            if fill: style.fill = FILLS[fill]
+            if align: style.alignment = ALIGNS[align]
+            if fmt: style.number_format = fmt
+            if border: style.border = BORDER
+            self.wb.add_named_style(style)
+            self.styles.add(name)
+        return name
+
+    def save(self, output_file):
+        self.wb.save(output_file)
+
+class ReportSheet:
+    """write_only 시트에 행 단위로 기록 (행 번호를 세어 행 높이 / 병합 / 교차 행 색을 지정)"""
+    def __init__(self, report, title, widths, freeze=None, row_height=None):
+        self.report = report
+        self.ws = report.wb.create_sheet(title=title)
+        self.row = 0
+        # 열 너비 / 틀 고정 / 기본 행 높이는 첫 행을 쓰기 전에 지정해야 함
+        for col, width in enumerate(widths, 1):
+            self.ws.column_dimensions[get_column_letter(col)].width = width
+        if freeze:
+            self.ws.freeze_panes = freeze
+        if row_height:
+            self.ws.sheet_format.defaultRowHeight = row_height
+            self.ws.sheet_format.customHeight = True
+
+    def cell(self, value, font="normal", fill=None, align="center", fmt=None, border=True):
+        cell = WriteOnlyCell(self.ws, value=value)
+        cell.style = self.report.get_style(font, fill, align, fmt, border)
+        return cell
+
+    def append(self, cells, height=None, merge=None):
+        """행 추가 (merge 는 이 행에서 병합할 열 범위, 예: 'A:E')"""
+        self.row += 1
+        if height:
+            self.ws.row_dimensions[self.row].height = height
+        if merge:
+            first, last = merge.split(':')
+            self.ws.merged_cells.add(f"{first}{self.row}:{last}{self.row}")
+        self.ws.append(cells)
+
+    def is_alt_row(self):
+        """다음 행이 교차 색 (짝수) 행인지"""
+        return (self.row + 1) % 2 == 0
+
+    def set_filter(self, last_col):
+        self.ws.auto_filter.ref = f"A1:{last_col}{max(self.row, 1)}"
 
 def extract_query(text, max_len=500):
     if pd.isna(text) or not text:
         return ""
     text = str(text)
     try:
-        msgs = json.loads(text)
+        msgs = json_codec.loads(text)
         if isinstance(msgs, list):
             parts = []
             for m in msgs:
@@ -120,7 +220,7 @@ def extract_content(text, max_len=300):
         return ""
     text = str(text)
     try:
-        data = json.loads(text)
+        data = json_codec.loads(text)
         if isinstance(data, dict):
             if 'tool_calls' in data and data['tool_calls']:
                 tc = data['tool_calls'][0]
@@ -132,19 +232,92 @@ def extract_content(text, max_len=300):
         pass
     return text[:max_len]
 
-def classify_error(reasoning, is_pass):
-    if pd.isna(reasoning) or is_pass == "PASS":
-        return ""
-    text = str(reasoning).lower()
-    if 'selection' in text: return "Selection"
-    if 'name' in text and 'func' in text: return "Name"
-    if 'arg' in text and 'key' in text: return "Arg Key"
-    if 'arg' in text and 'value' in text: return "Arg Value"
-    if 'halluc' in text: return "Hallucination"
-    if 'slot' in text or 'missing' in text: return "Missing Info"
-    if 'relevance' in text or 'unnecessary' in text: return "Unnecessary"
-    if 'tool_calls' in text and 'null' in text: return "No Call"
-    return "Other"
+def map_unique(values, func):
+    """
+    컬럼의 고유값만 변환해서 다시 펼침 (json 파싱은 값마다 해야 하므로, SingleCall 처럼 tools_type 마다
+    같은 query / gt 가 반복되는 컬럼은 고유값 수만큼만 파싱)
+    """
+    codes, uniques = pd.factorize(values)
+    # code -1 (NaN) 은 마지막에 붙인 func(None) 으로
+    converted = np.array([func(value) for value in uniques] + [func(None)], dtype=object)
+    return pd.Series(converted[codes], index=values.index)
+
+# reasoning 키워드 -> 에러 유형 (위에서부터 먼저 맞는 유형, 모든 키워드가 있어야 함)
+ERROR_KEYWORDS = [
+    ("Selection", ["selection"]),
+    ("Name", ["name", "func"]),
+    ("Arg Key", ["arg", "key"]),
+    ("Arg Value", ["arg", "value"]),
+    ("Hallucination", ["halluc"]),
+    ("Missing Info", ["slot"]),
+    ("Missing Info", ["missing"]),
+    ("Unnecessary", ["relevance"]),
+    ("Unnecessary", ["unnecessary"]),
+    ("No Call", ["tool_calls", "null"]),
+]
+
+def classify_errors(reasoning, is_pass):
+    """reasoning 키워드로 에러 유형 분류 (PASS 이거나 reasoning 이 없으면 빈 문자열, 어느 키워드도 없으면 Other)"""
+    text = reasoning.astype(str).str.lower()
+    conditions = []
+    for _, keywords in ERROR_KEYWORDS:
+        condition = np.ones(len(text), dtype=bool)
+        for keyword in keywords:
+            condition &= text.str.contains(keyword, regex=False).to_numpy()
+        conditions.append(condition)
+    errors = np.select(conditions, [label for label, _ in ERROR_KEYWORDS], default="Other")
+    return pd.Series(np.where(reasoning.isna().to_numpy() | (is_pass == "PASS").to_numpy(), "", errors),
+                     index=reasoning.index, dtype=object)
+
+# structured(json) judge verdict 의 error_type -> 리포트 라벨
+ERROR_TYPE_LABELS = {
+    "selection": "Selection",
+    "function_name": "Name",
+    "argument_key": "Arg Key",
+    "argument_value": "Arg Value",
+    "hallucination": "Hallucination",
+    "missing_info": "Missing Info",
+    "unnecessary_call": "Unnecessary",
+    "no_call": "No Call",
+    "language": "Other",
+    "other": "Other",
+}
+
+# Details 행 (data["all_results"] DataFrame 의 컬럼)
+RESULT_COLUMNS = ["category", "is_pass", "id", "query", "gt", "output", "error", "votes"]
+DIALOG_OUTPUT_TYPES = ['call', 'completion', 'slot', 'relevance']
+
+def get_column(df, column, default=""):
+    return df[column] if column in df.columns else pd.Series(default, index=df.index, dtype=object)
+
+def get_errors(df, is_pass):
+    """error_type 컬럼(json verdict)이 있으면 우선 사용하고, 없으면 reasoning 키워드로 분류"""
+    labels = get_column(df, 'error_type', None).map(ERROR_TYPE_LABELS, na_action='ignore')
+    errors = classify_errors(get_column(df, 'reasoning'), is_pass)
+    return errors.where((is_pass == "PASS") | labels.isna(), labels)
+
+def to_results(df, categories, query_column='query'):
+    """
+    평가 결과 DataFrame 을 Details 행 (RESULT_COLUMNS) 으로 변환
+    votes 는 judge 다수결 투표 결과 (예: 'pass 2 / fail 1'), 단일 샘플 채점이면 빈 문자열
+    """
+    is_pass = df['is_pass'].astype(str).str.upper()
+    return pd.DataFrame({
+        "category": categories,
+        "is_pass": is_pass,
+        "id": get_column(df, '#serial_num'),
+        "query": map_unique(get_column(df, query_column), extract_query),
+        "gt": map_unique(get_column(df, 'ground_truth'), extract_content),
+        "output": map_unique(get_column(df, 'model_output'), extract_content),
+        "error": get_errors(df, is_pass),
+        "votes": get_column(df, 'vote_split').fillna("").astype(str),
+    }, columns=RESULT_COLUMNS)
+
+def count_results(results, subtypes):
+    """subtype 별 {pass, total, accuracy} (groupby, subtype 이 처음 나온 순서)"""
+    counts = results["is_pass"].eq("PASS").groupby(subtypes.to_numpy(), sort=False).agg(['sum', 'count'])
+    return {subtype: {"pass": int(p), "total": int(t), "accuracy": p / t if t > 0 else 0}
+            for subtype, p, t in counts.itertuples()}
 
 # =============================================================================
 # 데이터 수집
@@ -165,113 +338,75 @@ def collect_model_data(model_name):
         "dialog": {},
         "singlecall": {},
         "calldecision": {},
-        "all_results": [],
+        "all_results": None,
         "error_summary": Counter()
     }
-    
-    total_pass = 0
-    total_count = 0
+    results = []
     
     # Dialog
-    dialog_file = model_dir / f"FunctionChat-Dialog.{model_name_clean}.eval_report.tsv"
+    dialog_file = get_report_file(model_dir, f"FunctionChat-Dialog.{model_name_clean}")
     if dialog_file.exists():
         try:
-            df = pd.read_csv(dialog_file, sep='\t')
-            df['is_pass_bool'] = df['is_pass'].astype(str).str.upper() == 'PASS'
-            
-            for ot in ['call', 'completion', 'slot', 'relevance']:
-                type_df = df[df['type_of_output'].astype(str).str.lower() == ot]
-                if not type_df.empty:
-                    p = int(type_df['is_pass_bool'].sum())
-                    t = len(type_df)
-                    data["dialog"][ot] = {"pass": p, "total": t, "accuracy": p/t if t > 0 else 0}
-                    total_pass += p
-                    total_count += t
-                    
-                    for _, row in type_df.iterrows():
-                        is_pass = str(row['is_pass']).upper()
-                        err = classify_error(row.get('reasoning', ''), is_pass)
-                        data["all_results"].append({
-                            "category": f"Dialog-{ot.capitalize()}",
-                            "is_pass": is_pass,
-                            "id": row.get('#serial_num', ''),
-                            "query": extract_query(row.get('query', '')),
-                            "gt": extract_content(row.get('ground_truth', '')),
-                            "output": extract_content(row.get('model_output', '')),
-                            "error": err
-                        })
-                        if is_pass == "FAIL" and err:
-                            data["error_summary"][err] += 1
+            df = load_report(dialog_file)
+            output_types = df['type_of_output'].astype(str).str.lower()
+            # Details 는 유형 순서 (call, completion, slot, relevance) 로 묶어서 기록
+            order = pd.Categorical(output_types, categories=DIALOG_OUTPUT_TYPES).codes
+            keep = np.flatnonzero(order >= 0)
+            keep = keep[np.argsort(order[keep], kind='stable')]
+            df, output_types = df.iloc[keep], output_types.iloc[keep]
+            dialog_results = to_results(df, "Dialog-" + output_types.str.capitalize())
+            data["dialog"] = count_results(dialog_results, output_types)
+            results.append(dialog_results)
         except Exception as e:
             print(f"    [WARN] Dialog: {e}")
     
     # SingleCall
-    sc_file = model_dir / f"FunctionChat-Singlecall.{model_name_clean}.eval_report.tsv"
+    sc_file = get_report_file(model_dir, f"FunctionChat-Singlecall.{model_name_clean}")
     if sc_file.exists():
         try:
-            df = pd.read_csv(sc_file, sep='\t')
-            df['is_pass_bool'] = df['is_pass'].astype(str).str.upper() == 'PASS'
-            
+            df = load_report(sc_file)
             if 'tools_type' in df.columns:
-                for tt in df['tools_type'].unique():
-                    type_df = df[df['tools_type'] == tt]
-                    p = int(type_df['is_pass_bool'].sum())
-                    t = len(type_df)
-                    data["singlecall"][tt] = {"pass": p, "total": t, "accuracy": p/t if t > 0 else 0}
-                    total_pass += p
-                    total_count += t
-                    
-                    for _, row in type_df.iterrows():
-                        is_pass = str(row['is_pass']).upper()
-                        err = classify_error(row.get('reasoning', ''), is_pass)
-                        data["all_results"].append({
-                            "category": f"SingleCall-{tt}",
-                            "is_pass": is_pass,
-                            "id": row.get('#serial_num', ''),
-                            "query": extract_query(row.get('query', '')),
-                            "gt": extract_content(row.get('ground_truth', '')),
-                            "output": extract_content(row.get('model_output', '')),
-                            "error": err
-                        })
-                        if is_pass == "FAIL" and err:
-                            data["error_summary"][err] += 1
+                # Details 는 tools_type 이 처음 나온 순서로 묶어서 기록
+                codes, _ = pd.factorize(df['tools_type'])
+                keep = np.flatnonzero(codes >= 0)
+                df = df.iloc[keep[np.argsort(codes[keep], kind='stable')]]
+                sc_results = to_results(df, "SingleCall-" + df['tools_type'].astype(str))
+                data["singlecall"] = count_results(sc_results, df['tools_type'])
+                results.append(sc_results)
         except Exception as e:
             print(f"    [WARN] SingleCall: {e}")
     
     # CallDecision
     cd_files = [
-        model_dir / f"FunctionChat-CallDecision-sample.{model_name_clean}.eval_report.tsv",
-        model_dir / f"FunctionChat-CallDecision.{model_name_clean}.eval_report.tsv"
+        get_report_file(model_dir, f"FunctionChat-CallDecision-sample.{model_name_clean}"),
+        get_report_file(model_dir, f"FunctionChat-CallDecision.{model_name_clean}")
     ]
     for cd_file in cd_files:
         if cd_file.exists():
             try:
-                df = pd.read_csv(cd_file, sep='\t')
-                df['is_pass_bool'] = df['is_pass'].astype(str).str.upper() == 'PASS'
-                p = int(df['is_pass_bool'].sum())
-                t = len(df)
+                df = load_report(cd_file)
+                # CallDecision uses input_messages
+                cd_results = to_results(df, pd.Series("CallDecision", index=df.index), 'input_messages')
+                p = int(cd_results["is_pass"].eq("PASS").sum())
+                t = len(cd_results)
                 data["calldecision"] = {"pass": p, "total": t, "accuracy": p/t if t > 0 else 0}
-                total_pass += p
-                total_count += t
-                
-                for _, row in df.iterrows():
-                    is_pass = str(row['is_pass']).upper()
-                    err = classify_error(row.get('reasoning', ''), is_pass)
-                    data["all_results"].append({
-                        "category": "CallDecision",
-                        "is_pass": is_pass,
-                        "id": row.get('#serial_num', ''),
-                        "query": extract_query(row.get('input_messages', '')),  # CallDecision uses input_messages
-                        "gt": extract_content(row.get('ground_truth', '')),
-                        "output": extract_content(row.get('model_output', '')),
-                        "error": err
-                    })
-                    if is_pass == "FAIL" and err:
-                        data["error_summary"][err] += 1
+                results.append(cd_results)
                 break
             except Exception as e:
                 print(f"    [WARN] CallDecision: {e}")
     
+    all_results = pd.concat(results, ignore_index=True) if results else pd.DataFrame(columns=RESULT_COLUMNS)
+    failed = all_results[all_results["is_pass"].eq("FAIL") & all_results["error"].ne("")]
+    data["all_results"] = all_results
+    data["error_summary"] = Counter(failed["error"].value_counts().to_dict())
+    # Summary / 전체 취합 시트에 수식 대신 기록할 집계 (카테고리별 pass / total, 카테고리 x 에러 유형별 건수)
+    by_category = all_results["is_pass"].eq("PASS").groupby(all_results["category"], sort=False).agg(['sum', 'count'])
+    data["category_counts"] = {cat: (int(p), int(t)) for cat, p, t in by_category.itertuples()}
+    errors = all_results[all_results["error"].ne("")]
+    data["error_counts"] = {key: int(n) for key, n in errors.groupby(["category", "error"], sort=False).size().items()}
+    
+    total_pass = int(all_results["is_pass"].eq("PASS").sum())
+    total_count = len(all_results)
     data["overall_accuracy"] = total_pass / total_count if total_count > 0 else 0
     data["total_pass"] = total_pass
     data["total_count"] = total_count
@@ -279,199 +414,224 @@ def collect_model_data(model_name):
     
     return data
 
+# =============================================================================
+# 통계 (bootstrap CI, paired test)
+# =============================================================================
+SIGNIFICANCE_LEGEND = (f"CI: bootstrap {DEFAULT_CONFIDENCE:.0%} | paired McNemar test on shared items, "
+                       f"Holm-adjusted: * p<{DEFAULT_ALPHA:g}, ** p<{DEFAULT_ALPHA / 5:g}, *** p<{DEFAULT_ALPHA / 50:g}, n.s. not significant")
+
+def format_ci(bounds):
+    return f"{bounds[0]:.1%} ~ {bounds[1]:.1%}"
+
+def get_category_ci(data, cat_names):
+    """카테고리별 (None 은 전체) 정답률의 bootstrap CI 문자열"""
+    counts = [(data["total_pass"], data["total_count"]) if cat_name is None else
+              data["category_counts"].get(cat_name, (0, 0)) for cat_name in cat_names]
+    bounds = bootstrap_ci([c[0] for c in counts], [c[1] for c in counts])
+    return {cat_name: format_ci(b) if total else "-" for cat_name, b, (_, total) in zip(cat_names, bounds, counts)}
+
+def get_item_outcomes(data):
+    # SingleCall 은 tools_type 마다 같은 serial 이 반복되므로 카테고리까지 포함한 키 사용
+    results = data["all_results"]
+    keys = results["category"] + ":" + results["id"].astype(str)
+    return dict(zip(keys.tolist(), results["is_pass"].eq("PASS").tolist()))
+
+def compute_ranking_stats(sorted_data):
+    """
+    모델별 전체 정답률 CI 와 모든 모델 쌍의 paired test (공유 문항 기준, Holm 보정 McNemar) 를 한 번에 계산
+    """
+    passed, present = to_outcome_matrix([get_item_outcomes(m) for m in sorted_data])
+    stats = paired_tests(passed, present)
+    stats["mcnemar_holm"] = holm_adjust(stats["mcnemar_p"])
+    stats["ci"] = bootstrap_ci(passed.sum(axis=1), present.sum(axis=1))
+    return stats
+
 # =============================================================================
 # 개별 모델 - Summary 시트
 # =============================================================================
-def create_model_summary(wb, data):
-    ws = wb.active
-    ws.title = "Summary"
-    r = 1
+MODEL_CATEGORIES = [
+    ("Dialog", "Call", "함수 선택 및 인자 추출"),
+    ("Dialog", "Completion", "도구 결과를 자연어로 전달"),
+    ("Dialog", "Slot", "필수 정보 질문"),
+    ("Dialog", "Relevance", "불가 요청에 적절히 응답"),
+    ("SingleCall", "exact", "타겟 함수만 제공"),
+    ("SingleCall", "4_random", "타겟 + 무작위 3개"),
+    ("SingleCall", "4_close", "타겟 + 유사 3개"),
+    ("SingleCall", "8_random", "타겟 + 무작위 7개"),
+    ("SingleCall", "8_close", "타겟 + 유사 7개"),
+    ("Decision", "CallDecision", "호출 여부 판단"),
+]
+ERRORS = ["Selection", "Name", "Arg Key", "Arg Value", "Hallucination", "Missing Info", "Unnecessary", "No Call", "Other"]
+
+def get_cat_name(group, cat):
+    return f"{group}-{cat}" if group != "Decision" else cat
+
+def get_accuracy(p, t):
+    return p / t if t > 0 else 0
+
+def create_model_summary(report, data):
+    ws = report.create_sheet("Summary", widths=[14, 20, 12, 12, 12, 14, 18])
     
     # 타이틀
-    ws.merge_cells(f'A{r}:E{r}')
-    set_cell(ws, r, 1, "FunctionChat-Bench Report", font=FONTS["title"])
-    ws.row_dimensions[r].height = 35
-    r += 2
+    ws.append([ws.cell("FunctionChat-Bench Report", font="title", align=None, border=False)], height=35, merge="A:E")
+    ws.append([])
     
     # 모델 정보
-    set_cell(ws, r, 1, "Model", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.merge_cells(f'B{r}:E{r}')
-    set_cell(ws, r, 2, data['model_name'], font=FONTS["normal"], border=BORDER, align=ALIGN_LEFT)
-    ws.row_dimensions[r].height = 28
-    r += 1
-    
-    set_cell(ws, r, 1, "Date", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.merge_cells(f'B{r}:E{r}')
-    set_cell(ws, r, 2, datetime.now().strftime('%Y-%m-%d %H:%M'), font=FONTS["normal"], border=BORDER, align=ALIGN_LEFT)
-    ws.row_dimensions[r].height = 28
-    r += 2
+    ws.append([ws.cell("Model", font="header", fill="header"), ws.cell(data['model_name'], align="left")],
+              height=28, merge="B:E")
+    ws.append([ws.cell("Date", font="header", fill="header"),
+               ws.cell(datetime.now().strftime('%Y-%m-%d %H:%M'), align="left")], height=28, merge="B:E")
+    ws.append([])
     
     # Overall (Pass, Fail, Total, Accuracy 순서)
-    ws.merge_cells(f'A{r}:E{r}')
-    set_cell(ws, r, 1, "Overall Performance", font=FONTS["section"], fill=FILLS["section"])
-    ws.row_dimensions[r].height = 30
-    r += 1
-    
-    for c, h in enumerate(["Metric", "Value"], 1):
-        set_cell(ws, r, c, h, font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 28
-    r += 1
-    
-    # Pass
-    set_cell(ws, r, 1, "Pass", font=FONTS["pass"], border=BORDER, align=ALIGN_LEFT)
-    set_formula(ws, r, 2, '=COUNTIF(Details!A:A,"PASS")', font=FONTS["pass"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 26
-    pass_row = r
-    r += 1
-    
-    # Fail
-    set_cell(ws, r, 1, "Fail", font=FONTS["fail"], border=BORDER, align=ALIGN_LEFT)
-    set_formula(ws, r, 2, '=COUNTIF(Details!A:A,"FAIL")', font=FONTS["fail"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 26
-    r += 1
-    
-    # Total
-    set_cell(ws, r, 1, "Total", font=FONTS["normal"], border=BORDER, align=ALIGN_LEFT)
-    set_formula(ws, r, 2, "=COUNTA(Details!A:A)-1", font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 26
-    total_row = r
-    r += 1
-    
-    # Accuracy
-    set_cell(ws, r, 1, "Accuracy", font=FONTS["header"], fill=FILLS["section"], border=BORDER, align=ALIGN_LEFT)
-    set_formula(ws, r, 2, f"=IF(B{total_row}>0,B{pass_row}/B{total_row},0)", 
-               font=FONTS["header"], fill=FILLS["section"], border=BORDER, align=ALIGN_CENTER, fmt='0.0%')
-    ws.row_dimensions[r].height = 28
-    r += 2
+    ws.append([ws.cell("Overall Performance", font="section", fill="section", align=None, border=False)],
+              height=30, merge="A:E")
+    ws.append([ws.cell(h, font="header", fill="header") for h in ["Metric", "Value"]], height=28)
+    total_pass, total_fail, total_count = data["total_pass"], data["total_fail"], data["total_count"]
+    ws.append([ws.cell("Pass", font="pass", align="left"), ws.cell(total_pass, font="pass")], height=26)
+    ws.append([ws.cell("Fail", font="fail", align="left"), ws.cell(total_fail, font="fail")], height=26)
+    ws.append([ws.cell("Total", align="left"), ws.cell(total_count)], height=26)
+    ws.append([ws.cell("Accuracy", font="header", fill="section", align="left"),
+               ws.cell(get_accuracy(total_pass, total_count), font="header", fill="section", fmt='0.0%')], height=28)
+    ws.append([])
     
     # Category Performance
-    ws.merge_cells(f'A{r}:E{r}')
-    set_cell(ws, r, 1, "Category Performance", font=FONTS["section"], fill=FILLS["section"])
-    ws.row_dimensions[r].height = 30
-    r += 1
-    
-    headers = ["Group", "Category", "Pass", "Fail", "Total", "Accuracy"]
-    for c, h in enumerate(headers, 1):
-        set_cell(ws, r, c, h, font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 28
-    r += 1
-    
-    categories = [
-        ("Dialog", "Call", "함수 선택 및 인자 추출"),
-        ("Dialog", "Completion", "도구 결과를 자연어로 전달"),
-        ("Dialog", "Slot", "필수 정보 질문"),
-        ("Dialog", "Relevance", "불가 요청에 적절히 응답"),
-        ("SingleCall", "exact", "타겟 함수만 제공"),
-        ("SingleCall", "4_random", "타겟 + 무작위 3개"),
-        ("SingleCall", "4_close", "타겟 + 유사 3개"),
-        ("SingleCall", "8_random", "타겟 + 무작위 7개"),
-        ("SingleCall", "8_close", "타겟 + 유사 7개"),
-        ("Decision", "CallDecision", "호출 여부 판단"),
-    ]
-    
-    cat_start = r
-    for group, cat, desc in categories:
-        cat_name = f"{group}-{cat}" if group != "Decision" else cat
-        
-        set_cell(ws, r, 1, group, font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_cell(ws, r, 2, cat, font=FONTS["normal"], border=BORDER, align=ALIGN_LEFT)
-        set_formula(ws, r, 3, f'=COUNTIFS(Details!B:B,"{cat_name}",Details!A:A,"PASS")',
-                   font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_formula(ws, r, 4, f'=COUNTIFS(Details!B:B,"{cat_name}",Details!A:A,"FAIL")',
-                   font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_formula(ws, r, 5, f'=COUNTIF(Details!B:B,"{cat_name}")',
-                   font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_formula(ws, r, 6, f"=IF(E{r}>0,C{r}/E{r},0)",
-                   font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER, fmt='0.0%')
-        
-        if r % 2 == 0:
-            for c in range(1, 7):
-                ws.cell(row=r, column=c).fill = FILLS["alt_row"]
-        ws.row_dimensions[r].height = 26
-        r += 1
-    
-    cat_end = r - 1
+    ws.append([ws.cell("Category Performance", font="section", fill="section", align=None, border=False)],
+              height=30, merge="A:E")
+    headers = ["Group", "Category", "Pass", "Fail", "Total", "Accuracy", f"{DEFAULT_CONFIDENCE:.0%} CI"]
+    ws.append([ws.cell(h, font="header", fill="header") for h in headers], height=28)
+    
+    cat_names = [get_cat_name(group, cat) for group, cat, desc in MODEL_CATEGORIES]
+    cat_ci = get_category_ci(data, cat_names + [None])
+    sum_pass = sum_total = 0
+    for (group, cat, desc), cat_name in zip(MODEL_CATEGORIES, cat_names):
+        p, t = data["category_counts"].get(cat_name, (0, 0))
+        sum_pass += p
+        sum_total += t
+        fill = "alt_row" if ws.is_alt_row() else None
+        ws.append([
+            ws.cell(group, fill=fill),
+            ws.cell(cat, fill=fill, align="left"),
+            ws.cell(p, fill=fill),
+            ws.cell(t - p, fill=fill),
+            ws.cell(t, fill=fill),
+            ws.cell(get_accuracy(p, t), fill=fill, fmt='0.0%'),
+            ws.cell(cat_ci[cat_name], font="small", fill=fill),
+        ], height=26)
     
     # Total row
-    set_cell(ws, r, 1, "", font=FONTS["header"], fill=FILLS["header"], border=BORDER)
-    set_cell(ws, r, 2, "TOTAL", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_LEFT)
-    set_formula(ws, r, 3, f"=SUM(C{cat_start}:C{cat_end})", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    set_formula(ws, r, 4, f"=SUM(D{cat_start}:D{cat_end})", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    set_formula(ws, r, 5, f"=SUM(E{cat_start}:E{cat_end})", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    set_formula(ws, r, 6, f"=IF(E{r}>0,C{r}/E{r},0)", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER, fmt='0.0%')
-    ws.row_dimensions[r].height = 28
-    r += 2
-    
-    # Error Analysis
-    ws.merge_cells(f'A{r}:E{r}')
-    set_cell(ws, r, 1, "Error Analysis", font=FONTS["section"], fill=FILLS["section"])
-    ws.row_dimensions[r].height = 30
-    r += 1
-    
-    for c, h in enumerate(["Error Type", "Count", "Ratio"], 1):
-        set_cell(ws, r, c, h, font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 28
-    r += 1
-    
-    fail_formula = '=COUNTIF(Details!A:A,"FAIL")'
-    
-    errors = ["Selection", "Name", "Arg Key", "Arg Value", "Hallucination", "Missing Info", "Unnecessary", "No Call", "Other"]
-    for err in errors:
-        set_cell(ws, r, 1, err, font=FONTS["normal"], border=BORDER, align=ALIGN_LEFT)
-        set_formula(ws, r, 2, f'=COUNTIF(Details!G:G,"{err}")', font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_formula(ws, r, 3, f'=IF({fail_formula}>0,B{r}/{fail_formula},0)', font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER, fmt='0.0%')
-        ws.row_dimensions[r].height = 26
-        r += 1
-    
-    # 열 너비
-    ws.column_dimensions['A'].width = 14
-    ws.column_dimensions['B'].width = 20
-    ws.column_dimensions['C'].width = 12
-    ws.column_dimensions['D'].width = 12
-    ws.column_dimensions['E'].width = 12
-    ws.column_dimensions['F'].width = 14
-    
-    ws.freeze_panes = "A1"
+    ws.append([
+        ws.cell("", font="header", fill="header", align=None),
+        ws.cell("TOTAL", font="header", fill="header", align="left"),
+        ws.cell(sum_pass, font="header", fill="header"),
+        ws.cell(sum_total - sum_pass, font="header", fill="header"),
+        ws.cell(sum_total, font="header", fill="header"),
+        ws.cell(get_accuracy(sum_pass, sum_total), font="header", fill="header", fmt='0.0%'),
+        ws.cell(cat_ci[None], font="header", fill="header"),
+    ], height=28)
+    ws.append([])
+    
+    # Error Analysis (비율은 전체 FAIL 대비)
+    ws.append([ws.cell("Error Analysis", font="section", fill="section", align=None, border=False)],
+              height=30, merge="A:E")
+    ws.append([ws.cell(h, font="header", fill="header") for h in ["Error Type", "Count", "Ratio"]], height=28)
+    error_totals = Counter()
+    for (cat_name, err), count in data["error_counts"].items():
+        error_totals[err] += count
+    for err in ERRORS:
+        ws.append([ws.cell(err, align="left"), ws.cell(error_totals[err]),
+                   ws.cell(get_accuracy(error_totals[err], total_fail), fmt='0.0%')], height=26)
+
+# =============================================================================
+# Details 시트 (write_only, 큰 결과는 시트 / 파일로 나눠서 기록)
+# =============================================================================
+def plan_detail_sheets(total_rows, title):
+    """
+    Details 행을 DETAIL_SHEET_ROWS 행씩 시트로 나누고, DETAIL_FILE_SHEETS 개 시트마다 다음 파일 (part) 로 넘기는 계획
+    Returns: [{"part", "title", "start", "stop"}] (행이 없어도 헤더만 있는 시트 1개)
+    """
+    sheets = []
+    for idx, start in enumerate(range(0, max(total_rows, 1), DETAIL_SHEET_ROWS)):
+        sheets.append({
+            "part": idx // DETAIL_FILE_SHEETS,
+            "title": title if idx == 0 else f"{title} {idx + 1}",
+            "start": start,
+            "stop": min(start + DETAIL_SHEET_ROWS, total_rows),
+        })
+    return sheets
+
+def get_part_file(output_file, part):
+    return output_file if part == 0 else output_file.with_name(f"{output_file.stem}_part{part + 1}.xlsx")
+
+def create_detail_index(report, output_file, sheets, describe):
+    """Details 가 여러 시트 / 파일로 나뉘면 어느 파일 / 시트에 어떤 행이 있는지 목차 시트 작성"""
+    if len(sheets) <= 1:
+        return
+    ws = report.create_sheet("Details Index", widths=[48, 16, 10, 48, 48], freeze="A2")
+    ws.append([ws.cell(h, font="header", fill="header") for h in ["File", "Sheet", "Rows", "From", "To"]], height=30)
+    for sheet in sheets:
+        ws.append([
+            ws.cell(get_part_file(output_file, sheet["part"]).name, font="small", align="left"),
+            ws.cell(sheet["title"], align="left"),
+            ws.cell(sheet["stop"] - sheet["start"]),
+            ws.cell(describe(sheet["start"]) if sheet["stop"] > sheet["start"] else "", font="small", align="left"),
+            ws.cell(describe(sheet["stop"] - 1) if sheet["stop"] > sheet["start"] else "", font="small", align="left"),
+        ], height=24)
+
+def write_detail_sheets(report, output_file, sheets, rows, to_cells, headers, widths, row_height):
+    """
+    계획대로 Details 행을 시트에 흘려 씀 (첫 part 는 report, 나머지 part 는 *_partN.xlsx 로 저장)
+    행 높이는 행마다 지정하지 않고 시트 기본 행 높이로 지정
+    """
+    books = {0: report}
+    rows = iter(rows)
+    last_col = get_column_letter(len(headers))
+    for sheet in sheets:
+        if sheet["part"] not in books:
+            books[sheet["part"]] = ReportWorkbook()
+        ws = books[sheet["part"]].create_sheet(sheet["title"], widths=widths, freeze="A2", row_height=row_height)
+        ws.append([ws.cell(h, font="header", fill="header") for h in headers], height=30)
+        for values in islice(rows, sheet["stop"] - sheet["start"]):
+            ws.append(to_cells(ws, values))
+        ws.set_filter(last_col)
+    for part, book in books.items():
+        if part > 0:
+            book.save(get_part_file(output_file, part))
+            print(f"    [OK] {get_part_file(output_file, part).name}")
+
+def to_result_cells(ws, values, model_short=None):
+    category, is_pass, item_id, query, gt, output, error, votes = values
+    result = "PASS" if is_pass == "PASS" else "FAIL"
+    cells = [ws.cell(result, font=result.lower(), fill=result.lower())]
+    if model_short is not None:
+        cells.append(ws.cell(model_short, font="small", align="left"))
+    cells += [
+        ws.cell(category),
+        ws.cell(item_id, font="small"),
+        ws.cell(query, font="small", align="wrap"),
+        ws.cell(gt, font="small", align="wrap"),
+        ws.cell(output, font="small", align="wrap"),
+        ws.cell(error),
+    ]
+    if model_short is None:
+        cells.append(ws.cell(votes, font="small"))
+    return cells
+
+def describe_result(results, position, model_short=None):
+    category, item_id = results["category"].iat[position], results["id"].iat[position]
+    return " / ".join(str(part) for part in [model_short, category, item_id] if part is not None)
 
 # =============================================================================
 # 개별 모델 - Details 시트
 # =============================================================================
-def create_model_details(wb, data):
-    ws = wb.create_sheet(title="Details")
-    r = 1
-    
-    headers = ["Result", "Category", "ID", "Query", "GT", "Output", "Error"]
-    for c, h in enumerate(headers, 1):
-        set_cell(ws, r, c, h, font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 30
-    r += 1
-    
-    for item in data["all_results"]:
-        if item["is_pass"] == "PASS":
-            set_cell(ws, r, 1, "PASS", font=FONTS["pass"], fill=FILLS["pass"], border=BORDER, align=ALIGN_CENTER)
-        else:
-            set_cell(ws, r, 1, "FAIL", font=FONTS["fail"], fill=FILLS["fail"], border=BORDER, align=ALIGN_CENTER)
-        
-        set_cell(ws, r, 2, item["category"], font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_cell(ws, r, 3, item["id"], font=FONTS["small"], border=BORDER, align=ALIGN_CENTER)
-        set_cell(ws, r, 4, item["query"], font=FONTS["small"], border=BORDER, align=ALIGN_WRAP)
-        set_cell(ws, r, 5, item["gt"], font=FONTS["small"], border=BORDER, align=ALIGN_WRAP)
-        set_cell(ws, r, 6, item["output"], font=FONTS["small"], border=BORDER, align=ALIGN_WRAP)
-        set_cell(ws, r, 7, item["error"], font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        
-        ws.row_dimensions[r].height = 50
-        r += 1
-    
-    ws.column_dimensions['A'].width = 10
-    ws.column_dimensions['B'].width = 20
-    ws.column_dimensions['C'].width = 8
-    ws.column_dimensions['D'].width = 45
-    ws.column_dimensions['E'].width = 35
-    ws.column_dimensions['F'].width = 35
-    ws.column_dimensions['G'].width = 14
-    
-    ws.freeze_panes = "A2"
-    ws.auto_filter.ref = f"A1:G{r-1}"
+def create_model_details(report, output_file, data):
+    results = data["all_results"]
+    sheets = plan_detail_sheets(len(results), "Details")
+    create_detail_index(report, output_file, sheets, lambda position: describe_result(results, position))
+    write_detail_sheets(
+        report, output_file, sheets, results.itertuples(index=False, name=None), to_result_cells,
+        headers=["Result", "Category", "ID", "Query", "GT", "Output", "Error", "Votes"],
+        widths=[10, 20, 8, 45, 35, 35, 14, 16], row_height=50)
 
 # =============================================================================
 # 개별 모델 리포트
@@ -484,12 +644,11 @@ def generate_model_report(model_name):
     model_dir = REPORTS_PATH / data["model_name_clean"]
     model_dir.mkdir(parents=True, exist_ok=True)
     
-    wb = Workbook()
-    create_model_summary(wb, data)
-    create_model_details(wb, data)
-    
     output_file = model_dir / f"{data['model_name_clean']}_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    wb.save(output_file)
+    report = ReportWorkbook()
+    create_model_summary(report, data)
+    create_model_details(report, output_file, data)
+    report.save(output_file)
     print(f"    [OK] {output_file.name}")
     
     return data
@@ -497,279 +656,195 @@ def generate_model_report(model_name):
 # =============================================================================
 # 전체 취합 - Ranking 시트
 # =============================================================================
-def create_ranking_sheet(wb, all_data):
-    ws = wb.active
-    ws.title = "Ranking"
-    r = 1
-    
-    ws.merge_cells(f'A{r}:F{r}')
-    set_cell(ws, r, 1, "FunctionChat-Bench - Model Ranking", font=FONTS["title"])
-    ws.row_dimensions[r].height = 40
-    r += 2
+def create_ranking_sheet(report, sorted_data, stats):
+    ws = report.create_sheet("Ranking", widths=[8, 40, 12, 12, 12, 14, 18, 18], freeze="A6")
     
-    ws.merge_cells(f'A{r}:F{r}')
-    set_cell(ws, r, 1, f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}", font=FONTS["small"])
-    ws.row_dimensions[r].height = 24
-    r += 2
+    ws.append([ws.cell("FunctionChat-Bench - Model Ranking", font="title", align=None, border=False)],
+              height=40, merge="A:H")
+    ws.append([])
+    ws.append([ws.cell(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M')}", font="small", align=None,
+                       border=False)], height=24, merge="A:H")
+    ws.append([])
     
     # Pass, Fail, Total, Accuracy 순서
-    headers = ["Rank", "Model", "Pass", "Fail", "Total", "Accuracy"]
-    for c, h in enumerate(headers, 1):
-        set_cell(ws, r, c, h, font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 30
-    r += 1
-    data_start = r
-    
-    sorted_data = sorted(all_data, key=lambda x: x['overall_accuracy'], reverse=True)
+    headers = ["Rank", "Model", "Pass", "Fail", "Total", "Accuracy", f"{DEFAULT_CONFIDENCE:.0%} CI", "vs Next"]
+    ws.append([ws.cell(h, font="header", fill="header") for h in headers], height=30)
     
     for rank, m in enumerate(sorted_data, 1):
-        short = m['model_short']
-        
-        set_cell(ws, r, 1, rank, font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_cell(ws, r, 2, m['model_name'], font=FONTS["normal"], border=BORDER, align=ALIGN_LEFT)
-        set_formula(ws, r, 3, f'=COUNTIFS(\'All Details\'!B:B,"{short}",\'All Details\'!A:A,"PASS")',
-                   font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_formula(ws, r, 4, f'=COUNTIFS(\'All Details\'!B:B,"{short}",\'All Details\'!A:A,"FAIL")',
-                   font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_formula(ws, r, 5, f'=COUNTIF(\'All Details\'!B:B,"{short}")',
-                   font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_formula(ws, r, 6, f"=IF(E{r}>0,C{r}/E{r},0)", font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER, fmt='0.0%')
-        
-        if rank == 1:
-            for c in range(1, 7):
-                ws.cell(row=r, column=c).fill = FILLS["pass"]
-        
-        ws.row_dimensions[r].height = 28
-        r += 1
-    
-    data_end = r - 1
+        # 바로 아래 순위 모델과의 차이가 유의한지 (공유 문항 McNemar, Holm 보정)
+        vs_next = ""
+        if rank < len(sorted_data):
+            p_value = stats["mcnemar_holm"][rank - 1, rank]
+            vs_next = f"{significance_marker(p_value) or 'n.s.'} (p={p_value:.3f})"
+        fill = "pass" if rank == 1 else None
+        ws.append([
+            ws.cell(rank, fill=fill),
+            ws.cell(m['model_name'], fill=fill, align="left"),
+            ws.cell(m["total_pass"], fill=fill),
+            ws.cell(m["total_fail"], fill=fill),
+            ws.cell(m["total_count"], fill=fill),
+            ws.cell(m["overall_accuracy"], fill=fill, fmt='0.0%'),
+            ws.cell(format_ci(stats["ci"][rank - 1]), font="small", fill=fill),
+            ws.cell(vs_next, font="small", fill=fill),
+        ], height=28)
     
     # TOTAL
-    set_cell(ws, r, 1, "", font=FONTS["header"], fill=FILLS["header"], border=BORDER)
-    set_cell(ws, r, 2, "TOTAL", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_LEFT)
-    set_formula(ws, r, 3, f"=SUM(C{data_start}:C{data_end})", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    set_formula(ws, r, 4, f"=SUM(D{data_start}:D{data_end})", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    set_formula(ws, r, 5, f"=SUM(E{data_start}:E{data_end})", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    set_formula(ws, r, 6, f"=IF(E{r}>0,C{r}/E{r},0)", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER, fmt='0.0%')
-    ws.row_dimensions[r].height = 30
-    
-    ws.column_dimensions['A'].width = 8
-    ws.column_dimensions['B'].width = 40
-    ws.column_dimensions['C'].width = 12
-    ws.column_dimensions['D'].width = 12
-    ws.column_dimensions['E'].width = 12
-    ws.column_dimensions['F'].width = 14
-    
-    ws.freeze_panes = "A6"
+    total_pass = sum(m["total_pass"] for m in sorted_data)
+    total_count = sum(m["total_count"] for m in sorted_data)
+    ws.append([
+        ws.cell("", font="header", fill="header", align=None),
+        ws.cell("TOTAL", font="header", fill="header", align="left"),
+        ws.cell(total_pass, font="header", fill="header"),
+        ws.cell(total_count - total_pass, font="header", fill="header"),
+        ws.cell(total_count, font="header", fill="header"),
+        ws.cell(get_accuracy(total_pass, total_count), font="header", fill="header", fmt='0.0%'),
+    ], height=30)
+    ws.append([])
+    
+    ws.append([ws.cell(SIGNIFICANCE_LEGEND, font="small", align=None, border=False)], merge="A:H")
 
 # =============================================================================
 # 전체 취합 - Category Matrix 시트
 # =============================================================================
-def create_category_matrix(wb, all_data):
-    ws = wb.create_sheet(title="Category Matrix")
-    r = 1
-    
-    ws.merge_cells(f'A{r}:H{r}')
-    set_cell(ws, r, 1, "Category Performance Matrix", font=FONTS["title"])
-    ws.row_dimensions[r].height = 40
-    r += 2
-    
-    categories = [
-        ("Dialog", "Call"), ("Dialog", "Completion"), ("Dialog", "Slot"), ("Dialog", "Relevance"),
-        ("SingleCall", "exact"), ("SingleCall", "4_random"), ("SingleCall", "4_close"),
-        ("SingleCall", "8_random"), ("SingleCall", "8_close"), ("Decision", "CallDecision")
-    ]
+def create_category_matrix(report, all_data):
+    ws = report.create_sheet("Category Matrix", widths=[12, 16] + [18] * len(all_data), freeze="C4")
     
-    # 헤더
-    set_cell(ws, r, 1, "Group", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    set_cell(ws, r, 2, "Category", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
+    ws.append([ws.cell("Category Performance Matrix", font="title", align=None, border=False)],
+              height=40, merge="A:H")
+    ws.append([])
     
-    model_shorts = [m['model_short'] for m in all_data]
-    for idx, short in enumerate(model_shorts, 3):
-        set_cell(ws, r, idx, short[:18], font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 30
-    r += 1
+    # 헤더
+    ws.append([ws.cell("Group", font="header", fill="header"), ws.cell("Category", font="header", fill="header")] +
+              [ws.cell(m['model_short'][:18], font="header", fill="header") for m in all_data], height=30)
     
-    for group, cat in categories:
-        cat_name = f"{group}-{cat}" if group != "Decision" else cat
-        
-        set_cell(ws, r, 1, group, font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-        set_cell(ws, r, 2, cat, font=FONTS["normal"], border=BORDER, align=ALIGN_LEFT)
-        
-        for idx, short in enumerate(model_shorts, 3):
-            pass_f = f'COUNTIFS(\'All Details\'!B:B,"{short}",\'All Details\'!C:C,"{cat_name}",\'All Details\'!A:A,"PASS")'
-            total_f = f'COUNTIFS(\'All Details\'!B:B,"{short}",\'All Details\'!C:C,"{cat_name}")'
-            set_formula(ws, r, idx, f"=IF({total_f}>0,{pass_f}/{total_f},0)",
-                       font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER, fmt='0.0%')
-        
-        if r % 2 == 0:
-            for c in range(1, 3 + len(model_shorts)):
-                ws.cell(row=r, column=c).fill = FILLS["alt_row"]
-        ws.row_dimensions[r].height = 26
-        r += 1
+    for group, cat, desc in MODEL_CATEGORIES:
+        cat_name = get_cat_name(group, cat)
+        fill = "alt_row" if ws.is_alt_row() else None
+        ws.append([ws.cell(group, fill=fill), ws.cell(cat, fill=fill, align="left")] +
+                  [ws.cell(get_accuracy(*m["category_counts"].get(cat_name, (0, 0))), fill=fill, fmt='0.0%')
+                   for m in all_data], height=26)
     
     # OVERALL
-    set_cell(ws, r, 1, "", font=FONTS["header"], fill=FILLS["section"], border=BORDER)
-    set_cell(ws, r, 2, "OVERALL", font=FONTS["header"], fill=FILLS["section"], border=BORDER, align=ALIGN_LEFT)
-    for idx, short in enumerate(model_shorts, 3):
-        pass_f = f'COUNTIFS(\'All Details\'!B:B,"{short}",\'All Details\'!A:A,"PASS")'
-        total_f = f'COUNTIF(\'All Details\'!B:B,"{short}")'
-        set_formula(ws, r, idx, f"=IF({total_f}>0,{pass_f}/{total_f},0)",
-                   font=FONTS["header"], fill=FILLS["section"], border=BORDER, align=ALIGN_CENTER, fmt='0.0%')
-    ws.row_dimensions[r].height = 30
-    
-    ws.column_dimensions['A'].width = 12
-    ws.column_dimensions['B'].width = 16
-    for idx in range(3, 3 + len(all_data)):
-        ws.column_dimensions[get_column_letter(idx)].width = 18
-    
-    ws.freeze_panes = "C4"
+    ws.append([ws.cell("", font="header", fill="section", align=None),
+               ws.cell("OVERALL", font="header", fill="section", align="left")] +
+              [ws.cell(m["overall_accuracy"], font="header", fill="section", fmt='0.0%') for m in all_data],
+              height=30)
 
 # =============================================================================
 # 전체 취합 - Error Summary 시트
 # =============================================================================
-def create_error_summary(wb, all_data):
-    ws = wb.create_sheet(title="Error Summary")
-    r = 1
-    
-    errors = ["Selection", "Name", "Arg Key", "Arg Value", "Hallucination", "Missing Info", "Unnecessary", "No Call", "Other"]
-    model_shorts = [m['model_short'] for m in all_data]
-    categories = [
-        "Dialog-Call", "Dialog-Completion", "Dialog-Slot", "Dialog-Relevance",
-        "SingleCall-exact", "SingleCall-4_random", "SingleCall-4_close", 
-        "SingleCall-8_random", "SingleCall-8_close", "CallDecision"
-    ]
+def create_error_summary(report, all_data):
+    categories = [get_cat_name(group, cat) for group, cat, desc in MODEL_CATEGORIES]
+    ws = report.create_sheet("Error Summary", widths=[18, 14] + [14] * (len(all_data) + 1), freeze="C4")
     
-    ws.merge_cells(f'A{r}:H{r}')
-    set_cell(ws, r, 1, "Error Summary (Category x Model)", font=FONTS["title"])
-    ws.row_dimensions[r].height = 36
-    r += 2
+    ws.append([ws.cell("Error Summary (Category x Model)", font="title", align=None, border=False)],
+              height=36, merge="A:H")
+    ws.append([])
     
     # 헤더: Category | Error Type | Model1 | Model2 | ... | Total
-    total_col = 3 + len(model_shorts)
-    set_cell(ws, r, 1, "Category", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    set_cell(ws, r, 2, "Error Type", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    for idx, short in enumerate(model_shorts, 3):
-        set_cell(ws, r, idx, short[:16], font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    set_cell(ws, r, total_col, "Total", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 28
-    r += 1
-    
-    data_start = r
-    row_idx = 0
+    ws.append([ws.cell("Category", font="header", fill="header"), ws.cell("Error Type", font="header", fill="header")] +
+              [ws.cell(m['model_short'][:16], font="header", fill="header") for m in all_data] +
+              [ws.cell("Total", font="header", fill="header")], height=28)
     
+    row_idx = 0
     for cat in categories:
-        cat_start = r
-        for err in errors:
-            set_cell(ws, r, 1, cat if err == errors[0] else "", font=FONTS["normal"], border=BORDER, align=ALIGN_LEFT)
-            set_cell(ws, r, 2, err, font=FONTS["normal"], border=BORDER, align=ALIGN_LEFT)
-            
-            for idx, short in enumerate(model_shorts, 3):
-                set_formula(ws, r, idx, 
-                    f'=COUNTIFS(\'All Details\'!B:B,"{short}",\'All Details\'!C:C,"{cat}",\'All Details\'!H:H,"{err}")',
-                    font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-            
-            last_model_col = get_column_letter(total_col - 1)
-            set_formula(ws, r, total_col, f"=SUM(C{r}:{last_model_col}{r})",
-                       font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-            
-            if row_idx % 2 == 1:
-                for c in range(1, total_col + 1):
-                    ws.cell(row=r, column=c).fill = FILLS["alt_row"]
-            ws.row_dimensions[r].height = 22
-            r += 1
+        subtotals = [0] * len(all_data)
+        for err in ERRORS:
+            counts = [m["error_counts"].get((cat, err), 0) for m in all_data]
+            subtotals = [s + c for s, c in zip(subtotals, counts)]
+            fill = "alt_row" if row_idx % 2 == 1 else None
+            ws.append([ws.cell(cat if err == ERRORS[0] else "", fill=fill, align="left"),
+                       ws.cell(err, fill=fill, align="left")] +
+                      [ws.cell(c, fill=fill) for c in counts + [sum(counts)]], height=22)
             row_idx += 1
         
         # Category subtotal
-        set_cell(ws, r, 1, "", font=FONTS["header"], fill=FILLS["section"], border=BORDER)
-        set_cell(ws, r, 2, f"{cat} Total", font=FONTS["header"], fill=FILLS["section"], border=BORDER, align=ALIGN_LEFT)
-        for idx in range(3, total_col + 1):
-            col = get_column_letter(idx)
-            set_formula(ws, r, idx, f"=SUM({col}{cat_start}:{col}{r-1})",
-                       font=FONTS["header"], fill=FILLS["section"], border=BORDER, align=ALIGN_CENTER)
-        ws.row_dimensions[r].height = 26
-        r += 1
+        ws.append([ws.cell("", font="header", fill="section", align=None),
+                   ws.cell(f"{cat} Total", font="header", fill="section", align="left")] +
+                  [ws.cell(c, font="header", fill="section") for c in subtotals + [sum(subtotals)]], height=26)
         row_idx += 1
     
-    data_end = r - 1
-    
-    # Grand Total
-    set_cell(ws, r, 1, "", font=FONTS["header"], fill=FILLS["header"], border=BORDER)
-    set_cell(ws, r, 2, "GRAND TOTAL", font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_LEFT)
-    for idx, short in enumerate(model_shorts, 3):
-        set_formula(ws, r, idx, f'=COUNTIFS(\'All Details\'!B:B,"{short}",\'All Details\'!A:A,"FAIL")',
-                   font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    last_model_col = get_column_letter(total_col - 1)
-    set_formula(ws, r, total_col, f"=SUM(C{r}:{last_model_col}{r})",
-               font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 28
-    
-    # 열 너비
-    ws.column_dimensions['A'].width = 18
-    ws.column_dimensions['B'].width = 14
-    for idx in range(3, total_col + 1):
-        ws.column_dimensions[get_column_letter(idx)].width = 14
-    
-    ws.freeze_panes = "C4"
+    # Grand Total (모델별 전체 FAIL)
+    fails = [m["total_fail"] for m in all_data]
+    ws.append([ws.cell("", font="header", fill="header", align=None),
+               ws.cell("GRAND TOTAL", font="header", fill="header", align="left")] +
+              [ws.cell(c, font="header", fill="header") for c in fails + [sum(fails)]], height=28)
+
+# =============================================================================
+# 전체 취합 - Significance 시트
+# =============================================================================
+def create_significance_sheet(report, sorted_data, stats):
+    model_shorts = [m['model_short'] for m in sorted_data]
+    ws = report.create_sheet("Significance", widths=[28] + [16] * len(model_shorts), freeze="B5")
+    
+    ws.append([ws.cell("Pairwise Significance (row - column)", font="title", align=None, border=False)],
+              height=40, merge="A:H")
+    ws.append([ws.cell(SIGNIFICANCE_LEGEND, font="small", align=None, border=False)], merge="A:H")
+    ws.append([])
+    
+    blocks = [
+        ("Accuracy difference on shared items", "diff", '+0.0%;-0.0%;0.0%'),
+        ("McNemar p (Holm-adjusted)", "mcnemar_holm", '0.000'),
+        ("Permutation p (unadjusted)", "permutation_p", '0.000'),
+    ]
+    for title, key, fmt in blocks:
+        ws.append([ws.cell(title, font="section", fill="section", align=None, border=False)], height=28, merge="A:H")
+        ws.append([ws.cell("Model", font="header", fill="header")] +
+                  [ws.cell(short[:16], font="header", fill="header") for short in model_shorts])
+        for i, short in enumerate(model_shorts):
+            cells = [ws.cell(short, align="left")]
+            for j in range(len(model_shorts)):
+                if i == j:
+                    cells.append(ws.cell("-", font="small"))
+                    continue
+                fill = None
+                if stats["mcnemar_holm"][i, j] < DEFAULT_ALPHA:
+                    fill = "pass" if stats["diff"][i, j] > 0 else "fail"
+                cells.append(ws.cell(float(stats[key][i, j]), fill=fill, fmt=fmt))
+            ws.append(cells)
+        ws.append([])
 
 # =============================================================================
 # 전체 취합 - All Details 시트
 # =============================================================================
-def create_all_details(wb, all_data):
-    ws = wb.create_sheet(title="All Details")
-    r = 1
-    
-    headers = ["Result", "Model", "Category", "ID", "Query", "GT", "Output", "Error"]
-    for c, h in enumerate(headers, 1):
-        set_cell(ws, r, c, h, font=FONTS["header"], fill=FILLS["header"], border=BORDER, align=ALIGN_CENTER)
-    ws.row_dimensions[r].height = 30
-    r += 1
-    
-    for m in all_data:
-        short = m['model_short']
-        for item in m["all_results"]:
-            if item["is_pass"] == "PASS":
-                set_cell(ws, r, 1, "PASS", font=FONTS["pass"], fill=FILLS["pass"], border=BORDER, align=ALIGN_CENTER)
-            else:
-                set_cell(ws, r, 1, "FAIL", font=FONTS["fail"], fill=FILLS["fail"], border=BORDER, align=ALIGN_CENTER)
-            
-            set_cell(ws, r, 2, short, font=FONTS["small"], border=BORDER, align=ALIGN_LEFT)
-            set_cell(ws, r, 3, item["category"], font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-            set_cell(ws, r, 4, item["id"], font=FONTS["small"], border=BORDER, align=ALIGN_CENTER)
-            set_cell(ws, r, 5, item["query"], font=FONTS["small"], border=BORDER, align=ALIGN_WRAP)
-            set_cell(ws, r, 6, item["gt"], font=FONTS["small"], border=BORDER, align=ALIGN_WRAP)
-            set_cell(ws, r, 7, item["output"], font=FONTS["small"], border=BORDER, align=ALIGN_WRAP)
-            set_cell(ws, r, 8, item["error"], font=FONTS["normal"], border=BORDER, align=ALIGN_CENTER)
-            
-            ws.row_dimensions[r].height = 45
-            r += 1
-    
-    ws.column_dimensions['A'].width = 10
-    ws.column_dimensions['B'].width = 22
-    ws.column_dimensions['C'].width = 18
-    ws.column_dimensions['D'].width = 8
-    ws.column_dimensions['E'].width = 40
-    ws.column_dimensions['F'].width = 30
-    ws.column_dimensions['G'].width = 30
-    ws.column_dimensions['H'].width = 14
-    
-    ws.freeze_panes = "A2"
-    ws.auto_filter.ref = f"A1:H{r-1}"
+def create_all_details(report, output_file, all_data):
+    # 모델별 결과를 이어 붙이지 않고 (모델 인덱스, 위치) 로 찾아서 기록
+    offsets = np.cumsum([0] + [len(m["all_results"]) for m in all_data])
+    
+    def describe(position):
+        idx = int(np.searchsorted(offsets, position, side='right')) - 1
+        m = all_data[idx]
+        return describe_result(m["all_results"], position - offsets[idx], m["model_short"])
+    
+    def iter_rows():
+        for m in all_data:
+            for values in m["all_results"].itertuples(index=False, name=None):
+                yield m["model_short"], values
+    
+    sheets = plan_detail_sheets(int(offsets[-1]), "All Details")
+    create_detail_index(report, output_file, sheets, describe)
+    write_detail_sheets(
+        report, output_file, sheets, iter_rows(), lambda ws, row: to_result_cells(ws, row[1], row[0]),
+        headers=["Result", "Model", "Category", "ID", "Query", "GT", "Output", "Error"],
+        widths=[10, 22, 18, 8, 40, 30, 30, 14], row_height=45)
 
 # =============================================================================
 # 전체 취합 리포트
 # =============================================================================
 def create_summary_report(all_data):
-    wb = Workbook()
-    create_ranking_sheet(wb, all_data)
-    create_category_matrix(wb, all_data)
-    create_error_summary(wb, all_data)
-    create_all_details(wb, all_data)
-    
     summary_dir = REPORTS_PATH / "summary"
     summary_dir.mkdir(exist_ok=True)
     output_file = summary_dir / f"All_Models_Summary_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    wb.save(output_file)
+    
+    report = ReportWorkbook()
+    sorted_data = sorted(all_data, key=lambda x: x['overall_accuracy'], reverse=True)
+    stats = compute_ranking_stats(sorted_data)
+    create_ranking_sheet(report, sorted_data, stats)
+    create_category_matrix(report, all_data)
+    create_error_summary(report, all_data)
+    create_significance_sheet(report, sorted_data, stats)
+    create_all_details(report, output_file, all_data)
+    report.save(output_file)
     print(f"    [OK] {output_file.name}")
 
 # =============================================================================